@@ -360,6 +360,15 @@ def addCommonOptions(parser):
                         default=False,
                         help="restore from a simpoint checkpoint taken with " +
                         "--take-simpoint-checkpoints")
+    parser.add_argument(
+        "--simpoint-campaign", action="store", type=str,
+        help="<simpoint file,weight file,interval-length,warmup-length> " +
+        "Fast-forward once and simulate every SimPoint with --cpu-type " +
+        "in a forked child process")
+    parser.add_argument("--simpoint-campaign-jobs", type=int, default=None,
+                        help="Maximum number of SimPoints simulated " +
+                        "concurrently by --simpoint-campaign (default: " +
+                        "number of host CPUs)")
 
     # Checkpointing options
     # Note that performing checkpointing via python script files will override
@@ -76,7 +76,7 @@ def setCPUClass(options):
         if options.restore_with_cpu != options.cpu_type:
             CPUClass = TmpClass
             TmpClass, test_mem_mode = getCPUClass(options.restore_with_cpu)
-    elif options.fast_forward:
+    elif options.fast_forward or options.simpoint_campaign:
         CPUClass = TmpClass
         TmpClass = AtomicSimpleCPU
         test_mem_mode = 'atomic'
@@ -284,8 +284,9 @@ def benchCheckpoints(options, maxtick, cptdir):
 def parseSimpointAnalysisFile(options, testsys):
     import re
 
+    spec = options.simpoint_campaign or options.take_simpoint_checkpoints
     simpoint_filename, weight_filename, interval_length, warmup_length = \
-        options.take_simpoint_checkpoints.split(",", 3)
+        spec.split(",", 3)
     print("simpoint analysis file:", simpoint_filename)
     print("simpoint weight file:", weight_filename)
     print("interval length:", interval_length)
@@ -404,6 +405,149 @@ def restoreSimpointCheckpoint():
     print('Exiting @ tick %i because %s' % (m5.curTick(), exit_cause))
     sys.exit(exit_event.getCode())
 
+def runSimpointChild(simpoint, interval_length, testsys, switch_cpu_list):
+    """Simulate a SimPoint in detail, starting from its warm-up.
+
+    Runs in a child forked at the start of the SimPoint's warm-up. The
+    result is written to simpoint.json in the child's output directory.
+    """
+    import json
+
+    interval, weight, starting_inst_count, actual_warmup_length = simpoint
+
+    m5.switchCpus(testsys, switch_cpu_list, verbose=False)
+    cpu = switch_cpu_list[0][1]
+
+    exit_cause = "simpoint interval done"
+    if actual_warmup_length:
+        cpu.scheduleInstStop(0, actual_warmup_length, "simpoint warmed up")
+        exit_event = m5.simulate()
+        exit_cause = exit_event.getCause()
+
+    insts = 0
+    cycles = 0
+    if exit_cause in ("simpoint warmed up", "simpoint interval done"):
+        m5.stats.reset()
+        start_insts = cpu.totalInsts()
+        cpu.scheduleInstStop(0, interval_length, "simpoint interval done")
+        exit_event = m5.simulate()
+        exit_cause = exit_event.getCause()
+        m5.stats.dump()
+
+        insts = cpu.totalInsts() - start_insts
+        cycles = cpu.resolveStat("numCycles").value
+
+    result = {
+        "interval" : interval,
+        "weight" : weight,
+        "start_inst" : starting_inst_count,
+        "warmup" : actual_warmup_length,
+        "exit_cause" : exit_cause,
+        "insts" : insts,
+        "cycles" : cycles,
+        "cpi" : cycles / insts if insts else None,
+    }
+    with open(joinpath(m5.options.outdir, "simpoint.json"), "w") as f:
+        json.dump(result, f, indent=4)
+
+    sys.exit(0 if exit_cause == "simpoint interval done" else 1)
+
+def runSimpointCampaign(options, simpoints, interval_length, testsys,
+                        switch_cpu_list):
+    """Simulate all the SimPoints from a single fast-forward.
+
+    The system fast-forwards through the program once. At the start of
+    each SimPoint's warm-up, a child is forked that switches to the
+    detailed CPUs and simulates the warm-up and the SimPoint, while the
+    parent carries on fast-forwarding. At most --simpoint-campaign-jobs
+    children run at the same time. Once they are all done, their results
+    are combined into a weighted CPI.
+    """
+    import json
+    import os
+
+    jobs = options.simpoint_campaign_jobs or os.cpu_count() or 1
+    running = {}
+    results = []
+
+    def reap():
+        pid, status = os.wait()
+        index, outdir = running.pop(pid)
+        try:
+            with open(joinpath(outdir, "simpoint.json")) as f:
+                result = json.load(f)
+        except (IOError, ValueError):
+            result = { "exit_cause" : "no result (exit status %d)" % status }
+        result["index"] = index
+        result["outdir"] = outdir
+        results.append(result)
+        print("SimPoint #%d done: %s" % (index, result["exit_cause"]))
+
+    last_start_inst_count = -1
+    exit_cause = "simpoint starting point found"
+    for index, simpoint in enumerate(simpoints):
+        interval, weight, starting_inst_count, actual_warmup_length = simpoint
+        if starting_inst_count != last_start_inst_count:
+            exit_event = m5.simulate()
+
+            # skip checkpoint instructions should they exist
+            while exit_event.getCause() == "checkpoint":
+                print("Found 'checkpoint' exit event...ignoring...")
+                exit_event = m5.simulate()
+
+            exit_cause = exit_event.getCause()
+            if exit_cause != "simpoint starting point found":
+                break
+            last_start_inst_count = starting_inst_count
+
+        while len(running) >= jobs:
+            reap()
+
+        simout = "%%(parent)s/simpoint_%02d" % index
+        pid = m5.fork(simout)
+        if pid == 0:
+            runSimpointChild(simpoint, interval_length, testsys,
+                             switch_cpu_list)
+        running[pid] = (index, simout % { "parent" : m5.options.outdir })
+        print("SimPoint #%d forked @ inst %d (pid %d)" %
+              (index, starting_inst_count, pid))
+
+    print('Fast-forward done @ tick %i because %s' %
+          (m5.curTick(), exit_cause))
+    while running:
+        reap()
+
+    results.sort(key=lambda r: r["index"])
+    done = [ r for r in results if r.get("cpi") is not None ]
+    total_weight = sum(r["weight"] for r in done)
+
+    print("%-6s %-10s %-10s %-14s %-10s" %
+          ("index", "interval", "weight", "insts", "CPI"))
+    for r in results:
+        if r.get("cpi") is not None:
+            print("%-6d %-10d %-10f %-14d %-10f" %
+                  (r["index"], r["interval"], r["weight"], r["insts"],
+                   r["cpi"]))
+        else:
+            print("%-6d failed: %s" % (r["index"], r["exit_cause"]))
+
+    summary = {
+        "simpoints" : results,
+        "total_weight" : total_weight,
+        "weighted_cpi" : None,
+    }
+    if total_weight:
+        summary["weighted_cpi"] = \
+            sum(r["weight"] * r["cpi"] for r in done) / total_weight
+        print("Weighted CPI: %f (%d of %d SimPoints, weight %f)" %
+              (summary["weighted_cpi"], len(done), len(simpoints),
+               total_weight))
+    with open(joinpath(m5.options.outdir, "simpoint_summary.json"),
+              "w") as f:
+        json.dump(summary, f, indent=4)
+
+    sys.exit(0 if len(done) == len(simpoints) else 1)
+
 def repeatSwitch(testsys, repeat_switch_cpu_list, maxtick, switch_freq):
     print("starting switch loop")
     while True:
@@ -651,9 +795,19 @@ def run(options, root, testsys, cpu_class):
             for i in range(np):
                 testsys.cpu[i].max_insts_any_thread = offset
 
-    if options.take_simpoint_checkpoints != None:
+    if options.take_simpoint_checkpoints != None or options.simpoint_campaign:
         simpoints, interval_length = parseSimpointAnalysisFile(options, testsys)
 
+    if options.simpoint_campaign:
+        if options.take_simpoint_checkpoints != None:
+            fatal("Can't specify both --simpoint-campaign and "
+                  "--take-simpoint-checkpoints")
+        if not cpu_class:
+            fatal("--simpoint-campaign needs a --cpu-type to switch to that "
+                  "differs from the fast-forward CPU")
+        # Forking requires the listeners to be disabled
+        m5.disableAllListeners()
+
     checkpoint_dir = None
     if options.checkpoint_restore:
         cpt_starttick, checkpoint_dir = findCptDir(options, cptdir, testsys)
@@ -702,6 +856,10 @@ def run(options, root, testsys, cpu_class):
         fatal("Bad maxtick (%d) specified: " \
               "Checkpoint starts starts from tick: %d", maxtick, cpt_starttick)
 
+    if options.simpoint_campaign:
+        runSimpointCampaign(options, simpoints, interval_length, testsys,
+                            switch_cpu_list)
+
     if options.standard_switch or cpu_class:
         if options.standard_switch:
             print("Switch at instruction count:%s" %
@@ -0,0 +1,140 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark the construction of C++ parameter structs and objects.
+
+This script builds a large, ISA-independent configuration of memory
+testers ("cores"), each with a private L1 cache, sharing a crossbar and
+memory. It then instantiates the configuration and reports how many
+objects per second the createCCObject() pass of m5.instantiate()
+handles. Run it once as is and once with --legacy-params, which uses
+the original per-instance implementation of SimObject.getCCParams(), to
+compare the two.
+
+    build/NULL/gem5.opt configs/example/param_bench.py -n 1024
+    build/NULL/gem5.opt configs/example/param_bench.py -n 1024 \\
+        --legacy-params
+"""
+
+import argparse
+
+import m5
+from m5.objects import *
+from m5.params import VectorParamDesc
+from m5.simulate import instantiate_pass_times, printInstantiateTimes
+from m5.util import fatal
+
+parser = argparse.ArgumentParser(
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+parser.add_argument("-n", "--num-cores", type=int, default=1000,
+                    help="Number of testers (each with a private cache)")
+parser.add_argument("--legacy-params", action="store_true",
+                    help="Build param structs without the per-class plan")
+
+args = parser.parse_args()
+
+# The implementation of SimObject.getCCParams() before param structs
+# were built from a per-class plan. Used as the baseline.
+def legacy_getCCParams(self):
+    if self._ccParams:
+        return self._ccParams
+
+    cc_params_struct = getattr(m5.internal.params, '%sParams' % self.type)
+    cc_params = cc_params_struct()
+    cc_params.name = str(self)
+
+    param_names = list(self._params.keys())
+    param_names.sort()
+    for param in param_names:
+        value = self._values.get(param)
+        if value is None:
+            fatal("%s.%s without default or user set value",
+                  self.path(), param)
+
+        value = value.getValue()
+        if isinstance(self._params[param], VectorParamDesc):
+            assert isinstance(value, list)
+            vec = getattr(cc_params, param)
+            assert not len(vec)
+            if isinstance(vec, list):
+                setattr(cc_params, param, list(value))
+            else:
+                for v in value:
+                    getattr(cc_params, param).append(v)
+        else:
+            setattr(cc_params, param, value)
+
+    port_names = list(self._ports.keys())
+    port_names.sort()
+    for port_name in port_names:
+        port = self._port_refs.get(port_name, None)
+        if port != None:
+            port_count = len(port)
+        else:
+            port_count = 0
+        setattr(cc_params, 'port_' + port_name + '_connection_count',
+                port_count)
+    self._ccParams = cc_params
+    return self._ccParams
+
+if args.legacy_params:
+    SimObject.getCCParams = legacy_getCCParams
+
+system = System(physmem = SimpleMemory(), cache_line_size = 64)
+system.voltage_domain = VoltageDomain(voltage = '1V')
+system.clk_domain = SrcClockDomain(clock = '1GHz',
+                                   voltage_domain = system.voltage_domain)
+system.xbar = L2XBar(point_of_coherency = True)
+system.xbar.mem_side_ports = system.physmem.port
+system.system_port = system.xbar.cpu_side_ports
+
+system.tester = [ MemTest(max_loads = 1) for i in range(args.num_cores) ]
+system.cache = [ Cache(size = '32kB', assoc = 4, tag_latency = 1,
+                       data_latency = 1, response_latency = 1,
+                       mshrs = 4, tgts_per_mshr = 8)
+                 for i in range(args.num_cores) ]
+
+for tester, cache in zip(system.tester, system.cache):
+    tester.port = cache.cpu_side
+    cache.mem_side = system.xbar.cpu_side_ports
+
+root = Root(full_system = False, system = system)
+root.system.mem_mode = 'timing'
+
+m5.instantiate()
+
+num_objects = len(list(root.descendants()))
+times = dict(instantiate_pass_times)
+create_time = times['createCCObject']
+
+print("Parameter implementation: %s" %
+      ("legacy" if args.legacy_params else "per-class plan"))
+print("Objects: %d" % num_objects)
+print("createCCObject pass: %.3fs (%.0f objects/s)" %
+      (create_time, num_objects / create_time))
+printInstantiateTimes()
@@ -0,0 +1,108 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark the host time spent in periodic stat dumps.
+
+This script builds an ISA-independent configuration of memory testers,
+each with a private L1 cache, and runs it in short intervals, dumping
+stats after each one. It reports the average host time per dump for a
+full dump to the registered outputs and for sampled dumps (see
+m5.stats.enableSampling()) of an increasing number of tester stats.
+
+    build/NULL/gem5.opt configs/example/sampled_stats_bench.py -n 16
+"""
+
+import argparse
+import time
+
+import m5
+from m5.objects import *
+
+parser = argparse.ArgumentParser(
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+parser.add_argument("-n", "--num-testers", type=int, default=16,
+                    help="Number of testers (each with a private cache)")
+parser.add_argument("--dumps", type=int, default=100,
+                    help="Number of stat dumps per measurement")
+parser.add_argument("--interval", type=int, default=10000,
+                    help="Ticks simulated between stat dumps")
+
+args = parser.parse_args()
+
+system = System(physmem = SimpleMemory(), cache_line_size = 64)
+system.voltage_domain = VoltageDomain(voltage = '1V')
+system.clk_domain = SrcClockDomain(clock = '1GHz',
+                                   voltage_domain = system.voltage_domain)
+system.xbar = L2XBar(point_of_coherency = True)
+system.xbar.mem_side_ports = system.physmem.port
+system.system_port = system.xbar.cpu_side_ports
+
+system.tester = [ MemTest(max_loads = 0, interval = 10)
+                  for i in range(args.num_testers) ]
+system.cache = [ Cache(size = '32kB', assoc = 4, tag_latency = 1,
+                       data_latency = 1, response_latency = 1,
+                       mshrs = 4, tgts_per_mshr = 8)
+                 for i in range(args.num_testers) ]
+
+for tester, cache in zip(system.tester, system.cache):
+    tester.port = cache.cpu_side
+    cache.mem_side = system.xbar.cpu_side_ports
+
+root = Root(full_system = False, system = system)
+root.system.mem_mode = 'timing'
+
+m5.instantiate()
+
+def measure():
+    elapsed = 0.0
+    for i in range(args.dumps):
+        m5.simulate(args.interval)
+        start = time.perf_counter()
+        m5.stats.dump()
+        elapsed += time.perf_counter() - start
+    return elapsed / args.dumps
+
+# All the stats of the testers, to pick sampled stats from
+tester_stats = [ "%s.%s" % (tester.path(), stat.name)
+                 for tester in system.tester
+                 for stat in tester.getCCObject().getStats() ]
+
+print("Full dump: %.3f ms/dump" % (measure() * 1e3))
+
+count = 1
+while True:
+    count = min(count, len(tester_stats))
+    m5.stats.enableSampling(tester_stats[:count],
+                            path="sampled_bench.ring")
+    print("Sampled dump of %d stats: %.3f ms/dump" %
+          (count, measure() * 1e3))
+    if count == len(tester_stats):
+        break
+    count *= 4
+
+m5.stats.disableSampling()
@@ -0,0 +1,144 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+def file_hash(path):
+    '''Return the SHA-256 hash of a file's contents, or None if it can't
+    be read.'''
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+class OutputCache(object):
+    '''A persistent cache of the files generated from ISA descriptions.
+
+    Entries are keyed by a hash of the flattened ISA description (i.e.,
+    with all its ##include'd files) and of the sources of the parser
+    itself. The Python files the description imports while it is parsed
+    (like the x86 microcode) are recorded in the entry along with their
+    hash, and the entry is only used if they haven't changed since.
+
+    Each entry is a gzip compressed JSON file in the cache directory. Only
+    the most recent entries of each description are kept.'''
+
+    # Version of the format of the entries. Bump this when it changes.
+    version = 1
+
+    # Number of entries kept per description
+    max_entries = 4
+
+    def __init__(self, cache_dir, sources):
+        self.cache_dir = cache_dir
+
+        h = hashlib.sha256(b'%d\n' % self.version)
+        for source in sorted(sources):
+            h.update(('%s %s\n' % (source, file_hash(source))).encode())
+        self.sources_hash = h.hexdigest()
+
+    def _prefix(self, name):
+        return name.replace(os.sep, '_') + '-'
+
+    def _path(self, name, desc):
+        h = hashlib.sha256(self.sources_hash.encode())
+        h.update(name.encode())
+        h.update(b'\0')
+        h.update(desc.encode())
+        return os.path.join(self.cache_dir,
+                            self._prefix(name) + h.hexdigest() + '.json.gz')
+
+    def lookup(self, name, desc):
+        '''Return the outputs generated from the description, as a dict of
+        file names to contents, or None if they aren't in the cache.'''
+        path = self._path(name, desc)
+        try:
+            with gzip.open(path, 'rt') as f:
+                entry = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+
+        for dep, dep_hash in entry['deps'].items():
+            if file_hash(dep) != dep_hash:
+                return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['outputs']
+
+    def store(self, name, desc, outputs, deps):
+        '''Store the outputs generated from the description, which
+        imported the given (Python) files.'''
+        entry = {
+            'deps' : dict((dep, file_hash(dep)) for dep in sorted(deps)),
+            'outputs' : outputs,
+        }
+
+        path = self._path(name, desc)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir,
+                                            suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as raw, \
+                     gzip.open(raw, 'wt', compresslevel=1) as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            # The cache is only an optimization
+            return
+
+        self.prune(name)
+
+    def prune(self, name):
+        '''Remove all but the most recently used entries of a
+        description.'''
+        pattern = os.path.join(glob.escape(self.cache_dir),
+                               glob.escape(self._prefix(name)) + '*.json.gz')
+        entries = []
+        for path in glob.glob(pattern):
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        entries.sort(reverse=True)
+        for mtime, path in entries[self.max_entries:]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -37,14 +37,18 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import glob
+import io
 import os
 import re
 import sys
+import time
 import traceback
 # get type names
 from types import *
 
 from m5.util.grammar import Grammar
+from .cache import OutputCache
 from .operand_list import *
 from .operand_types import *
 from .util import *
@@ -59,43 +63,56 @@ debug=False
 
 labelRE = re.compile(r'(?<!%)%\(([^\)]+)\)[sd]')
 
+class TemplateLookup(object):
+    '''Looks up the names substituted in a template in a stack of
+    dictionaries, the first one that has a name providing its value. This
+    is what a copy of their union (updated with the first one last) would
+    do, without making the copy. Hidden names are only looked up in the
+    first dictionary.'''
+    __slots__ = ('maps', 'hidden')
+
+    def __init__(self, *maps, hidden=()):
+        self.maps = maps
+        self.hidden = hidden
+
+    def __getitem__(self, key):
+        maps = self.maps
+        if key in self.hidden:
+            maps = maps[:1]
+        for m in maps:
+            if key in m:
+                return m[key]
+        raise KeyError(key)
+
 class Template(object):
     def __init__(self, parser, t):
         self.parser = parser
         self.template = t
 
-    def subst(self, d):
-        myDict = None
-
-        # Protect non-Python-dict substitutions (e.g. if there's a printf
-        # in the templated C++ code)
-        template = protectNonSubstPercents(self.template)
+        # Compile the template once: protect non-Python-dict
+        # substitutions (e.g. if there's a printf in the templated C++
+        # code) and find the labels it substitutes, in order.
+        self.protected = protectNonSubstPercents(t)
+        self.labels = list(dict.fromkeys(labelRE.findall(self.protected)))
 
-        # Build a dict ('myDict') to use for the template substitution.
-        # Start with the template namespace.  Make a copy since we're
-        # going to modify it.
-        myDict = self.parser.templateMap.copy()
+    def subst(self, d):
+        template = self.protected
+        templateMap = self.parser.templateMap
 
         if isinstance(d, InstObjParams):
             # If we're dealing with an InstObjParams object, we need
             # to be a little more sophisticated.  The instruction-wide
             # parameters are already formed, but the parameters which
             # are only function wide still need to be generated.
-            compositeCode = ''
-
-            myDict.update(d.__dict__)
-            # The "operands" and "snippets" attributes of the InstObjParams
-            # objects are for internal use and not substitution.
-            del myDict['operands']
-            del myDict['snippets']
-
-            snippetLabels = [l for l in labelRE.findall(template)
-                             if l in d.snippets]
+            snippetLabels = [l for l in self.labels if l in d.snippets]
 
             snippets = dict([(s, self.parser.mungeSnippet(d.snippets[s]))
                              for s in snippetLabels])
 
-            myDict.update(snippets)
+            # Build a dict ('myDict') of the function wide parameters. It
+            # is looked up first, then the instruction-wide parameters
+            # and finally the template namespace.
+            myDict = dict(snippets)
 
             compositeCode = ' '.join(list(map(str, snippets.values())))
 
@@ -103,7 +120,8 @@ class Template(object):
             # operands explicitly (like Mem)
             compositeCode += ' ' + template
 
-            operands = SubOperandList(self.parser, compositeCode, d.operands)
+            operands = SubOperandList(self.parser, compositeCode, d.operands,
+                                      self.parser.operandBases(compositeCode))
 
             myDict['reg_idx_arr_decl'] = \
                 'RegId srcRegIdxArr[%d]; RegId destRegIdxArr[%d]' % \
@@ -170,15 +188,19 @@ class Template(object):
                     op_wb_str = op_desc.op_wb + op_wb_str
             myDict['op_wb'] = op_wb_str
 
+            # The "operands" and "snippets" attributes of the InstObjParams
+            # objects are for internal use and not substitution.
+            lookup = TemplateLookup(myDict, d.__dict__, templateMap,
+                                    hidden=('operands', 'snippets'))
         elif isinstance(d, dict):
             # if the argument is a dictionary, we just use it.
-            myDict.update(d)
+            lookup = TemplateLookup(d, templateMap)
         elif hasattr(d, '__dict__'):
             # if the argument is an object, we use its attribute map.
-            myDict.update(d.__dict__)
+            lookup = TemplateLookup(d.__dict__, templateMap)
         else:
             raise TypeError("Template.subst() arg must be or have dictionary")
-        return template % myDict
+        return template % lookup
 
     # Convert to string.
     def __str__(self):
@@ -481,11 +503,43 @@ class InstObjParams(object):
 #   parses ISA DSL and emits C++ headers and source
 #
 
+class OutputFile(io.StringIO):
+    '''A file generated by the ISA parser. Its contents are only written
+    out when it is closed, by ISAParser.write_output().'''
+    def __init__(self, parser, name):
+        super(OutputFile, self).__init__()
+        self.parser = parser
+        self.name = name
+
+    def close(self):
+        if not self.closed:
+            self.parser.write_output(self.name, self.getvalue())
+        super(OutputFile, self).close()
+
+def parser_sources():
+    '''The source files of the parser, which the generated files depend
+    on.'''
+    pkg_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = glob.glob(os.path.join(pkg_dir, '*.py'))
+    for name in (Grammar.__module__, 'ply.lex', 'ply.yacc'):
+        module = sys.modules.get(name)
+        if module and getattr(module, '__file__', None):
+            sources.append(os.path.abspath(module.__file__))
+    micro_asm = os.path.join(os.path.dirname(pkg_dir), 'micro_asm.py')
+    if os.path.isfile(micro_asm):
+        sources.append(micro_asm)
+    return sources
+
 class ISAParser(Grammar):
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, cache_dir=None):
         super(ISAParser, self).__init__()
         self.output_dir = output_dir
 
+        # Directory of the cache of generated files (see OutputCache), if
+        # any, and the contents of the files generated so far.
+        self.cache_dir = cache_dir
+        self.outputs = {}
+
         self.filename = None # for output file watermarking/scaremongering
 
         # variable to hold templates
@@ -498,6 +552,12 @@ class ISAParser(Grammar):
         self._operandsRE = None
         self._operandsWithExtRE = None
 
+        # Munged snippets and the operands found in code blocks, which are
+        # memoized as the same code is substituted in many templates. See
+        # mungeSnippet() and operandBases().
+        self._mungedSnippets = {}
+        self._operandBases = {}
+
         # This dictionary maps format name strings to Format objects.
         self.formatMap = {}
 
@@ -1558,6 +1618,10 @@ StaticInstPtr
         self._operandsWithExtRE = \
             re.compile(operandsWithExtREString, re.MULTILINE)
 
+        # Anything computed with the old expressions is stale
+        self._mungedSnippets = {}
+        self._operandBases = {}
+
     def substMungedOpNames(self, code):
         '''Munge operand names in code string to make legal C++
         variable names.  This means getting rid of the type extension
@@ -1567,26 +1631,49 @@ StaticInstPtr
     def mungeSnippet(self, s):
         '''Fix up code snippets for final substitution in templates.'''
         if isinstance(s, str):
-            return self.substMungedOpNames(substBitOps(s))
+            munged = self._mungedSnippets.get(s)
+            if munged is None:
+                munged = self.substMungedOpNames(substBitOps(s))
+                self._mungedSnippets[s] = munged
+            return munged
         else:
             return s
 
+    def operandBases(self, code):
+        '''Find the bases of the operands used in a code block.'''
+        bases = self._operandBases.get(code)
+        if bases is None:
+            bases = findOperandBases(self, code)
+            self._operandBases[code] = bases
+        return bases
+
     def open(self, name, bare=False):
         '''Open the output file for writing and include scary warning.'''
-        filename = os.path.join(self.output_dir, name)
-        f = open(filename, 'w')
-        if f:
-            if not bare:
-                f.write(ISAParser.scaremonger_template % self)
+        f = OutputFile(self, name)
+        if not bare:
+            f.write(ISAParser.scaremonger_template % self)
         return f
 
     def update(self, file, contents):
-        '''Update the output file only.  Scons should handle the case when
-        the new contents are unchanged using its built-in hash feature.'''
+        '''Update the output file only.'''
         f = self.open(file)
         f.write(contents)
         f.close()
 
+    def write_output(self, name, contents):
+        '''Write an output file, unless it already has these contents so
+        that it (and its modification time) is left untouched.'''
+        self.outputs[name] = contents
+        filename = os.path.join(self.output_dir, name)
+        try:
+            with open(filename, 'r') as f:
+                if f.read() == contents:
+                    return
+        except (OSError, UnicodeDecodeError):
+            pass
+        with open(filename, 'w') as f:
+            f.write(contents)
+
     # This regular expression matches '##include' directives
     includeRE = re.compile(r'^\s*##include\s+"(?P<filename>[^"]*)".*$',
                            re.MULTILINE)
@@ -1647,12 +1734,45 @@ StaticInstPtr
         # do this up front.
         isa_desc = self.read_and_flatten(isa_desc_file)
 
+        # If the same description was already parsed by the same parser,
+        # its outputs are in the cache.
+        cache = None
+        if self.cache_dir:
+            cache = OutputCache(self.cache_dir, parser_sources())
+            outputs = cache.lookup(self.filename, isa_desc)
+            if outputs is not None:
+                for name, contents in sorted(outputs.items()):
+                    self.write_output(name, contents)
+                ISAParser.AlreadyGenerated[isa_desc_file] = None
+                return
+        modules = set(sys.modules.keys())
+        start = time.time()
+
         # Initialize lineno tracker
         self.lex.lineno = LineTracker(isa_desc_file)
 
         # Parse.
         self.parse_string(isa_desc)
 
+        if cache:
+            # The outputs also depend on the Python modules imported by
+            # the description, which are the modules imported during the
+            # parse and those from the description's directory (which
+            # might have been imported earlier). Files written during the
+            # parse, like PLY tables, are outputs rather than inputs.
+            isa_dir = os.path.dirname(os.path.abspath(isa_desc_file))
+            deps = []
+            for name, module in list(sys.modules.items()):
+                path = getattr(module, '__file__', None)
+                if not path or not os.path.isfile(path) or \
+                        os.path.getmtime(path) >= start:
+                    continue
+                path = os.path.abspath(path)
+                if name not in modules or \
+                        path.startswith(isa_dir + os.sep):
+                    deps.append(path)
+            cache.store(self.filename, isa_desc, self.outputs, deps)
+
         ISAParser.AlreadyGenerated[isa_desc_file] = None
 
     def parse_isa_desc(self, *args, **kwargs):
@@ -1665,6 +1785,6 @@ StaticInstPtr
             sys.exit(1)
 
 # Called as script: get args from command line.
-# Args are: <isa desc file> <output dir>
+# Args are: <isa desc file> <output dir> [<cache dir>]
 if __name__ == '__main__':
-    ISAParser(sys.argv[2]).parse_isa_desc(sys.argv[1])
+    ISAParser(*sys.argv[2:4]).parse_isa_desc(sys.argv[1])
@@ -183,21 +183,33 @@ class OperandList(object):
     def sort(self):
         self.items.sort(key=lambda a: a.sort_pri)
 
+def findOperandBases(parser, code):
+    '''Find the bases of the operands used in the given code block, in the
+    order they first appear.  Elements of vector operands aren't mapped to
+    their vector operands.'''
+    # delete strings and comments so we don't match on operands inside
+    for regEx in (stringRE, commentRE):
+        code = regEx.sub('', code)
+
+    # search for operands
+    bases = {}
+    for match in parser.operandsRE().finditer(code):
+        # regexp groups are operand full name, base, and extension
+        bases[match.group(2)] = True
+    return list(bases.keys())
+
 class SubOperandList(OperandList):
     '''Find all the operands in the given code block.  Returns an operand
-    descriptor list (instance of class OperandList).'''
-    def __init__(self, parser, code, requestor_list):
+    descriptor list (instance of class OperandList).  If the bases of the
+    operands in the code block are already known (see findOperandBases()),
+    they can be passed in to avoid scanning the code again.'''
+    def __init__(self, parser, code, requestor_list, op_bases=None):
         self.items = []
         self.bases = {}
-        # delete strings and comments so we don't match on operands inside
-        for regEx in (stringRE, commentRE):
-            code = regEx.sub('', code)
+        if op_bases is None:
+            op_bases = findOperandBases(parser, code)
 
-        # search for operands
-        for match in parser.operandsRE().finditer(code):
-            op = match.groups()
-            # regexp groups are operand full name, base, and extension
-            (op_full, op_base, op_ext) = op
+        for op_base in op_bases:
             # If is a elem operand, define or update the corresponding
             # vector operand
             if op_base in parser.elemToVector:
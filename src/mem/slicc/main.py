@@ -27,8 +27,10 @@
 
 import os
 import sys
+import time
 
 from slicc.parser import SLICC
+from slicc.symbols import StateMachine
 
 usage="%prog [options] <slicc file> ... "
 version="%prog v0.4"
@@ -69,6 +71,10 @@ def main(args=None):
                       help="Print files that SLICC will generate")
     parser.add_option("--tb", "--traceback", action='store_true',
                       help="print traceback on error")
+    parser.add_option("-j", "--jobs", type="int", default=1,
+                      help="Number of processes writing C++ files")
+    parser.add_option("-T", "--timings", action='store_true',
+                      help="Print the time it takes to write each machine")
     parser.add_option("-q", "--quiet",
                       help="don't print messages")
     opts,files = parser.parse_args(args=args)
@@ -106,7 +112,20 @@ def main(args=None):
             slicc.writeHTMLFiles(opts.html_path)
 
         output("Writing C++ files...")
-        slicc.writeCodeFiles(opts.code_path, [])
+        start = time.time()
+        times = slicc.writeCodeFiles(opts.code_path, [], opts.jobs)
+        elapsed = time.time() - start
+
+        if opts.timings:
+            types_time = 0
+            for symbol, t in times:
+                if isinstance(symbol, StateMachine):
+                    output("    %-32s %7.3fs", symbol.ident, t)
+                else:
+                    types_time += t
+            output("    %-32s %7.3fs", "(types)", types_time)
+            output("    %-32s %7.3fs", "(total, %d jobs)" % opts.jobs,
+                   elapsed)
 
 
     output("SLICC is Done.")
@@ -75,8 +75,8 @@ class SLICC(Grammar):
     def process(self):
         self.decl_list.generate()
 
-    def writeCodeFiles(self, code_path, includes):
-        self.symtab.writeCodeFiles(code_path, includes)
+    def writeCodeFiles(self, code_path, includes, jobs=1):
+        return self.symtab.writeCodeFiles(code_path, includes, jobs)
 
     def writeHTMLFiles(self, html_path):
         self.symtab.writeHTMLFiles(html_path)
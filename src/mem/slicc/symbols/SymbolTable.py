@@ -25,6 +25,9 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import multiprocessing
+import time
+
 from m5.util import makeDir
 
 from slicc.generate import html
@@ -32,6 +35,21 @@ from slicc.symbols.StateMachine import StateMachine
 from slicc.symbols.Type import Type
 from slicc.util import Location
 
+# The symbol table whose code is being written by a pool of processes. The
+# processes are forked once it is set, so they have their own copy of it
+# (and of all the symbols) without pickling anything.
+_pool_symtab = None
+
+def _write_symbol_code(symbol, path, includes):
+    start = time.time()
+    symbol.writeCodeFiles(path, includes)
+    return time.time() - start
+
+def _pool_write_symbol_code(task):
+    index, path, includes = task
+    symbol = _pool_symtab.sym_vec[index]
+    return index, _write_symbol_code(symbol, path, includes)
+
 class SymbolTable(object):
     def __init__(self, slicc):
         self.slicc = slicc
@@ -122,7 +140,10 @@ class SymbolTable(object):
             if isinstance(symbol, type):
                 yield symbol
 
-    def writeCodeFiles(self, path, includes):
+    def writeCodeFiles(self, path, includes, jobs=1):
+        '''Write the code of all the symbols, with up to jobs processes.
+        Returns a list of the machines and types with the time it took to
+        write each of them.'''
         makeDir(path)
 
         code = self.codeFormatter()
@@ -136,8 +157,34 @@ class SymbolTable(object):
 
         code.write(path, "Types.hh")
 
-        for symbol in self.sym_vec:
-            symbol.writeCodeFiles(path, includes)
+        # The machines and types are written independently of each other,
+        # so they can be written by a pool of processes. The machines are
+        # the largest, so they go first.
+        machines = [ i for i, symbol in enumerate(self.sym_vec)
+                     if isinstance(symbol, StateMachine) ]
+        types = [ i for i, symbol in enumerate(self.sym_vec)
+                  if isinstance(symbol, Type) ]
+        tasks = [ (i, path, includes) for i in machines + types ]
+
+        times = {}
+        if jobs > 1 and len(tasks) > 1 and \
+                'fork' in multiprocessing.get_all_start_methods():
+            global _pool_symtab
+            _pool_symtab = self
+            try:
+                ctx = multiprocessing.get_context('fork')
+                with ctx.Pool(min(jobs, len(tasks))) as pool:
+                    for i, t in pool.imap_unordered(_pool_write_symbol_code,
+                                                    tasks):
+                        times[i] = t
+            finally:
+                _pool_symtab = None
+
+        for i, symbol in enumerate(self.sym_vec):
+            if i not in times:
+                times[i] = _write_symbol_code(symbol, path, includes)
+
+        return [ (self.sym_vec[i], times[i]) for i in machines + types ]
 
     def writeHTMLFiles(self, path):
         makeDir(path)
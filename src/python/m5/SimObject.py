@@ -38,6 +38,7 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
 import sys
 from types import FunctionType, MethodType, ModuleType
 from functools import wraps
@@ -569,9 +570,21 @@ class MetaSimObject(type):
         assert(not hasattr(pdesc, 'name'))
         pdesc.name = name
         cls._params[name] = pdesc
+        cls._clear_param_memos()
         if hasattr(pdesc, 'default'):
             cls._set_param(name, pdesc.default, pdesc)
 
+    # Forget what _paramsOfType() and _getCCParamsPlan() memoized for
+    # this class and its subclasses, which inherit its params and ports.
+    def _clear_param_memos(cls):
+        classes = [ cls ]
+        while classes:
+            c = classes.pop()
+            for memo in ('_paramsByType', '_ccParamsPlan'):
+                if memo in c.__dict__:
+                    type.__delattr__(c, memo)
+            classes.extend(type.__subclasses__(c))
+
     def _set_param(cls, name, value, param):
         assert(param.name == name)
         try:
@@ -608,6 +621,7 @@ class MetaSimObject(type):
         assert(not hasattr(port, 'name'))
         port.name = name
         cls._ports[name] = port
+        cls._clear_param_memos()
 
     # same as _get_port_ref, effectively, but for classes
     def _cls_get_port_ref(cls, attr):
@@ -700,6 +714,52 @@ class MetaSimObject(type):
     def getCCClass(cls):
         return getattr(m5.internal.params, cls.pybind_class)
 
+    # Return the names of the params of this class whose type is ptype
+    # or a subclass of it.  The result only depends on the class, so it
+    # is memoized per class and type for find_any() and find_all().
+    def _paramsOfType(cls, ptype):
+        memo = cls.__dict__.get('_paramsByType')
+        if memo is None:
+            memo = {}
+            type.__setattr__(cls, '_paramsByType', memo)
+        names = memo.get(ptype)
+        if names is None:
+            names = tuple(pname for pname, pdesc in cls._params.items()
+                          if issubclass(pdesc.ptype, ptype))
+            memo[ptype] = names
+        return names
+
+    # Return the plan used by SimObject.getCCParams() to fill in the
+    # C++ param struct of instances of this class: the struct type,
+    # (name, is_vector, is_opaque) for each param in sorted order and
+    # (name, count field) for each port in sorted order.  None of this
+    # depends on the instance, so it is computed once per class and
+    # shared by all of its instances.
+    def _getCCParamsPlan(cls):
+        plan = cls.__dict__.get('_ccParamsPlan')
+        if plan is not None:
+            return plan
+
+        cc_params_struct = getattr(m5.internal.params, '%sParams' % cls.type)
+        probe = cc_params_struct()
+
+        params = []
+        for param in sorted(cls._params.keys()):
+            is_vector = isinstance(cls._params[param], VectorParamDesc)
+            # Some types are exposed as opaque types. They support
+            # the append operation unlike the automatically
+            # wrapped types.
+            is_opaque = is_vector and \
+                not isinstance(getattr(probe, param), list)
+            params.append((param, is_vector, is_opaque))
+
+        ports = [ (port_name, 'port_' + port_name + '_connection_count')
+                  for port_name in sorted(cls._ports.keys()) ]
+
+        plan = (cc_params_struct, tuple(params), tuple(ports))
+        type.__setattr__(cls, '_ccParamsPlan', plan)
+        return plan
+
     # See ParamValue.cxx_predecls for description.
     def cxx_predecls(cls, code):
         code('#include "params/$cls.hh"')
@@ -1324,6 +1384,8 @@ class SimObject(object, metaclass=MetaSimObject):
         self._ccObject = None  # pointer to C++ object
         self._ccParams = None
         self._instantiated = False # really "cloned"
+        self._descendants = None # cached result of descendants()
+        self._hierarchyIndex = None # see _getHierarchyIndex()
 
         # Clone children specified at class level.  No need for a
         # multidict here since we will be cloning everything.
@@ -1509,6 +1571,7 @@ class SimObject(object, metaclass=MetaSimObject):
         child = self._children[name]
         child.clear_parent(self)
         del self._children[name]
+        self._invalidate_descendants()
 
     # Add a new child to this object.
     def add_child(self, name, child):
@@ -1527,6 +1590,7 @@ class SimObject(object, metaclass=MetaSimObject):
         if not isNullPointer(child):
             child.set_parent(self, name)
             self._children[name] = child
+            self._invalidate_descendants()
 
     # Take SimObject-valued parameters that haven't been explicitly
     # assigned as children and make them children of the object that
@@ -1588,43 +1652,40 @@ class SimObject(object, metaclass=MetaSimObject):
                           (found_obj.path, child.path))
                 found_obj = child
         # search param space
-        for pname,pdesc in self._params.items():
-            if issubclass(pdesc.ptype, ptype):
-                match_obj = self._values[pname]
-                if found_obj != None and found_obj != match_obj:
-                    raise AttributeError(
-                          'parent.any matched more than one: %s and %s' % \
-                          (found_obj.path, match_obj.path))
-                found_obj = match_obj
+        for pname in type(self)._paramsOfType(ptype):
+            match_obj = self._values[pname]
+            if found_obj != None and found_obj != match_obj:
+                raise AttributeError(
+                      'parent.any matched more than one: %s and %s' % \
+                      (found_obj.path, match_obj.path))
+            found_obj = match_obj
         return found_obj, found_obj != None
 
+    # Find all objects of type ptype below this object, either as
+    # children (at any depth) or as param values of this object or of
+    # any object below it.  The result is sorted by path.
     def find_all(self, ptype):
-        all = {}
-        # search children
-        for child in self._children.values():
-            # a child could be a list, so ensure we visit each item
-            if isinstance(child, list):
-                children = child
-            else:
-                children = [child]
-
-            for child in children:
-                if isinstance(child, ptype) and not isproxy(child) and \
-                        not isNullPointer(child):
-                    all[child] = True
-                if isSimObject(child):
-                    # also add results from the child itself
-                    child_all, done = child.find_all(ptype)
-                    all.update(dict(zip(child_all, [done] * len(child_all))))
-        # search param space
-        for pname,pdesc in self._params.items():
-            if issubclass(pdesc.ptype, ptype):
-                match_obj = self._values[pname]
-                if not isproxy(match_obj) and not isNullPointer(match_obj):
-                    all[match_obj] = True
-        # Also make sure to sort the keys based on the objects' path to
-        # ensure that the order is the same on all hosts
-        return sorted(all.keys(), key = lambda o: o.path()), True
+        return self._getHierarchyIndex().find_all(self, ptype), True
+
+    # Return the index of the hierarchy this object is part of.  The
+    # index is attached to the top-most object and built from its
+    # descendant list, so any change that drops that list (e.g.,
+    # add_child()) also causes the index to be rebuilt.
+    def _getHierarchyIndex(self):
+        top = self
+        while isSimObject(top._parent):
+            top = top._parent
+        top.descendants()
+        index = top._hierarchyIndex
+        if index is None or index.objects is not top._descendants:
+            index = SimObjectIndex(top._descendants)
+            top._hierarchyIndex = index
+        if self not in index.position:
+            # Stale parent pointer (e.g., an object that has been
+            # replaced in a SimObjectVector), only index our subtree.
+            self.descendants()
+            return SimObjectIndex(self._descendants)
+        return index
 
     def unproxy(self, base):
         return self
@@ -1651,36 +1712,41 @@ class SimObject(object, metaclass=MetaSimObject):
                 port.unproxy(self)
 
     def print_ini(self, ini_file):
-        print('[' + self.path() + ']', file=ini_file)    # .ini section header
-
         instanceDict[self.path()] = self
+        ini_file.write(self.ini_section())
+
+    # Return the config.ini section describing this object as a single
+    # string, including the trailing blank line.
+    def ini_section(self):
+        lines = [ '[' + self.path() + ']' ]    # .ini section header
 
         if hasattr(self, 'type'):
-            print('type=%s' % self.type, file=ini_file)
+            lines.append('type=%s' % self.type)
 
         if len(self._children.keys()):
-            print('children=%s' %
-                  ' '.join(self._children[n].get_name()
-                           for n in sorted(self._children.keys())),
-                  file=ini_file)
+            lines.append('children=%s' %
+                         ' '.join(self._children[n].get_name()
+                                  for n in sorted(self._children.keys())))
 
         for param in sorted(self._params.keys()):
             value = self._values.get(param)
             if value != None:
-                print('%s=%s' % (param, self._values[param].ini_str()),
-                      file=ini_file)
+                lines.append('%s=%s' % (param, value.ini_str()))
 
         for port_name in sorted(self._ports.keys()):
             port = self._port_refs.get(port_name, None)
             if port != None:
-                print('%s=%s' % (port_name, port.ini_str()), file=ini_file)
+                lines.append('%s=%s' % (port_name, port.ini_str()))
 
-        print(file=ini_file)        # blank line between objects
+        lines.append('')        # blank line between objects
+        lines.append('')
+        return '\n'.join(lines)
 
-    # generate a tree of dictionaries expressing all the parameters in the
-    # instantiated system for use by scripts that want to do power, thermal
-    # visualization, and other similar tasks
-    def get_config_as_dict(self):
+    # Return the entries of this object's config.json dictionary
+    # without expanding its children, which are left as SimObjects (or
+    # SimObjectVectors).  This lets writers walk the hierarchy
+    # without building the whole dictionary tree first.
+    def config_items(self):
         d = attrdict()
         if hasattr(self, 'type'):
             d.type = self.type
@@ -1697,11 +1763,10 @@ class SimObject(object, metaclass=MetaSimObject):
                 d[param] = value.config_value()
 
         for n in sorted(self._children.keys()):
-            child = self._children[n]
             # Use the name of the attribute (and not get_name()) as
             # the key in the JSON dictionary to capture the hierarchy
             # in the Python code that assembled this system
-            d[n] = child.get_config_as_dict()
+            d[n] = self._children[n]
 
         for port_name in sorted(self._ports.keys()):
             port = self._port_refs.get(port_name, None)
@@ -1712,48 +1777,52 @@ class SimObject(object, metaclass=MetaSimObject):
 
         return d
 
+    # generate a tree of dictionaries expressing all the parameters in the
+    # instantiated system for use by scripts that want to do power, thermal
+    # visualization, and other similar tasks
+    def get_config_as_dict(self):
+        d = self.config_items()
+        for key, value in d.items():
+            if isSimObjectOrVector(value):
+                d[key] = value.get_config_as_dict()
+        return d
+
     def getCCParams(self):
         if self._ccParams:
             return self._ccParams
 
-        cc_params_struct = getattr(m5.internal.params, '%sParams' % self.type)
+        cc_params_struct, params, ports = type(self)._getCCParamsPlan()
         cc_params = cc_params_struct()
         cc_params.name = str(self)
 
-        param_names = list(self._params.keys())
-        param_names.sort()
-        for param in param_names:
-            value = self._values.get(param)
+        values = self._values
+        for param, is_vector, is_opaque in params:
+            value = values.get(param)
             if value is None:
                 fatal("%s.%s without default or user set value",
                       self.path(), param)
 
             value = value.getValue()
-            if isinstance(self._params[param], VectorParamDesc):
+            if not is_vector:
+                setattr(cc_params, param, value)
+            elif is_opaque:
                 assert isinstance(value, list)
                 vec = getattr(cc_params, param)
                 assert not len(vec)
-                # Some types are exposed as opaque types. They support
-                # the append operation unlike the automatically
-                # wrapped types.
-                if isinstance(vec, list):
-                    setattr(cc_params, param, list(value))
-                else:
-                    for v in value:
-                        getattr(cc_params, param).append(v)
+                for v in value:
+                    vec.append(v)
             else:
-                setattr(cc_params, param, value)
+                assert isinstance(value, list)
+                setattr(cc_params, param, list(value))
 
-        port_names = list(self._ports.keys())
-        port_names.sort()
-        for port_name in port_names:
-            port = self._port_refs.get(port_name, None)
+        port_refs = self._port_refs
+        for port_name, count_name in ports:
+            port = port_refs.get(port_name, None)
             if port != None:
                 port_count = len(port)
             else:
                 port_count = 0
-            setattr(cc_params, 'port_' + port_name + '_connection_count',
-                    port_count)
+            setattr(cc_params, count_name, port_count)
         self._ccParams = cc_params
         return self._ccParams
 
@@ -1776,15 +1845,42 @@ class SimObject(object, metaclass=MetaSimObject):
                   % self.path())
         return self._ccObject
 
+    # Return an iterator over this object and all the objects below it
+    # in the configuration hierarchy.  The flattened list is built
+    # once and cached, so repeated walks (e.g., the passes in
+    # m5.instantiate()) don't have to re-sort every _children dict.
+    # The cache is dropped by add_child() and clear_child().
     def descendants(self):
+        if self._descendants is None:
+            objs = [ self ]
+            # The order of the dict is implementation dependent, so sort
+            # it based on the key (name) to ensure the order is the same
+            # on all hosts
+            for (name, child) in sorted(self._children.items()):
+                objs.extend(child.descendants())
+            self._descendants = tuple(objs)
+        return iter(self._descendants)
+
+    # Walk the hierarchy without consulting or building the descendant
+    # cache.  Children added to an object while the walk is in
+    # progress are visited, which is what passes that modify the
+    # hierarchy (e.g., adoptOrphanParams()) rely on.
+    def walk_descendants(self):
         yield self
-        # The order of the dict is implementation dependent, so sort
-        # it based on the key (name) to ensure the order is the same
-        # on all hosts
         for (name, child) in sorted(self._children.items()):
-            for obj in child.descendants():
+            for obj in child.walk_descendants():
                 yield obj
 
+    # Drop the cached descendant list of this object and of all its
+    # ancestors.  A cached list on an object implies cached lists on
+    # everything below it, so we can stop at the first object without
+    # one.
+    def _invalidate_descendants(self):
+        obj = self
+        while isSimObject(obj) and obj._descendants is not None:
+            obj._descendants = None
+            obj = obj._parent
+
     # Call C++ to create C++ object corresponding to this object
     def createCCObject(self):
         self.getCCParams()
@@ -1853,6 +1949,80 @@ class SimObject(object, metaclass=MetaSimObject):
         d = self._apply_config_get_dict()
         return eval(simobj_path, d)
 
+# Index of all the objects in a configuration hierarchy that answers
+# SimObject.find_all() queries without walking the hierarchy.  Objects
+# are numbered in descendants() order, which places every subtree in a
+# contiguous range, so the objects of a type below a given object can
+# be found by bisecting a sorted list of positions.  Per-type lists
+# and paths are computed the first time they are needed.  Param values
+# are read when the query is made since they may change (e.g., when
+# proxies are resolved) without the hierarchy changing.
+class SimObjectIndex(object):
+    def __init__(self, objects):
+        self.objects = objects
+        self.position = { obj : i for i, obj in enumerate(objects) }
+        self._instances = {}
+        self._params = {}
+        self._paths = {}
+
+    def path(self, obj):
+        p = self._paths.get(obj)
+        if p is None:
+            p = obj.path()
+            self._paths[obj] = p
+        return p
+
+    # Sorted positions of the objects that are instances of ptype
+    def instances(self, ptype):
+        positions = self._instances.get(ptype)
+        if positions is None:
+            positions = [ i for i, obj in enumerate(self.objects)
+                          if isinstance(obj, ptype) ]
+            self._instances[ptype] = positions
+        return positions
+
+    # Sorted positions of the objects with params of type ptype along
+    # with the corresponding (position, param name) pairs
+    def params(self, ptype):
+        entry = self._params.get(ptype)
+        if entry is None:
+            positions = []
+            params = []
+            for i, obj in enumerate(self.objects):
+                for pname in type(obj)._paramsOfType(ptype):
+                    positions.append(i)
+                    params.append((i, pname))
+            entry = (positions, params)
+            self._params[ptype] = entry
+        return entry
+
+    def find_all(self, obj, ptype):
+        start = self.position[obj]
+        end = start + len(obj._descendants)
+
+        all = {}
+        # search children, not including obj itself
+        positions = self.instances(ptype)
+        lo = bisect.bisect_right(positions, start)
+        hi = bisect.bisect_left(positions, end)
+        for i in positions[lo:hi]:
+            child = self.objects[i]
+            if not isproxy(child) and not isNullPointer(child):
+                all[child] = True
+
+        # search param space
+        positions, params = self.params(ptype)
+        lo = bisect.bisect_left(positions, start)
+        hi = bisect.bisect_left(positions, end)
+        for i, pname in params[lo:hi]:
+            match_obj = self.objects[i]._values[pname]
+            if not isproxy(match_obj) and not isNullPointer(match_obj):
+                all[match_obj] = True
+
+        # Also make sure to sort the keys based on the objects' path to
+        # ensure that the order is the same on all hosts
+        return sorted(all.keys(), key=self.path)
+
 # Function to provide to C++ so it can look up instances based on paths
 def resolveSimObject(name):
     obj = instanceDict[name]
@@ -31,6 +31,8 @@ from .statistic import Statistic
 from .storagetype import StorageType
 from .timeconversion import TimeConversion
 from .jsonloader import JsonLoader
+from .lazyloader import LazyLoader
+from .columnar import ColumnarStatsReader, ColumnarStatsWriter
 
 __all__ = [
            "Group",
@@ -40,4 +42,7 @@ __all__ = [
            "StorageType",
            "JsonSerializable",
            "JsonLoader",
+           "LazyLoader",
+           "ColumnarStatsReader",
+           "ColumnarStatsWriter",
           ]
@@ -0,0 +1,272 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+A columnar, append-only store for the statistics of many stats dumps.
+
+Each dump is a row and each statistic is a column. Rows are buffered in
+memory and written in chunks: a chunk file holds a float64 matrix in
+column-major order, so the values of one statistic for all the rows of
+a chunk are contiguous on disk. A JSON manifest lists the column names
+(in the order they were first seen) and, for each chunk, its file, its
+ticks and how many columns it holds. Columns that were added after a
+chunk was written, and statistics that are missing from a dump, read
+as NaN.
+
+The writer only uses the standard library so that it can run inside
+gem5. The reader returns NumPy arrays.
+"""
+
+import array
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Mapping, Pattern, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Version of the store format. Bump this when it changes.
+_store_version = 1
+
+_manifest_name = "manifest.json"
+
+class ColumnarStatsWriter:
+    """
+    Appends rows of statistics to a columnar store.
+
+    Usage
+    -----
+    ```
+    writer = ColumnarStatsWriter("m5out/stats.columns")
+    writer.append(1000, {"system.cpu.numCycles" : 1.0})
+    writer.append(2000, {"system.cpu.numCycles" : 3.0})
+    writer.close()
+    ```
+    """
+
+    def __init__(self, path: str, chunk_rows: int = 64):
+        """
+        Parameters
+        ----------
+
+        path: str
+            The directory of the store. It is created if needed. Any store
+            already in it is replaced.
+
+        chunk_rows: int
+            The number of rows buffered in memory before they are written
+            to a new chunk file.
+        """
+
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+
+        self.path = path
+        self.chunk_rows = chunk_rows
+
+        self._columns = []
+        self._column_index = {}
+        self._chunks = []
+        self._ticks = []
+        self._rows = []
+
+        os.makedirs(path, exist_ok=True)
+        self._write_manifest()
+
+    def append(self, tick: int, values: Mapping[str, float]) -> None:
+        """
+        Append a row holding the values of a stats dump taken at `tick`.
+        """
+
+        index = self._column_index
+        row = {}
+        for name, value in values.items():
+            col = index.get(name)
+            if col is None:
+                col = len(self._columns)
+                index[name] = col
+                self._columns.append(name)
+            row[col] = value
+
+        self._ticks.append(int(tick))
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows to a new chunk and update the manifest.
+        """
+
+        if not self._rows:
+            return
+
+        ncols = len(self._columns)
+        nan = float("nan")
+        data = array.array("d")
+        for col in range(ncols):
+            data.extend(row.get(col, nan) for row in self._rows)
+        if sys.byteorder != "little":
+            data.byteswap()
+
+        chunk_file = "chunk-%06d.f64" % len(self._chunks)
+        with open(os.path.join(self.path, chunk_file), "wb") as f:
+            data.tofile(f)
+
+        self._chunks.append({
+            "file" : chunk_file,
+            "columns" : ncols,
+            "ticks" : self._ticks,
+        })
+        self._ticks = []
+        self._rows = []
+        self._write_manifest()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version" : _store_version,
+            "columns" : self._columns,
+            "chunks" : self._chunks,
+        }
+        # Replace the manifest atomically so that a reader never sees a
+        # partially written one.
+        path = os.path.join(self.path, _manifest_name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(path + ".tmp", path)
+
+class ColumnarStatsReader:
+    """
+    Reads a columnar store written by ColumnarStatsWriter. Chunks are
+    memory mapped, so only the columns that are read are loaded.
+
+    Usage
+    -----
+    ```
+    from m5.ext.pystats.columnar import ColumnarStatsReader
+
+    stats = ColumnarStatsReader("m5out/stats.columns")
+    ipc = stats["system.cpu.committedInsts"] / stats["system.cpu.numCycles"]
+    ```
+    """
+
+    def __init__(self, path: str):
+        if np is None:
+            raise ImportError("Reading columnar stats requires NumPy")
+
+        self.path = path
+        with open(os.path.join(path, _manifest_name)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != _store_version:
+            raise ValueError(
+                f"{path}: unsupported columnar stats version "
+                f"{manifest.get('version')}")
+
+        self._columns = manifest["columns"]
+        self._column_index = {name: i for i, name
+                              in enumerate(self._columns)}
+        self._chunks = manifest["chunks"]
+        self._maps = [None] * len(self._chunks)
+
+    def __len__(self) -> int:
+        """ The number of rows (stats dumps) in the store. """
+        return sum(len(chunk["ticks"]) for chunk in self._chunks)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._column_index
+
+    def __getitem__(self, name: str) -> "np.ndarray":
+        return self.get(name)
+
+    def names(self) -> List[str]:
+        """ The names of all the statistics, in the order first seen. """
+        return list(self._columns)
+
+    def ticks(self) -> "np.ndarray":
+        """ The tick of each row. """
+        return np.fromiter((tick for chunk in self._chunks
+                            for tick in chunk["ticks"]),
+                           dtype=np.int64, count=len(self))
+
+    def _chunk_map(self, i: int) -> "np.ndarray":
+        if self._maps[i] is None:
+            chunk = self._chunks[i]
+            shape = (chunk["columns"], len(chunk["ticks"]))
+            if shape[0] == 0:
+                self._maps[i] = np.empty(shape, dtype="<f8")
+            else:
+                self._maps[i] = np.memmap(
+                    os.path.join(self.path, chunk["file"]), dtype="<f8",
+                    mode="r", shape=shape)
+        return self._maps[i]
+
+    def get(self, name: str) -> "np.ndarray":
+        """
+        Return the values of a statistic for all the rows as a float64
+        array. Rows that don't have a value for it are NaN.
+        """
+
+        col = self._column_index[name]
+        result = np.full(len(self), np.nan)
+        start = 0
+        for i, chunk in enumerate(self._chunks):
+            rows = len(chunk["ticks"])
+            if col < chunk["columns"]:
+                result[start:start + rows] = self._chunk_map(i)[col]
+            start += rows
+        return result
+
+    def get_many(self, names: List[str]) -> "np.ndarray":
+        """
+        Return a 2D array with a row per statistic in `names` and a column
+        per stats dump.
+        """
+
+        result = np.empty((len(names), len(self)))
+        for i, name in enumerate(names):
+            result[i] = self.get(name)
+        return result
+
+    def find_re(self, regex: Union[str, Pattern]
+                ) -> Dict[str, "np.ndarray"]:
+        """
+        Return the values of all the statistics whose name matches the
+        regex (using `re.search`), keyed by name.
+        """
+
+        if isinstance(regex, str):
+            pattern = re.compile(regex)
+        else:
+            pattern = regex
+        return {name: self.get(name) for name in self._columns
+                if pattern.search(name)}
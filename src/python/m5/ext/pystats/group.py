@@ -24,20 +24,91 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
+import fnmatch
 import re
 from typing import Callable, Dict, Iterator, List, Mapping, Optional, Pattern,\
-                   Union
+                   Tuple, Union
 
 from .jsonserializable import JsonSerializable
 from .statistic import Scalar, Statistic
 from .timeconversion import TimeConversion
 
+_regex_special = frozenset(".^$*+?{}[]\\|()")
+
+class _NameIndex:
+    """
+    A sorted index of the names of the children of a Group. Queries are
+    memoized and, when the query has a literal prefix, only the names
+    starting with that prefix are considered.
+    """
+
+    def __init__(self, names: Iterator[str]):
+        self.names = sorted(names)
+        self._queries = {}
+
+    def _with_prefix(self, prefix: str) -> List[str]:
+        if not prefix:
+            return self.names
+        lo = bisect.bisect_left(self.names, prefix)
+        hi = bisect.bisect_left(self.names, prefix + "\U0010ffff")
+        return self.names[lo:hi]
+
+    def substring(self, name: str) -> List[str]:
+        key = ("substring", name)
+        if key not in self._queries:
+            self._queries[key] = [n for n in self.names if name in n]
+        return self._queries[key]
+
+    def regex(self, pattern: Pattern) -> List[str]:
+        key = ("regex", pattern.pattern, pattern.flags)
+        if key not in self._queries:
+            prefix = ""
+            # Only anchored patterns constrain the start of the name
+            if isinstance(pattern.pattern, str) and \
+               pattern.pattern.startswith("^") and \
+               not pattern.flags & (re.IGNORECASE | re.VERBOSE):
+                prefix = _literal_prefix(pattern.pattern[1:])
+            self._queries[key] = [n for n in self._with_prefix(prefix)
+                                  if pattern.search(n)]
+        return self._queries[key]
+
+    def glob(self, pattern: str) -> List[str]:
+        key = ("glob", pattern)
+        if key not in self._queries:
+            prefix = re.split(r"[*?\[]", pattern, 1)[0]
+            regex = re.compile(fnmatch.translate(pattern))
+            self._queries[key] = [n for n in self._with_prefix(prefix)
+                                  if regex.match(n)]
+        return self._queries[key]
+
+def _literal_prefix(pattern: str) -> str:
+    """
+    Return the literal characters a regular expression starts with.
+    """
+    prefix = []
+    if "|" in pattern:
+        # Any of the alternatives may match
+        return ""
+    for c in pattern:
+        if c in _regex_special:
+            # A quantifier makes the preceding character optional
+            if c in "*?{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(c)
+    return "".join(prefix)
+
 class Group(JsonSerializable):
     """
     Used to create the heirarchical stats structure. A Group object contains a
     map of labeled  Groups, Statistics, Lists of Groups, or List of Statistics.
     """
 
+    # The name index lives in a slot rather than in the instance
+    # dictionary so that it isn't mistaken for a child or serialized.
+    __slots__ = ("_name_index",)
+
     type: Optional[str]
     time_conversion: Optional[TimeConversion]
 
@@ -55,6 +126,37 @@ class Group(JsonSerializable):
         for key,value in kwargs.items():
             setattr(self, key, value)
 
+    def __setattr__(self, name: str, value) -> None:
+        super(Group, self).__setattr__(name, value)
+        if not name.startswith("_"):
+            self._name_index = None
+
+    def __delattr__(self, name: str) -> None:
+        super(Group, self).__delattr__(name)
+        self._name_index = None
+
+    def _child_names(self) -> Iterator[str]:
+        """
+        Return the names of the attributes that may be children.
+        """
+        for attr, obj in self.__dict__.items():
+            if isinstance(obj, Group) or isinstance(obj, Statistic):
+                yield attr
+
+    def _get_name_index(self) -> _NameIndex:
+        index = getattr(self, "_name_index", None)
+        if index is None:
+            index = _NameIndex(self._child_names())
+            self._name_index = index
+        return index
+
+    def _named_children(self, names: List[str]
+                        ) -> Iterator[Union["Group", Statistic]]:
+        for name in names:
+            obj = getattr(self, name)
+            if isinstance(obj, Group) or isinstance(obj, Statistic):
+                yield obj
+
     def children(self, predicate: Optional[Callable[[str], bool]] = None
                  ) -> Iterator[Union["Group", Statistic]]:
         """ Iterate through all of the children, optionally with a predicate
@@ -81,7 +183,7 @@ class Group(JsonSerializable):
 
         This function searches all of the "children" in this group. It yields
         the set of attributes (children) that have the `name` as a substring.
-        The order of the objects returned by the generator is arbitrary.
+        The objects are returned in the order of their names.
 
         ```
         >>> system.find('cpu')
@@ -98,7 +200,8 @@ class Group(JsonSerializable):
 
         :param: name: The name to search for
         """
-        yield from self.children(lambda _name: _name in name)
+        yield from self._named_children(
+            self._get_name_index().substring(name))
 
     def find_re(self, regex: Union[str, Pattern]
                 ) -> Iterator[Union["Group", Statistic]]:
@@ -106,8 +209,7 @@ class Group(JsonSerializable):
 
         This function searches all of the "children" in this group. It yields
         the set of attributes (children) that have the `name` mathing the
-        regex provided. The order of the objects returned by the generator is
-        arbitrary.
+        regex provided. The objects are returned in the order of their names.
 
         ```
         >>> system.find_re('cpu[0-9]')
@@ -122,7 +224,91 @@ class Group(JsonSerializable):
             pattern = re.compile(regex)
         else:
             pattern = regex
-        yield from self.children(lambda _name: bool(pattern.search(_name)))
+        yield from self._named_children(
+            self._get_name_index().regex(pattern))
+
+    def glob(self, pattern: str
+             ) -> Iterator[Tuple[str, Union["Group", Statistic]]]:
+        """ Find all stats below this group that match a dotted path
+
+        Each component of the path is matched against the names of the
+        children at the corresponding level using shell-style wildcards
+        (see `fnmatch`). A `**` component matches any number of levels,
+        including none. The matching objects are yielded along with their
+        path relative to this group, in the order of their paths.
+
+        ```
+        >>> [path for path, _ in system.glob('cpu*.numCycles')]
+        ['cpu0.numCycles', 'cpu1.numCycles']
+        >>> [path for path, _ in system.glob('**.numCycles')]
+        ['cpu0.numCycles', 'cpu1.numCycles', 'switch_cpu.numCycles']
+        ```
+
+        :param: pattern: The dotted path pattern to search for
+        """
+        results = sorted(self._glob(pattern.split("."), ""),
+                         key=lambda r: r[0])
+        # '**' can reach the same object through different paths
+        seen = set()
+        for path, obj in results:
+            if path not in seen:
+                seen.add(path)
+                yield path, obj
+
+    def _glob(self, components: List[str], prefix: str
+              ) -> Iterator[Tuple[str, Union["Group", Statistic]]]:
+        component, rest = components[0], components[1:]
+        if component == "**":
+            if rest:
+                yield from self._glob(rest, prefix)
+            names = self._get_name_index().names
+            next_components = components
+        else:
+            if any(c in component for c in "*?["):
+                names = self._get_name_index().glob(component)
+            else:
+                names = [component] if hasattr(self, component) else []
+            next_components = rest
+
+        for name, obj in zip(names, self._named_children(names)):
+            path = prefix + name
+            if not next_components:
+                yield path, obj
+            elif isinstance(obj, Group):
+                yield from obj._glob(next_components, path + ".")
+
+    def find_path_re(self, regex: Union[str, Pattern]
+                     ) -> Iterator[Tuple[str, Union["Group", Statistic]]]:
+        """ Find all stats below this group whose dotted path matches
+
+        The whole tree below this group is searched and the objects whose
+        path relative to this group matches the regex (using `re.search`)
+        are yielded along with that path, in the order of their paths.
+
+        ```
+        >>> [path for path, _ in system.find_path_re(r'cpu\d+\.numCycles$')]
+        ['cpu0.numCycles', 'cpu1.numCycles']
+        ```
+
+        :param: regex: The regular expression used to search. Can be a
+                precompiled regex or a string in regex format
+        """
+        if isinstance(regex, str):
+            pattern = re.compile(regex)
+        else:
+            pattern = regex
+        for path, obj in self._walk(""):
+            if pattern.search(path):
+                yield path, obj
+
+    def _walk(self, prefix: str
+              ) -> Iterator[Tuple[str, Union["Group", Statistic]]]:
+        names = self._get_name_index().names
+        for name, obj in zip(names, self._named_children(names)):
+            path = prefix + name
+            yield path, obj
+            if isinstance(obj, Group):
+                yield from obj._walk(path + ".")
 
 class Vector(Group):
     """
@@ -47,7 +47,7 @@ class JsonLoader(json.JSONDecoder):
     """
 
     def __init__(self):
-        super(JsonLoader, self).__init__(self,
+        super(JsonLoader, self).__init__(
             object_hook=self.__json_to_simstat
         )
 
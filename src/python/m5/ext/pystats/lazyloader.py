@@ -0,0 +1,372 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import mmap
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, \
+                   Union
+
+from .group import Group, Vector
+from .jsonloader import JsonLoader
+from .simstat import SimStat
+from .statistic import Statistic
+
+# An index node is a list of [start, end, type, children]. `start` and
+# `end` delimit the JSON value in the file, `type` is the value of its
+# "type" key (if it is an object that has one) and `children` maps the
+# keys of an object containing other objects to their nodes. Objects
+# that don't contain other objects (i.e., statistics) and all other
+# values have no children.
+IndexNode = List[Any]
+
+_string = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_primitive = rb'[^\[{,}\]\s][^,}\]\s]*'
+# An object member up to the start of its value. Strings, numbers and
+# literals are matched as a whole (group 2), otherwise the match ends
+# at the opening bracket of the value.
+_member_re = re.compile(rb'\s*,?\s*(' + _string + rb')\s*:\s*(?:(' +
+                        _string + rb'|' + _primitive + rb')|[\[{])')
+_end_re = re.compile(rb'\s*\}')
+# The contents of an object up to its end or its first nested object.
+# Strings are matched as a whole so that braces inside them are ignored.
+_object_body_re = re.compile(rb'\{(?:[^{}"]+|' + _string + rb')*')
+_type_re = re.compile(rb'"type"\s*:\s*(' + _string + rb')')
+_value_re = re.compile(rb'\s*(?:(' + _string + rb'|' + _primitive +
+                       rb')|[\[{])')
+_token_re = re.compile(_string + rb'|[\[\]{}]')
+
+# Version of the index file format. Bump this when it changes.
+_index_version = 1
+
+def _decode_string(raw: bytes) -> str:
+    if b'\\' in raw:
+        return json.loads(raw)
+    return raw[1:-1].decode()
+
+class _StatsIndexer:
+    """
+    Builds the index of a JSON stats dump. Statistics are skipped with a
+    single regular expression match, so the per-object Python overhead is
+    only paid for groups.
+    """
+
+    def __init__(self, buf: Union[bytes, mmap.mmap]):
+        self.buf = buf
+
+    def index(self) -> IndexNode:
+        m = _value_re.match(self.buf, 0)
+        if m.group(1) is not None:
+            return [m.start(1), m.end(1), None, None]
+        return self._index_nested(m.end() - 1)
+
+    def _index_nested(self, pos: int) -> IndexNode:
+        buf = self.buf
+        if buf[pos:pos + 1] == b'[':
+            return [pos, self._skip_nested(pos), None, None]
+
+        end = _object_body_re.match(buf, pos).end()
+        if buf[end:end + 1] == b'}':
+            # No nested objects, so this is a statistic (or some other
+            # value that we don't need to look into).
+            t = _type_re.search(buf, pos, end)
+            return [pos, end + 1,
+                    _decode_string(t.group(1)) if t else None, None]
+
+        children = {}
+        obj_type = None
+        start = pos
+        pos += 1
+        while True:
+            m = _member_re.match(buf, pos)
+            if not m:
+                m = _end_re.match(buf, pos)
+                if not m:
+                    raise ValueError(
+                        f"Malformed JSON object at offset {pos}")
+                return [start, m.end(), obj_type, children]
+
+            key = _decode_string(m.group(1))
+            value = m.group(2)
+            if value is not None:
+                node = [m.start(2), m.end(2), None, None]
+                if key == "type" and value[:1] == b'"':
+                    obj_type = _decode_string(value)
+            else:
+                node = self._index_nested(m.end() - 1)
+            children[key] = node
+            pos = node[1]
+
+    def _skip_nested(self, pos: int) -> int:
+        depth = 0
+        for m in _token_re.finditer(self.buf, pos):
+            token = m.group(0)
+            if token in (b'[', b'{'):
+                depth += 1
+            elif token in (b']', b'}'):
+                depth -= 1
+                if depth == 0:
+                    return m.end()
+        raise ValueError(f"Unterminated JSON value at offset {pos}")
+
+class _LazyMixin:
+    """
+    Mixin for SimStat and Group objects whose children are materialized
+    from a LazyLoader the first time they are accessed.
+    """
+
+    def _lazy_init(self, loader: "LazyLoader",
+                   children: Dict[str, IndexNode]) -> None:
+        self._lazy_loader = loader
+        self._lazy_keys = list(children.keys())
+        self._lazy_pending = {key: node for key, node in children.items()
+                              if loader._is_lazy(node)}
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        pending = self.__dict__.get('_lazy_pending', {})
+        if attr not in pending:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{attr}'")
+        value = self._lazy_loader._materialize(pending.pop(attr))
+        # Pending children are already in the name index of the group, so
+        # bypass Group.__setattr__, which would invalidate it.
+        self.__dict__[attr] = value
+        return value
+
+    def children(self, predicate: Optional[Callable[[str], bool]] = None
+                 ) -> Iterator[Union[Group, Statistic]]:
+        for attr in self._lazy_keys:
+            if predicate and not predicate(attr): continue
+            obj = getattr(self, attr)
+            if isinstance(obj, Group) or isinstance(obj, Statistic):
+                yield obj
+
+    def _child_names(self) -> Iterator[str]:
+        # Pending children are candidates until they are materialized
+        for attr in self._lazy_keys:
+            if attr in self._lazy_pending:
+                yield attr
+            else:
+                obj = self.__dict__.get(attr)
+                if isinstance(obj, Group) or isinstance(obj, Statistic):
+                    yield attr
+
+    def load_all(self) -> None:
+        """
+        Materialize all the children of this object (but not their
+        children) and put them in the same order as in the JSON file.
+        """
+        ordered = {key: getattr(self, key) for key in self._lazy_keys}
+        private = {key: value for key, value in self.__dict__.items()
+                   if key.startswith('_lazy')}
+        self.__dict__.clear()
+        self.__dict__.update(ordered)
+        self.__dict__.update(private)
+
+    def to_json(self) -> Dict:
+        self.load_all()
+        return {key: value
+                for key, value in super(_LazyMixin, self).to_json().items()
+                if not key.startswith('_lazy')}
+
+class LazySimStat(_LazyMixin, SimStat):
+    pass
+
+class LazyGroup(_LazyMixin, Group):
+    pass
+
+class LazyVector(_LazyMixin, Vector):
+    pass
+
+class LazyLoader:
+    """
+    Memory-mapped, lazy reader for JSON stats dumps.
+
+    Unlike `jsonloader.load`, which builds the whole SimStat object tree,
+    the LazyLoader only records where each group and statistic is in the
+    file. Groups and statistics are created from the memory-mapped file the
+    first time they are accessed, so the cost of reading a few statistics
+    from a large dump is proportional to what is touched.
+
+    The index is saved to a sidecar file (`<path>.idx` by default) which
+    is reused by later loads of the same, unmodified dump.
+
+    The loader keeps the file open (and mapped) until it is closed, as
+    the SimStat objects it loads read their children from it. It is
+    closed when it is garbage collected (i.e., once these objects are
+    gone), or explicitly with `close()` or by using the loader as a
+    context manager. Children that weren't accessed before the loader is
+    closed can't be accessed afterwards.
+
+    Usage
+    -----
+    ```
+    from m5.ext.pystats.lazyloader import LazyLoader
+
+    with LazyLoader("m5out/stats.json") as loader:
+        simstat = loader.load()
+        print(simstat.system.cpu0.numCycles.value)
+    ```
+    """
+
+    _stat_types = ("Scalar", "Distribution", "Accumulator")
+
+    def __init__(self, path: str, index_path: Optional[str] = None,
+                 use_index_file: bool = True):
+        self.path = path
+        self.index_path = index_path if index_path else path + ".idx"
+        self.use_index_file = use_index_file
+
+        self._file = open(path, "rb")
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self._index = None
+
+    def close(self) -> None:
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self) -> "LazyLoader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # __init__ may have failed before the file was opened
+        if hasattr(self, "_buf"):
+            self.close()
+
+    def _file_id(self) -> Tuple[int, int]:
+        st = os.fstat(self._file.fileno())
+        return st.st_size, st.st_mtime_ns
+
+    def _read_index_file(self) -> Optional[IndexNode]:
+        try:
+            with open(self.index_path, "r") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("version") != _index_version or \
+           tuple(saved.get("file", ())) != self._file_id():
+            return None
+        return saved["index"]
+
+    def _write_index_file(self, index: IndexNode) -> None:
+        saved = {
+            "version" : _index_version,
+            "file" : list(self._file_id()),
+            "index" : index,
+        }
+        try:
+            with open(self.index_path, "w") as f:
+                json.dump(saved, f, separators=(',', ':'))
+        except OSError:
+            # The index file is only an optimization
+            pass
+
+    def index(self) -> IndexNode:
+        """
+        Return the index of the dump, building it (and saving it to the
+        index file) if necessary.
+        """
+        if self._index is None:
+            index = None
+            if self.use_index_file:
+                index = self._read_index_file()
+            if index is None:
+                index = _StatsIndexer(self._buf).index()
+                if self.use_index_file:
+                    self._write_index_file(index)
+            self._index = index
+        return self._index
+
+    def load(self) -> SimStat:
+        """
+        Return the (lazy) SimStat object for the dump.
+        """
+        root = self.index()
+        if root[3] is None:
+            # Nothing to be lazy about
+            return json.loads(self._buf[root[0]:root[1]], cls=JsonLoader)
+        return self._materialize_container(root, LazySimStat)
+
+    def _is_lazy(self, node: IndexNode) -> bool:
+        # Values that aren't groups or statistics are small, so they are
+        # loaded with their parent.
+        return node[3] is not None or node[2] in self._stat_types or \
+            self._buf[node[0]:node[0] + 1] == b'['
+
+    def _materialize(self, node: IndexNode) -> Any:
+        start, end, obj_type, children = node
+        if children is not None:
+            if obj_type is None:
+                return self._materialize_container(node, LazySimStat)
+            elif obj_type == "Group":
+                return self._materialize_container(node, LazyGroup)
+            elif obj_type == "Vector":
+                return self._materialize_container(node, LazyVector)
+        return json.loads(self._buf[start:end], cls=JsonLoader)
+
+    def _materialize_container(self, node: IndexNode, cls: type) -> Any:
+        children = node[3]
+        obj = cls.__new__(cls)
+        obj._lazy_init(self, children)
+        eager = {key: self._materialize(child)
+                 for key, child in children.items()
+                 if key not in obj._lazy_pending}
+        if cls is LazyVector:
+            eager.pop("type", None)
+            eager.pop("time_conversion", None)
+            cls.__init__(obj, eager)
+        else:
+            cls.__init__(obj, **eager)
+        return obj
+
+def load_lazy(path: str, **kwargs) -> SimStat:
+    """
+    Wrapper function that provides a cleaner interface for using the
+    LazyLoader class. The returned SimStat keeps the loader, and so the
+    stats file, open until it is garbage collected. Use a LazyLoader as
+    a context manager to close the file at a given point instead.
+
+    Usage
+    -----
+    ```
+    import m5.ext.pystats as pystats
+
+    simstat = pystats.lazyloader.load_lazy("m5out/stats.json")
+    ```
+    """
+
+    return LazyLoader(path, **kwargs).load()
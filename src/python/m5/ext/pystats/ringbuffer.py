@@ -0,0 +1,148 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+A fixed-size binary ring buffer of statistics samples.
+
+The file starts with a header followed by the names of the sampled
+values (as a JSON list) and `capacity` fixed-size records. Each record
+is the tick of the sample (uint64) followed by one float64 per name,
+all little endian. Once the buffer is full the oldest record is
+overwritten, so the file never grows past its initial size.
+
+    offset 0   magic      8 bytes   b"gem5ring"
+           8   version    uint32
+          12   num_values uint32
+          16   capacity   uint64
+          24   written    uint64    (number of records ever written)
+          32   names_len  uint64
+          40   names      names_len bytes, padded to a multiple of 8
+               records    capacity * (8 + 8 * num_values) bytes
+"""
+
+import json
+import mmap
+import struct
+from typing import Iterator, List, Tuple
+
+_magic = b"gem5ring"
+# Version of the file format. Bump this when it changes.
+_version = 1
+_header = struct.Struct("<8sIIQQQ")
+_written = struct.Struct("<Q")
+_written_offset = 24
+
+def _layout(names_len: int, num_values: int) -> Tuple[int, struct.Struct]:
+    data_offset = _header.size + (names_len + 7) // 8 * 8
+    return data_offset, struct.Struct("<Q%dd" % num_values)
+
+class StatsRingBufferWriter:
+    """
+    Writes samples of a fixed list of values to a ring buffer file.
+
+    Usage
+    -----
+    ```
+    ring = StatsRingBufferWriter("samples.ring", ["cpu.numCycles"], 1024)
+    ring.append(1000, [42.0])
+    ring.close()
+    ```
+    """
+
+    def __init__(self, path: str, names: List[str], capacity: int):
+        if capacity < 1:
+            raise ValueError("The capacity must be at least 1")
+
+        self.path = path
+        self.names = list(names)
+        self.capacity = capacity
+
+        names_data = json.dumps(self.names).encode()
+        self._data_offset, self._record = \
+            _layout(len(names_data), len(self.names))
+        size = self._data_offset + capacity * self._record.size
+
+        self._file = open(path, "w+b")
+        self._file.truncate(size)
+        self._buf = mmap.mmap(self._file.fileno(), size)
+        _header.pack_into(self._buf, 0, _magic, _version, len(self.names),
+                          capacity, 0, len(names_data))
+        self._buf[_header.size:_header.size + len(names_data)] = names_data
+        self.written = 0
+
+    def append(self, tick: int, values: List[float]) -> None:
+        """
+        Write a sample, overwriting the oldest one if the buffer is full.
+        """
+
+        slot = self.written % self.capacity
+        self._record.pack_into(
+            self._buf, self._data_offset + slot * self._record.size,
+            tick, *values)
+        self.written += 1
+        _written.pack_into(self._buf, _written_offset, self.written)
+
+    def flush(self) -> None:
+        self._buf.flush()
+
+    def close(self) -> None:
+        if self._buf.closed:
+            return
+        self._buf.flush()
+        self._buf.close()
+        self._file.close()
+
+def read_ring_buffer(path: str
+                     ) -> Tuple[List[str], Iterator[Tuple[int, Tuple]]]:
+    """
+    Read a ring buffer file.
+
+    Returns the names of the sampled values and an iterator over the
+    samples still in the buffer, oldest first. Each sample is a tuple of
+    its tick and a tuple of the values.
+    """
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic, version, num_values, capacity, written, names_len = \
+        _header.unpack_from(data, 0)
+    if magic != _magic:
+        raise ValueError(f"{path} is not a stats ring buffer")
+    if version != _version:
+        raise ValueError(f"{path}: unsupported ring buffer version {version}")
+
+    names = json.loads(data[_header.size:_header.size + names_len])
+    data_offset, record = _layout(names_len, num_values)
+
+    def samples():
+        first = max(0, written - capacity)
+        for i in range(first, written):
+            offset = data_offset + (i % capacity) * record.size
+            sample = record.unpack_from(data, offset)
+            yield sample[0], sample[1:]
+
+    return names, samples()
@@ -120,14 +120,20 @@ def parse_options():
     # Configuration Options
     group("Configuration Options")
     option("--dump-config", metavar="FILE", default="config.ini",
-        help="Dump configuration output file [Default: %default]")
+        help="Dump configuration output file (compressed if FILE ends " \
+        "in .gz) [Default: %default]")
     option("--json-config", metavar="FILE", default="config.json",
-        help="Create JSON output of the configuration [Default: %default]")
+        help="Create JSON output of the configuration (compressed if " \
+        "FILE ends in .gz) [Default: %default]")
+    option("--json-config-compact", action="store_true", default=False,
+        help="Write the JSON configuration without indentation")
     option("--dot-config", metavar="FILE", default="config.dot",
         help="Create DOT & pdf outputs of the configuration [Default: %default]")
     option("--dot-dvfs-config", metavar="FILE", default=None,
         help="Create DOT & pdf outputs of the DVFS configuration" + \
              " [Default: %default]")
+    option("--instantiate-times", action="store_true", default=False,
+        help="Print the time spent in each pass of m5.instantiate()")
 
     # Debugging options
     group("Debugging Options")
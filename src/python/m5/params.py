@@ -284,6 +284,11 @@ class SimObjectVector(VectorParamValue):
             for obj in v.descendants():
                 yield obj
 
+    def walk_descendants(self):
+        for v in self:
+            for obj in v.walk_descendants():
+                yield obj
+
     def get_config_as_dict(self):
         a = []
         for v in self:
@@ -302,6 +307,9 @@ class SimObjectVector(VectorParamValue):
                  " that is being overwritten by a SimObjectVector")
         value.set_parent(val.get_parent(), val._name)
         super(SimObjectVector, self).__setitem__(key, value)
+        parent = val.get_parent()
+        if isSimObject(parent):
+            parent._invalidate_descendants()
 
     # Enumerate the params of each member of the SimObject vector. Creates
     # strings that will allow indexing into the vector by the python code and
@@ -40,6 +40,7 @@
 import atexit
 import os
 import sys
+import time
 
 # import the wrapped C++ functions
 import _m5.drain
@@ -50,6 +51,7 @@ from . import stats
 from . import SimObject
 from . import ticks
 from . import objects
+from m5.util.config_writer import ConfigWriter, open_config_file
 from m5.util.dot_writer import do_dot, do_dvfs_dot
 from m5.util.dot_writer_ruby import do_ruby_dot
 
@@ -67,6 +69,29 @@ _memory_modes = {
 
 _drain_manager = _m5.drain.DrainManager.instance()
 
+# Wall-clock time (in seconds) spent in each pass of the most recent
+# call to instantiate(), in the order the passes were run.
+instantiate_pass_times = []
+
+class _TimedPass(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        instantiate_pass_times.append((self.name, time.time() - self.start))
+        return False
+
+def printInstantiateTimes(out=sys.stdout):
+    total = sum(t for name, t in instantiate_pass_times)
+    print("Instantiation time by pass:", file=out)
+    for name, t in instantiate_pass_times:
+        print("  %-24s %8.3fs" % (name, t), file=out)
+    print("  %-24s %8.3fs" % ("total", total), file=out)
+
 # The final hook to generate .ini files.  Called from the user script
 # once the config is built.
 def instantiate(ckpt_dir=None):
@@ -77,57 +102,77 @@ def instantiate(ckpt_dir=None):
     if not root:
         fatal("Need to instantiate Root() before calling instantiate()")
 
+    del instantiate_pass_times[:]
+
     # we need to fix the global frequency
     ticks.fixGlobalFrequency()
 
     # Make sure SimObject-valued params are in the configuration
-    # hierarchy so we catch them with future descendants() walks
-    for obj in root.descendants(): obj.adoptOrphanParams()
+    # hierarchy so we catch them with future descendants() walks.
+    # Adopted children need to be visited by the same walk, so don't
+    # use the cached descendant list here.
+    with _TimedPass("adoptOrphanParams"):
+        for obj in root.walk_descendants(): obj.adoptOrphanParams()
 
     # Unproxy in sorted order for determinism
-    for obj in root.descendants(): obj.unproxyParams()
-
-    if options.dump_config:
-        ini_file = open(os.path.join(options.outdir, options.dump_config), 'w')
-        # Print ini sections in sorted order for easier diffing
-        for obj in sorted(root.descendants(), key=lambda o: o.path()):
-            obj.print_ini(ini_file)
-        ini_file.close()
-
-    if options.json_config:
-        try:
-            import json
-            json_file = open(
-                os.path.join(options.outdir, options.json_config), 'w')
-            d = root.get_config_as_dict()
-            json.dump(d, json_file, indent=4)
-            json_file.close()
-        except ImportError:
-            pass
+    with _TimedPass("unproxyParams"):
+        for obj in root.walk_descendants(): obj.unproxyParams()
+
+    # The hierarchy is complete at this point. The first call to
+    # descendants() builds the flattened list that all of the
+    # following passes reuse.
+    with _TimedPass("descendants"):
+        descendants = list(root.descendants())
+
+    if options.dump_config or options.json_config:
+        with _TimedPass("write_config"):
+            ini_file = None
+            json_file = None
+            if options.dump_config:
+                ini_file = open_config_file(
+                    os.path.join(options.outdir, options.dump_config))
+            if options.json_config:
+                json_file = open_config_file(
+                    os.path.join(options.outdir, options.json_config))
+            # Both files are written from a single walk of the
+            # hierarchy.
+            ConfigWriter(ini_file, json_file,
+                         compact=options.json_config_compact).write(root)
+            if ini_file:
+                ini_file.close()
+            if json_file:
+                json_file.close()
 
     if options.dot_config:
-        do_dot(root, options.outdir, options.dot_config)
-        do_ruby_dot(root, options.outdir, options.dot_config)
+        with _TimedPass("dot_config"):
+            do_dot(root, options.outdir, options.dot_config)
+            do_ruby_dot(root, options.outdir, options.dot_config)
 
     # Initialize the global statistics
     stats.initSimStats()
 
     # Create the C++ sim objects and connect ports
-    for obj in root.descendants(): obj.createCCObject()
-    for obj in root.descendants(): obj.connectPorts()
+    with _TimedPass("createCCObject"):
+        for obj in descendants: obj.createCCObject()
+    with _TimedPass("connectPorts"):
+        for obj in descendants: obj.connectPorts()
 
     # Do a second pass to finish initializing the sim objects
-    for obj in root.descendants(): obj.init()
+    with _TimedPass("init"):
+        for obj in descendants: obj.init()
 
     # Do a third pass to initialize statistics
-    stats._bindStatHierarchy(root)
-    root.regStats()
+    with _TimedPass("regStats"):
+        stats._bindStatHierarchy(root)
+        root.regStats()
 
     # Do a fourth pass to initialize probe points
-    for obj in root.descendants(): obj.regProbePoints()
+    with _TimedPass("regProbePoints"):
+        for obj in descendants: obj.regProbePoints()
 
     # Do a fifth pass to connect probe listeners
-    for obj in root.descendants(): obj.regProbeListeners()
+    with _TimedPass("regProbeListeners"):
+        for obj in descendants: obj.regProbeListeners()
 
     # We want to generate the DVFS diagram for the system. This can only be
     # done once all of the CPP objects have been created and initialised so
@@ -140,16 +185,21 @@ def instantiate(ckpt_dir=None):
 
     # Restore checkpoint (if any)
     if ckpt_dir:
-        _drain_manager.preCheckpointRestore()
-        ckpt = _m5.core.getCheckpoint(ckpt_dir)
-        for obj in root.descendants(): obj.loadState(ckpt)
+        with _TimedPass("loadState"):
+            _drain_manager.preCheckpointRestore()
+            ckpt = _m5.core.getCheckpoint(ckpt_dir)
+            for obj in descendants: obj.loadState(ckpt)
     else:
-        for obj in root.descendants(): obj.initState()
+        with _TimedPass("initState"):
+            for obj in descendants: obj.initState()
 
     # Check to see if any of the stat events are in the past after resuming from
     # a checkpoint, If so, this call will shift them to be at a valid time.
     updateStatEvents()
 
+    if options.instantiate_times:
+        printInstantiateTimes()
+
 need_startup = True
 def simulate(*args, **kwargs):
     global need_startup
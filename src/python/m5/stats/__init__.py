@@ -42,7 +42,7 @@ import m5
 import _m5.stats
 from m5.objects import Root
 from m5.params import isNullPointer
-from .gem5stats import JsonOutputVistor
+from .gem5stats import JsonOutputVistor, ColumnarOutputVisitor, SampledStats
 from m5.util import attrdict, fatal
 
 # Stat exports
@@ -194,6 +194,31 @@ def _jsonFactory(fn):
 
     return JsonOutputVistor(fn)
 
+@_url_factory(["columnar"])
+def _columnarFactory(fn, chunk_rows=64):
+    """Append every stats dump as a row of a columnar store.
+
+    The store is a directory holding one float64 column per statistic,
+    which can be read back as NumPy arrays spanning all the dumps using
+    m5.ext.pystats.columnar.ColumnarStatsReader. Vectors and
+    distributions are stored as one column per element. Formulas are
+    not stored.
+
+    Parameters:
+      * chunk_rows (unsigned): Number of dumps to buffer in memory before
+                               they are written to disk (default: 64)
+
+    Example:
+      columnar://stats.columns?chunk_rows=16
+
+    """
+
+    import os
+
+    # Like the text output, relative paths are in the output directory
+    return ColumnarOutputVisitor(os.path.join(m5.options.outdir, fn),
+                                 chunk_rows)
+
 def addStatVisitor(url):
     """Add a stat visitor specified using a URL string
 
@@ -364,6 +389,40 @@ def _dump_to_visitor(visitor, roots=None):
 lastDump = 0
 # List[SimObject].
 global_dump_roots = []
+# SampledStats used by dump() instead of the outputs, see enableSampling().
+sampled_stats = None
+
+def enableSampling(stats, path="stats.ring", capacity=4096):
+    '''Switch global stat dumps to sampled mode.
+
+    In sampled mode, dump() (including the periodic dumps scheduled with
+    periodicStatDump()) only prepares the given stats and appends their
+    values to a binary ring buffer file holding the last `capacity`
+    samples, instead of preparing every stat and dumping them all to the
+    registered outputs. Dumps of specific roots are not affected.
+
+    Arguments:
+        stats: List of stats or stat groups to sample, as full stat names
+               (e.g., "system.cpu.numCycles") or SimObjects.
+        path: Ring buffer file. Relative paths are in the output directory.
+        capacity: Number of samples kept in the ring buffer.
+    '''
+
+    import os
+
+    global sampled_stats
+    disableSampling()
+    sampled_stats = SampledStats(os.path.join(m5.options.outdir, path),
+                                 stats, capacity)
+
+def disableSampling():
+    '''Switch global stat dumps back to dumping all stats to the
+    registered outputs.'''
+
+    global sampled_stats
+    if sampled_stats is not None:
+        sampled_stats.close()
+        sampled_stats = None
 
 def dump(roots=None):
     '''Dump all statistics data to the registered outputs'''
@@ -374,6 +433,10 @@ def dump(roots=None):
     global global_dump_roots
     all_roots.extend(global_dump_roots)
 
+    if sampled_stats is not None and not all_roots:
+        sampled_stats.sample()
+        return
+
     now = m5.curTick()
     global lastDump
     assert lastDump <= now
@@ -395,7 +458,7 @@ def dump(roots=None):
         prepare()
 
     for output in outputList:
-        if isinstance(output, JsonOutputVistor):
+        if isinstance(output, (JsonOutputVistor, ColumnarOutputVisitor)):
             if not all_roots:
                 output.dump(Root.getInstance())
             else:
@@ -30,10 +30,12 @@ the Python Stats model.
 """
 
 from datetime import datetime
-from typing import IO, List, Union
+from typing import Dict, IO, List, Tuple, Union
 
 import _m5.stats
+import m5
 from m5.objects import *
+from m5.ext.pystats.columnar import ColumnarStatsWriter
 from m5.ext.pystats.group import *
 from m5.ext.pystats.simstat import *
 from m5.ext.pystats.statistic import *
@@ -81,6 +83,250 @@ class JsonOutputVistor():
             simstat = get_simstat(root=roots, prepare_stats=False)
             simstat.dump(fp=fp, **self.json_args)
 
+class ColumnarOutputVisitor():
+    """
+    This is a helper vistor class used to append each stats dump as a row of
+    a columnar store (see `m5.ext.pystats.columnar`) via the stats API.
+    """
+    writer: ColumnarStatsWriter
+
+    def __init__(self, path: str, chunk_rows: int = 64):
+        """
+        Parameters
+        ----------
+
+        path: str
+            The directory of the columnar store.
+
+        chunk_rows: int
+            The number of dumps buffered in memory before they are written
+            to disk.
+        """
+
+        import atexit
+
+        self.writer = ColumnarStatsWriter(path, chunk_rows=chunk_rows)
+        atexit.register(self.writer.close)
+
+    def dump(self, roots: Union[List[SimObject], Root]) -> None:
+        """
+        Appends the stats of a simulation root (or list of roots) to the
+        columnar store.
+
+        WARNING: This dump assumes the statistics have already been prepared
+        for the target root.
+
+        Parameters
+        ----------
+
+        roots: Union[List[Root], Root]]
+            The Root, or List of roots, whose stats are are to be dumped.
+        """
+
+        if isinstance(roots, Root):
+            roots = [roots]
+
+        values = {}
+        for r in roots:
+            if isinstance(r, Root):
+                _flatten_stats(r, "", values)
+            else:
+                _flatten_stats(r, r.path() + ".", values)
+
+        self.writer.append(m5.curTick(), values)
+
+def _stat_value_names(name: str, stat: _m5.stats.Info) -> List[str]:
+    """
+    Returns the names of the values of a stat. Vectors and distributions are
+    split into one value per element, named like in the text stats output.
+    Formulas have no values.
+    """
+
+    if isinstance(stat, _m5.stats.ScalarInfo):
+        return [name]
+    elif isinstance(stat, _m5.stats.DistInfo):
+        return [name + "::underflow"] + \
+               ["%s::%d" % (name, index)
+                for index in range(len(stat.values))] + \
+               [name + "::" + field for field in
+                ("overflow", "min_value", "max_value", "sum", "squares")]
+    elif isinstance(stat, _m5.stats.FormulaInfo):
+        return []
+    elif isinstance(stat, _m5.stats.VectorInfo):
+        subnames = stat.subnames
+        names = []
+        for index in range(stat.size):
+            subname = str(subnames[index]) if index < len(subnames) else ""
+            names.append("%s::%s" % (name, subname or index))
+        names.append(name + "::total")
+        return names
+    return []
+
+def _stat_values(stat: _m5.stats.Info) -> List[float]:
+    """
+    Returns the values of a stat, in the order of `_stat_value_names()`.
+    """
+
+    if isinstance(stat, _m5.stats.ScalarInfo):
+        return [stat.value]
+    elif isinstance(stat, _m5.stats.DistInfo):
+        return [stat.underflow] + list(stat.values) + \
+               [stat.overflow, stat.min_val, stat.max_val, stat.sum,
+                stat.squares]
+    elif isinstance(stat, _m5.stats.FormulaInfo):
+        return []
+    elif isinstance(stat, _m5.stats.VectorInfo):
+        return list(stat.value) + [stat.total]
+    return []
+
+def _flatten_stats(group: _m5.stats.Group, prefix: str,
+                   values: Dict[str, float]) -> None:
+    """
+    Adds the values of all the stats in a group, and in the groups below it,
+    to a dictionary keyed by their full names (see `_stat_value_names()`).
+    """
+
+    for stat in group.getStats():
+        values.update(zip(_stat_value_names(prefix + stat.name, stat),
+                          _stat_values(stat)))
+
+    for key, child in group.getStatGroups().items():
+        _flatten_stats(child, prefix + key + ".", values)
+
+class SampledStats():
+    """
+    Samples a fixed set of stats into a ring buffer file (see
+    `m5.ext.pystats.ringbuffer`).
+
+    Only the sampled stats, and the stat groups they belong to, are
+    prepared on each sample, so the cost of a sample is proportional to the
+    number of sampled stats rather than to the size of the stats hierarchy.
+    Note that preparing a stat group also prepares the groups below it, so
+    sampling a stat of a group near the root (e.g. "system.x") is more
+    expensive than sampling one of a leaf group.
+    """
+
+    def __init__(self, path: str, stats: List[Union[str, SimObject]],
+                 capacity: int = 4096):
+        """
+        Parameters
+        ----------
+
+        path: str
+            The ring buffer file.
+
+        stats: List[Union[str, SimObject]]
+            The stats to sample. Strings are the full names of stats or stat
+            groups (e.g., "system.cpu.numCycles" or "system.cpu"). All the
+            stats below a stat group or a SimObject are sampled.
+
+        capacity: int
+            The number of samples kept in the ring buffer.
+        """
+
+        self.path = path
+        self.stats = list(stats)
+        self.capacity = capacity
+        self._ring = None
+        self._last_tick = None
+
+    def _resolve(self, entry: Union[str, SimObject]
+                 ) -> Tuple[str, _m5.stats.Group,
+                            List[Tuple[str, _m5.stats.Info]]]:
+        """
+        Returns the path of the stat group an entry refers to, or belongs
+        to, the group and the (name, stat) tuples of the stats sampled for
+        the entry.
+        """
+
+        if isinstance(entry, SimObject):
+            group = entry.getCCObject()
+            return entry.path(), group, self._subtree(entry.path(), group)
+
+        group = Root.getInstance()
+        path = entry.split(".")
+        for i, key in enumerate(path):
+            groups = group.getStatGroups()
+            if key in groups:
+                group = groups[key]
+                continue
+            if i == len(path) - 1:
+                for stat in group.getStats():
+                    if stat.name == key:
+                        return ".".join(path[:-1]), group, [(entry, stat)]
+            raise KeyError("Unknown stat or stat group '%s'" % entry)
+        return entry, group, self._subtree(entry, group)
+
+    def _subtree(self, prefix: str, group: _m5.stats.Group
+                 ) -> List[Tuple[str, _m5.stats.Info]]:
+        stats = [ (prefix + "." + stat.name, stat)
+                  for stat in group.getStats() ]
+        for key, child in group.getStatGroups().items():
+            stats.extend(self._subtree(prefix + "." + key, child))
+        return stats
+
+    def _setup(self) -> None:
+        """
+        Resolves the sampled stats and creates the ring buffer. This is done
+        on the first sample since the stats only exist once the simulation
+        is instantiated.
+        """
+
+        from m5.ext.pystats.ringbuffer import StatsRingBufferWriter
+
+        seen = set()
+        groups = {}
+        self._stats = []
+        names = []
+        for entry in self.stats:
+            group_path, group, stats = self._resolve(entry)
+            groups[group_path] = group
+            for name, stat in stats:
+                value_names = _stat_value_names(name, stat)
+                if name in seen or not value_names:
+                    continue
+                seen.add(name)
+                self._stats.append(stat)
+                names.extend(value_names)
+
+        # preDumpStats() recurses into the groups below a group, so only
+        # call it on the outermost groups.
+        self._groups = [ group for path, group in groups.items()
+                         if not any(path.startswith(other + ".") or
+                                    (path and not other)
+                                    for other in groups if other != path) ]
+
+        self._ring = StatsRingBufferWriter(self.path, names, self.capacity)
+
+    def sample(self) -> None:
+        """
+        Prepares the sampled stats and appends their values to the ring
+        buffer. Only the first sample of a tick is recorded.
+        """
+
+        now = m5.curTick()
+        if now == self._last_tick:
+            return
+        self._last_tick = now
+
+        if self._ring is None:
+            self._setup()
+
+        _m5.stats.processDumpQueue()
+        for group in self._groups:
+            group.preDumpStats()
+
+        values = []
+        for stat in self._stats:
+            stat.prepare()
+            values.extend(_stat_values(stat))
+
+        self._ring.append(now, values)
+
+    def close(self) -> None:
+        if self._ring is not None:
+            self._ring.close()
+
 def get_stats_group(group: _m5.stats.Group) -> Group:
     """
     Translates a gem5 Group object into a Python stats Group object. A Python
@@ -33,6 +33,9 @@ import inspect
 import os
 import re
 
+# The kinds of pieces of a compiled format string
+_LITERAL, _IDENT, _LONE, _POS, _EVAL = range(5)
+
 class lookup(object):
     def __init__(self, formatter, frame, *args, **kwargs):
         self.frame = frame
@@ -119,6 +122,14 @@ class code_formatter(object, metaclass=code_formatter_meta):
     globals = True
     locals = True
     fix_newlines = True
+    compiled = True
+
+    # Format strings split into their literal and substituted parts, see
+    # _compile_format(). The cache is cleared when it gets larger than
+    # _max_compiled_formats, since formats can be built at run time.
+    _compiled_formats = {}
+    _max_compiled_formats = 10000
+
     def __init__(self, *args, **kwargs):
         self._data = []
         self._dict = {}
@@ -128,6 +139,7 @@ class code_formatter(object, metaclass=code_formatter_meta):
         self.locals = kwargs.pop('locals', type(self).locals)
         self._fix_newlines = \
                 kwargs.pop('fix_newlines', type(self).fix_newlines)
+        self._compiled = kwargs.pop('compiled', type(self).compiled)
 
         if args:
             self.__call__(args)
@@ -231,6 +243,53 @@ class code_formatter(object, metaclass=code_formatter_meta):
 
             initial_newline = False
 
+    @classmethod
+    def _compile_format(cls, format):
+        """Split a format string into a tuple of pieces, each of which is
+        either literal text or something to substitute. Return None if the
+        format is ill-formed, in which case it is left to the regular
+        expression substitution in __call__ to report the error."""
+        pieces = []
+        literal = []
+        pos = 0
+        for match in code_formatter.pattern.finditer(format):
+            literal.append(format[pos:match.start()])
+            pos = match.end()
+
+            if match.group('escaped') is not None:
+                literal.append('$')
+                continue
+
+            if match.group('lone'):
+                piece = (_LONE, (match.group('indent'), match.group('lone')))
+            elif match.group('ident') is not None or \
+                 match.group('b_ident') is not None:
+                piece = (_IDENT, match.group('ident') or
+                                 match.group('b_ident'))
+            elif match.group('pos') is not None or \
+                 match.group('b_pos') is not None:
+                piece = (_POS, int(match.group('pos') or
+                                   match.group('b_pos')))
+            elif match.group('eval') is not None:
+                try:
+                    code = compile(match.group('eval'), '<string>', 'eval')
+                except SyntaxError:
+                    return None
+                piece = (_EVAL, code)
+            else:
+                return None
+
+            if literal:
+                pieces.append((_LITERAL, ''.join(literal)))
+                literal = []
+            pieces.append(piece)
+
+        literal.append(format[pos:])
+        text = ''.join(literal)
+        if text:
+            pieces.append((_LITERAL, text))
+        return tuple(pieces)
+
     def __call__(self, *args, **kwargs):
         if not args:
             self._data.append('\n')
@@ -239,6 +298,23 @@ class code_formatter(object, metaclass=code_formatter_meta):
         format = args[0]
         args = args[1:]
 
+        if self._compiled:
+            formats = code_formatter._compiled_formats
+            try:
+                pieces = formats[format]
+            except KeyError:
+                if len(formats) >= code_formatter._max_compiled_formats:
+                    formats.clear()
+                pieces = formats[format] = self._compile_format(format)
+            except TypeError:
+                # Not a string, which the substitution below reports
+                pieces = None
+
+            if pieces is not None:
+                frame = inspect.currentframe().f_back
+                self._append(self._substitute(pieces, frame, args, kwargs))
+                return
+
         frame = inspect.currentframe().f_back
 
         l = lookup(self, frame, *args, **kwargs)
@@ -301,6 +377,33 @@ class code_formatter(object, metaclass=code_formatter_meta):
         d = code_formatter.pattern.sub(convert, format)
         self._append(d)
 
+    def _substitute(self, pieces, frame, args, kwargs):
+        # The counterpart of convert() in __call__ for compiled formats
+        if len(pieces) == 1 and pieces[0][0] == _LITERAL:
+            return pieces[0][1]
+
+        l = lookup(self, frame, *args, **kwargs)
+        out = []
+        for kind, value in pieces:
+            if kind == _LITERAL:
+                out.append(value)
+            elif kind == _IDENT:
+                out.append('%s' % (l[value], ))
+            elif kind == _LONE:
+                indent, ident = value
+                for line in ('%s' % (l[ident], )).splitlines(True):
+                    out.append(indent)
+                    out.append(line)
+            elif kind == _POS:
+                if value > len(args):
+                    raise ValueError \
+                        ('Positional parameter #%d not found in pattern' %
+                         value, code_formatter.pattern)
+                out.append('%s' % (args[value], ))
+            else:
+                out.append('%s' % (eval(value, {}, l), ))
+        return ''.join(out)
+
 __all__ = [ "code_formatter" ]
 
 if __name__ == '__main__':
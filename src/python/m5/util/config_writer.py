@@ -0,0 +1,147 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#####################################################################
+#
+# Streaming config.ini and config.json writers
+#
+# ConfigWriter walks the configuration hierarchy once and writes the
+# config.json output as it goes, one object at a time, instead of
+# building the whole get_config_as_dict() tree in memory first. The
+# same walk records the path of every object so that config.ini can
+# be written afterwards in sorted path order without walking the
+# hierarchy again.
+#
+# With the default indentation the JSON output is identical to
+# json.dump(root.get_config_as_dict(), f, indent=4). Output files
+# whose name ends in ".gz" are gzip compressed.
+#
+#####################################################################
+
+import gzip
+import json
+
+from m5.SimObject import isSimObject, isSimObjectVector
+
+def open_config_file(path):
+    """Open a configuration output file for writing, compressing it if
+    the file name ends in .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt')
+    return open(path, 'w')
+
+class ConfigWriter(object):
+    """Write config.ini and/or config.json for a configuration hierarchy.
+
+    Either of the output files may be None. If compact is set, the JSON
+    output is written without any whitespace.
+    """
+
+    def __init__(self, ini_file=None, json_file=None, compact=False):
+        self.ini_file = ini_file
+        self.json_file = json_file
+
+        if compact:
+            self.indent = None
+            self.item_separator = ','
+            self.key_separator = ':'
+        else:
+            self.indent = 4
+            self.item_separator = ','
+            self.key_separator = ': '
+
+    def write(self, root):
+        if self.json_file:
+            objects = []
+            self._write_object(root, 0, objects)
+        elif self.ini_file:
+            objects = [ (obj.path(), obj) for obj in root.descendants() ]
+
+        if self.ini_file:
+            # Print ini sections in sorted order for easier diffing
+            objects.sort(key=lambda o: o[0])
+            for path, obj in objects:
+                obj.print_ini(self.ini_file)
+
+    def _newline(self, level):
+        if self.indent is None:
+            return ''
+        return '\n' + ' ' * (self.indent * level)
+
+    def _write_leaf(self, value, level):
+        text = json.dumps(value, indent=self.indent,
+                          separators=(self.item_separator,
+                                      self.key_separator))
+        if self.indent is not None:
+            # Strings are escaped by the encoder, so every newline in
+            # the output is a line break we need to indent further.
+            text = text.replace('\n', self._newline(level))
+        self.json_file.write(text)
+
+    def _write_value(self, value, level, objects):
+        if isSimObject(value):
+            self._write_object(value, level, objects)
+        elif isSimObjectVector(value):
+            self._write_vector(value, level, objects)
+        else:
+            self._write_leaf(value, level)
+
+    def _write_vector(self, vector, level, objects):
+        out = self.json_file
+        if not len(vector):
+            out.write('[]')
+            return
+
+        out.write('[')
+        for i, v in enumerate(vector):
+            if i:
+                out.write(self.item_separator)
+            out.write(self._newline(level + 1))
+            if isSimObject(v):
+                self._write_object(v, level + 1, objects)
+            else:
+                self._write_leaf(v.get_config_as_dict(), level + 1)
+        out.write(self._newline(level))
+        out.write(']')
+
+    def _write_object(self, obj, level, objects):
+        out = self.json_file
+        items = obj.config_items()
+        objects.append((obj.path(), obj))
+        if not items:
+            out.write('{}')
+            return
+
+        out.write('{')
+        for i, (key, value) in enumerate(items.items()):
+            if i:
+                out.write(self.item_separator)
+            out.write(self._newline(level + 1))
+            out.write(json.dumps(key))
+            out.write(self.key_separator)
+            self._write_value(value, level + 1, objects)
+        out.write(self._newline(level))
+        out.write('}')
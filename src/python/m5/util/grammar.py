@@ -25,6 +25,8 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import sys
+import tempfile
 
 import ply.lex
 import ply.yacc
@@ -35,6 +37,10 @@ class ParseError(Exception):
         self.token = token
 
 class Grammar(object):
+    # Version of the parser table cache files. Bump this when their
+    # format changes.
+    table_cache_version = 1
+
     def setupLexerFactory(self, **kwargs):
         if 'module' in kwargs:
             raise AttributeError("module is an illegal attribute")
@@ -45,7 +51,7 @@ class Grammar(object):
             raise AttributeError("module is an illegal attribute")
 
         if 'output' in kwargs:
-            dir,tab = os.path.split(output)
+            dir,tab = os.path.split(kwargs.pop('output'))
             if not tab.endswith('.py'):
                 raise AttributeError('The output file must end with .py')
             kwargs['outputdir'] = dir
@@ -71,7 +77,7 @@ class Grammar(object):
             return self.lex
 
         if attr == 'yacc':
-            self.yacc = ply.yacc.yacc(module=self, **self.yacc_kwargs)
+            self.yacc = self.buildParser()
             return self.yacc
 
         if attr == 'current_lexer':
@@ -92,6 +98,67 @@ class Grammar(object):
         raise AttributeError(
             "'%s' object has no attribute '%s'" % (type(self), attr))
 
+    def tableCacheFile(self):
+        '''The file the parser tables of this grammar are cached in. There
+        is one per grammar class, next to the byte code of the module that
+        defines the class.'''
+        cls = type(self)
+        module = sys.modules.get(cls.__module__)
+        path = getattr(module, '__file__', None)
+        if not path:
+            return None
+        base = os.path.splitext(os.path.basename(path))[0]
+        name = '%s.%s.lalr-%d.pickle' % \
+               (base, cls.__name__, self.table_cache_version)
+        return os.path.join(os.path.dirname(os.path.abspath(path)),
+                            '__pycache__', name)
+
+    def buildParser(self):
+        '''Build the parser, with the cached tables if they were generated
+        from the same grammar. Otherwise the tables are generated and
+        cached for the next time.'''
+        kwargs = self.yacc_kwargs
+        path = None
+        if 'tabmodule' not in kwargs and 'picklefile' not in kwargs:
+            path = self.tableCacheFile()
+        if path is None:
+            return ply.yacc.yacc(module=self, **kwargs)
+
+        # Check the signature of the grammar (the productions, tokens and
+        # precedence) against that of the cached tables, as yacc() does.
+        pdict = dict((k, getattr(self, k)) for k in dir(self))
+        pinfo = ply.yacc.ParserReflect(pdict, log=ply.yacc.NullLogger())
+        pinfo.get_all()
+        if not pinfo.error:
+            try:
+                lr = ply.yacc.LRTable()
+                if lr.read_pickle(path) == pinfo.signature() and \
+                   lr.lr_method == kwargs.get('method', 'LALR'):
+                    lr.bind_callables(pinfo.pdict)
+                    return ply.yacc.LRParser(lr, pinfo.error_func)
+            except Exception:
+                # Missing, stale or corrupt tables are just regenerated
+                pass
+
+        # Generate the tables in a temporary file that replaces the cache
+        # file once complete, so that other processes never see a partial
+        # one. If the tables can't be cached, they aren't written at all.
+        cache_dir = os.path.dirname(path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            os.close(fd)
+        except OSError:
+            return ply.yacc.yacc(module=self, picklefile=os.devnull, **kwargs)
+
+        try:
+            parser = ply.yacc.yacc(module=self, picklefile=tmp_path, **kwargs)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return parser
+
     def parse_string(self, data, source='<string>', debug=None, tracking=0):
         if not isinstance(data, str):
             raise AttributeError(
@@ -101,13 +168,10 @@ class Grammar(object):
         lexer.input(data)
         self.lexers.append((lexer, source))
 
-        lrtab = ply.yacc.LRTable()
-        lrtab.lr_productions = self.yacc.productions
-        lrtab.lr_action = self.yacc.action
-        lrtab.lr_goto = self.yacc.goto
-
-        parser = ply.yacc.LRParser(lrtab, self.yacc.errorfunc)
-        result = parser.parse(lexer=lexer, debug=debug, tracking=tracking)
+        # The parser keeps its state on the stack, so the same one can be
+        # used for all (even nested) parses. Errors aren't recovered from,
+        # so its error recovery state isn't an issue.
+        result = self.yacc.parse(lexer=lexer, debug=debug, tracking=tracking)
         self.lexers.pop()
         return result
 
@@ -0,0 +1,84 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import array
+import json
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from m5.ext.pystats.columnar import ColumnarStatsReader, \
+                                    ColumnarStatsWriter, np
+
+class ColumnarTestSuite(unittest.TestCase):
+    """Test cases for the columnar stats store"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "stats.columns")
+        writer = ColumnarStatsWriter(self.path, chunk_rows=2)
+        writer.append(100, {"a": 1.0, "b": 2.0})
+        writer.append(200, {"a": 3.0, "b": 4.0})
+        writer.append(300, {"a": 5.0, "c": 6.0})
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_layout(self):
+        with open(os.path.join(self.path, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["columns"], ["a", "b", "c"])
+        self.assertEqual([c["ticks"] for c in manifest["chunks"]],
+                         [[100, 200], [300]])
+
+        # The first chunk holds columns a and b, one after the other
+        data = array.array("d")
+        with open(os.path.join(self.path, "chunk-000000.f64"), "rb") as f:
+            data.frombytes(f.read())
+        self.assertEqual(list(data), [1.0, 3.0, 2.0, 4.0])
+
+        data = array.array("d")
+        with open(os.path.join(self.path, "chunk-000001.f64"), "rb") as f:
+            data.frombytes(f.read())
+        self.assertEqual(data[0], 5.0)
+        self.assertTrue(math.isnan(data[1]))
+        self.assertEqual(data[2], 6.0)
+
+    @unittest.skipIf(np is None, "NumPy is not available")
+    def test_reader(self):
+        stats = ColumnarStatsReader(self.path)
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(stats.names(), ["a", "b", "c"])
+        self.assertEqual(stats.ticks().tolist(), [100, 200, 300])
+        self.assertEqual(stats["a"].tolist(), [1.0, 3.0, 5.0])
+        self.assertEqual(stats["b"][:2].tolist(), [2.0, 4.0])
+        self.assertTrue(np.isnan(stats["b"][2]))
+        self.assertTrue(np.isnan(stats["c"][:2]).all())
+        self.assertEqual(stats["c"][2], 6.0)
+        self.assertEqual(sorted(stats.find_re("^[ab]$")), ["a", "b"])
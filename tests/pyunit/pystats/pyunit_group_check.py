@@ -0,0 +1,84 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+import unittest
+
+from m5.ext.pystats.group import Group, Vector
+from m5.ext.pystats.statistic import Scalar
+
+def _cpu(cycles):
+    return Group(numCycles=Scalar(cycles),
+                 vec=Vector({"a": Scalar(1), "b": Scalar(2)}))
+
+class GroupTestSuite(unittest.TestCase):
+    """Test cases for the name lookups of pystats groups"""
+
+    def setUp(self):
+        self.system = Group(cpu1=_cpu(1), cpu0=_cpu(0), other_cpu=_cpu(2),
+                            mem=Group(bytesRead=Scalar(64)))
+
+    def test_find(self):
+        self.assertEqual(list(self.system.find("cpu")),
+                         [self.system.cpu0, self.system.cpu1,
+                          self.system.other_cpu])
+        self.assertEqual(list(self.system.find("cpu1")), [self.system.cpu1])
+        self.assertEqual(list(self.system.find("l2")), [])
+
+    def test_find_re(self):
+        self.assertEqual(list(self.system.find_re("cpu[0-9]")),
+                         [self.system.cpu0, self.system.cpu1])
+        self.assertEqual(list(self.system.find_re("^o.*cpu$")),
+                         [self.system.other_cpu])
+        self.assertEqual(list(self.system.find_re(re.compile("^C", re.I))),
+                         [self.system.cpu0, self.system.cpu1])
+        self.assertEqual(list(self.system.find_re("^mem|cpu1")),
+                         [self.system.cpu1, self.system.mem])
+
+    def test_index_invalidation(self):
+        self.assertEqual(len(list(self.system.find("cpu"))), 3)
+        self.system.cpu2 = _cpu(3)
+        self.assertEqual(len(list(self.system.find("cpu"))), 4)
+        del self.system.cpu0
+        self.assertEqual(len(list(self.system.find_re("^cpu"))), 2)
+        self.assertNotIn("_name_index", self.system.to_json())
+
+    def test_glob(self):
+        self.assertEqual(
+            [path for path, _ in self.system.glob("cpu*.numCycles")],
+            ["cpu0.numCycles", "cpu1.numCycles"])
+        self.assertEqual(
+            [path for path, _ in self.system.glob("**.b")],
+            ["cpu0.vec.b", "cpu1.vec.b", "other_cpu.vec.b"])
+        self.assertEqual(
+            [obj for _, obj in self.system.glob("mem.bytesRead")],
+            [self.system.mem.bytesRead])
+        self.assertEqual(list(self.system.glob("mem.missing")), [])
+
+    def test_find_path_re(self):
+        self.assertEqual(
+            [path for path, _ in self.system.find_path_re(r"\d\.vec\.a$")],
+            ["cpu0.vec.a", "cpu1.vec.a"])
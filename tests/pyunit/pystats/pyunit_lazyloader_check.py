@@ -0,0 +1,182 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import gc
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from m5.ext.pystats.group import Group, Vector
+from m5.ext.pystats.jsonloader import load
+from m5.ext.pystats.lazyloader import LazyLoader, load_lazy
+from m5.ext.pystats.statistic import Distribution, Scalar
+
+def _scalar(value):
+    return {
+        "value": value,
+        "type": "Scalar",
+        "unit": "Count",
+        "description": "A {braced} \"quoted\" description",
+        "datatype": "f64",
+    }
+
+def _stats():
+    cpus = {}
+    for i in range(4):
+        cpus[f"cpu{i}"] = {
+            "type": "Group",
+            "time_conversion": None,
+            "numCycles": _scalar(100 * i),
+            "dist": {
+                "value": [1, 2, 3],
+                "type": "Distribution",
+                "min": 0,
+                "max": 2,
+                "num_bins": 3,
+                "bin_size": 1,
+                "sum": 8,
+                "sum_squared": None,
+                "underflow": 0,
+                "overflow": 0,
+                "logs": None,
+                "unit": "Count",
+                "description": "A distribution",
+                "datatype": "f64",
+            },
+            "vec": {
+                "type": "Vector",
+                "time_conversion": None,
+                "a": _scalar(1),
+                "b": _scalar(2),
+            },
+            "empty": {"type": "Group", "time_conversion": None},
+        }
+    return {
+        "creation_time": "2021-01-01T00:00:00",
+        "time_conversion": None,
+        "simulated_begin_time": 0,
+        "simulated_end_time": 1000,
+        "system": dict(type="Group", time_conversion=None, **cpus),
+    }
+
+class LazyLoaderTestSuite(unittest.TestCase):
+    """Test cases for the lazy pystats JSON loader"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "stats.json")
+        with open(self.path, "w") as f:
+            json.dump(_stats(), f, indent=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self, **kwargs):
+        loader = LazyLoader(self.path, **kwargs)
+        self.addCleanup(loader.close)
+        return loader.load()
+
+    def test_access(self):
+        simstat = self.load()
+        self.assertEqual(simstat.simulated_end_time, 1000)
+        cpu = simstat.system.cpu2
+        self.assertIsInstance(cpu, Group)
+        self.assertIsInstance(cpu.numCycles, Scalar)
+        self.assertEqual(cpu.numCycles.value, 200)
+        self.assertIsInstance(cpu.dist, Distribution)
+        self.assertEqual(cpu.dist.value, [1, 2, 3])
+        self.assertIsInstance(cpu.vec, Vector)
+        self.assertEqual(cpu.vec.b.value, 2)
+        self.assertEqual(cpu.numCycles.description,
+                         "A {braced} \"quoted\" description")
+        with self.assertRaises(AttributeError):
+            cpu.notAStat
+
+    def test_only_touched_objects_are_loaded(self):
+        simstat = self.load()
+        simstat.system.cpu1.numCycles
+        system = simstat.system
+        self.assertNotIn("cpu0", system.__dict__)
+        self.assertIn("cpu1", system.__dict__)
+        self.assertNotIn("dist", system.cpu1.__dict__)
+
+    def test_to_json_matches_full_load(self):
+        with open(self.path) as f:
+            full = load(f)
+        lazy = self.load(use_index_file=False)
+        self.assertEqual(lazy.to_json(), full.to_json())
+
+    def test_index_file(self):
+        self.load()
+        self.assertTrue(os.path.exists(self.path + ".idx"))
+        simstat = self.load()
+        self.assertEqual(simstat.system.cpu3.numCycles.value, 300)
+
+    def test_stale_index_file(self):
+        self.load()
+        stats = _stats()
+        stats["system"]["cpu3"]["numCycles"]["value"] = 12345
+        with open(self.path, "w") as f:
+            json.dump(stats, f)
+        simstat = self.load()
+        self.assertEqual(simstat.system.cpu3.numCycles.value, 12345)
+
+    def test_close(self):
+        with LazyLoader(self.path) as loader:
+            simstat = loader.load()
+            cpu = simstat.system.cpu0
+            self.assertEqual(cpu.numCycles.value, 0)
+        # What was accessed is still there, but the file is closed
+        self.assertEqual(cpu.numCycles.value, 0)
+        self.assertTrue(loader._file.closed)
+        with self.assertRaises(ValueError):
+            simstat.system.cpu1
+
+    def test_load_lazy_releases_file(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            simstat = load_lazy(self.path)
+            self.assertEqual(simstat.system.cpu1.numCycles.value, 100)
+            del simstat
+            gc.collect()
+        self.assertEqual([ w for w in caught
+                           if issubclass(w.category, ResourceWarning) ], [])
+
+    def test_name_index_survives_materialization(self):
+        system = self.load().system
+        self.assertEqual([ cpu.numCycles.value
+                           for cpu in system.find_re("^cpu[13]$") ],
+                         [ 100, 300 ])
+        index = system._name_index
+        self.assertIsNotNone(index)
+        self.assertIn("cpu1", system.__dict__)
+        self.assertEqual(len(list(system.glob("cpu*"))), 4)
+        self.assertIs(system._name_index, index)
+        self.assertEqual(len(list(system.find("cpu"))), 4)
+        self.assertIs(system._name_index, index)
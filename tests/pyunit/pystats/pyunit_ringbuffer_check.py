@@ -0,0 +1,65 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from m5.ext.pystats.ringbuffer import StatsRingBufferWriter, \
+                                      read_ring_buffer
+
+class RingBufferTestSuite(unittest.TestCase):
+    """Test cases for the stats ring buffer"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "stats.ring")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_partial(self):
+        ring = StatsRingBufferWriter(self.path, ["a", "b::0"], 4)
+        ring.append(10, [1.0, 2.0])
+        ring.append(20, [3.0, 4.0])
+        ring.close()
+
+        names, samples = read_ring_buffer(self.path)
+        self.assertEqual(names, ["a", "b::0"])
+        self.assertEqual(list(samples), [(10, (1.0, 2.0)), (20, (3.0, 4.0))])
+
+    def test_wrap_around(self):
+        ring = StatsRingBufferWriter(self.path, ["a"], 3)
+        for i in range(7):
+            ring.append(i * 100, [float(i)])
+        size = os.path.getsize(self.path)
+        ring.close()
+
+        self.assertEqual(os.path.getsize(self.path), size)
+        names, samples = read_ring_buffer(self.path)
+        self.assertEqual(list(samples),
+                         [(400, (4.0,)), (500, (5.0,)), (600, (6.0,))])
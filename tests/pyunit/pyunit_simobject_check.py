@@ -0,0 +1,130 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from m5.objects import *
+from m5.params import NULL, Param, isNullPointer
+from m5.proxy import isproxy
+from m5.SimObject import isSimObject
+
+def walk_descendants(obj):
+    yield obj
+    for name, child in sorted(obj._children.items()):
+        for c in child:
+            yield from walk_descendants(c)
+
+def walk_find_all(obj, ptype):
+    """Reference implementation of SimObject.find_all() that walks the
+    hierarchy on every call"""
+    all = {}
+    for child in obj._children.values():
+        children = child if isinstance(child, list) else [child]
+        for child in children:
+            if isinstance(child, ptype) and not isproxy(child) and \
+                    not isNullPointer(child):
+                all[child] = True
+            if isSimObject(child):
+                all.update(dict.fromkeys(walk_find_all(child, ptype), True))
+    for pname, pdesc in obj._params.items():
+        if issubclass(pdesc.ptype, ptype):
+            match_obj = obj._values[pname]
+            if not isproxy(match_obj) and not isNullPointer(match_obj):
+                all[match_obj] = True
+    return sorted(all.keys(), key=lambda o: o.path())
+
+class SimObjectTestSuite(unittest.TestCase):
+    """Test cases for the SimObject hierarchy and its lookups"""
+
+    def setUp(self):
+        self.system = System(physmem = SimpleMemory())
+        self.system.voltage_domain = VoltageDomain()
+        self.system.clk_domain = SrcClockDomain(
+            clock = '1GHz', voltage_domain = self.system.voltage_domain)
+        self.system.xbar = SystemXBar()
+        self.system.tester = [ MemTest() for i in range(4) ]
+        self.system.cache = [ Cache(size = '32kB', assoc = 4,
+                                    tag_latency = 1, data_latency = 1,
+                                    response_latency = 1, mshrs = 4,
+                                    tgts_per_mshr = 8)
+                              for i in range(4) ]
+
+    def assertFindAllMatches(self, types):
+        for obj in walk_descendants(self.system):
+            for ptype in types:
+                found, done = obj.find_all(ptype)
+                self.assertTrue(done)
+                self.assertEqual(found, walk_find_all(obj, ptype))
+
+    def test_descendants(self):
+        self.assertEqual(list(self.system.descendants()),
+                         list(walk_descendants(self.system)))
+
+    def test_descendants_add_child(self):
+        before = list(self.system.descendants())
+        self.system.cache[0].extra = SimpleMemory()
+        after = list(self.system.descendants())
+        self.assertEqual(len(after), len(before) + 1)
+        self.assertEqual(after, list(walk_descendants(self.system)))
+
+    def test_descendants_clear_child(self):
+        list(self.system.descendants())
+        self.system.clear_child('xbar')
+        self.assertEqual(list(self.system.descendants()),
+                         list(walk_descendants(self.system)))
+
+    def test_find_all(self):
+        self.assertFindAllMatches(
+            (ClockedObject, AbstractMemory, BaseCache, MemTest,
+             VoltageDomain, ClockDomain))
+
+    def test_find_all_add_child(self):
+        self.assertFindAllMatches((AbstractMemory,))
+        self.system.cache[1].extra = SimpleMemory()
+        self.assertFindAllMatches((AbstractMemory,))
+
+    def test_find_any(self):
+        cache = self.system.cache[0]
+        found, done = cache.find_any(VoltageDomain)
+        self.assertFalse(done)
+        found, done = self.system.find_any(VoltageDomain)
+        self.assertTrue(done)
+        self.assertIs(found, self.system.voltage_domain)
+
+    def test_params_of_type_new_param(self):
+        class MemoTest(MemTest):
+            pass
+        class DerivedMemoTest(MemoTest):
+            pass
+
+        for cls in MemoTest, DerivedMemoTest:
+            self.assertEqual(cls._paramsOfType(VoltageDomain), ())
+        MemoTest._new_param('memo_domain',
+                            Param.VoltageDomain(NULL, "A voltage domain"))
+        for cls in MemoTest, DerivedMemoTest:
+            self.assertNotIn('_paramsByType', cls.__dict__)
+            self.assertEqual(cls._paramsOfType(VoltageDomain),
+                             ('memo_domain', ))
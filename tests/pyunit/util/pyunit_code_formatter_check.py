@@ -0,0 +1,148 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import unittest
+
+from m5.util.code_formatter import code_formatter
+
+class Foo(dict):
+    def __init__(self, **kwargs):
+        self.update(kwargs)
+    def __getattr__(self, attr):
+        return self[attr]
+
+x = "this is a test"
+l = [ [Foo(x=[Foo(y=9)])] ]
+
+def generate(code):
+    """Generate some code with all the kinds of substitutions"""
+    y = code_formatter()
+    y('''
+{
+    this_is_a_test();
+}
+''')
+    code('    $y')
+    code('''$__file__:$__line__
+{''')
+    code("${{', '.join(str(x) for x in range(4))}}")
+    code('${x}')
+    code('$x $$x $$${x}$$')
+    code.indent()
+    for i in range(5):
+        code('$x')
+        code('$i')
+        code('$0', "zero")
+        code('$1 $0', "zero", "one")
+        code('${0}', "he went")
+        code('${0}asdf', "he went")
+        code('$kwarg ${{kwarg * 2}}', kwarg=i)
+    code.dedent()
+    code('''
+    ${{l[0][0]["x"][0].y}}
+}
+''', 1, 9)
+    code()
+    code('static const char *name = "$x";')
+
+    lone = code_formatter()
+    lone('int a;\n\nint b;')
+    code.indent(2)
+    code('''
+namespace foo {
+  $lone
+    ${lone}
+} // namespace foo''')
+    code.dedent(2)
+
+    old = code.nofix()
+    code('no\nfix\n    $x\n\n')
+    code.fix(old)
+
+    code['member'] = 'a dict member'
+    code('$member;')
+    code('')
+    return code
+
+class CodeFormatterTestSuite(unittest.TestCase):
+    """The output of compiled formats must be identical to that of the
+    regular expression substitution"""
+
+    def assertSameOutput(self, func):
+        compiled = str(func(code_formatter(compiled=True)))
+        interpreted = str(func(code_formatter(compiled=False)))
+        self.assertEqual(compiled, interpreted)
+        return compiled
+
+    def test_generate(self):
+        code = self.assertSameOutput(generate)
+        self.assertIn('\nthis is a test $x $this is a test$\n', code)
+        self.assertIn('        this_is_a_test();\n', code)
+
+    def test_twice(self):
+        # The second time, the formats are in the cache
+        def twice(code):
+            generate(code)
+            return generate(code)
+        self.assertSameOutput(twice)
+
+    def test_lone_indent(self):
+        def func(code):
+            body = 'a;\nb;\n'
+            code('''
+{
+    $body
+}''')
+            return code
+        self.assertEqual(self.assertSameOutput(func),
+                         '{\n    a;\n    b;\n\n}\n')
+
+    def test_errors(self):
+        for compiled in True, False:
+            code = code_formatter(compiled=compiled)
+            with self.assertRaises(ValueError):
+                code('$0 $2', 'a')
+            with self.assertRaises(IndexError):
+                code('$0 $1', 'a')
+            with self.assertRaises(IndexError):
+                code('$undefined_name')
+            with self.assertRaises(ValueError):
+                code('a $ b')
+            with self.assertRaises(SyntaxError):
+                code('${{1 +}}')
+            with self.assertRaises(ZeroDivisionError):
+                code('${{1 / 0}}')
+            # Nothing is output when the substitution fails
+            self.assertEqual(str(code), '')
+
+    def test_cache_size(self):
+        code = code_formatter()
+        for i in range(code_formatter._max_compiled_formats + 1):
+            code('int a%d = $0;' % i, i)
+        self.assertLessEqual(len(code_formatter._compiled_formats),
+                             code_formatter._max_compiled_formats)
+        self.assertTrue(str(code).endswith('int a%d = %d;\n' % (i, i)))
@@ -0,0 +1,128 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from m5.util.grammar import Grammar, ParseError
+except ImportError:
+    # PLY isn't available
+    Grammar = None
+
+class Terms(Grammar or object):
+    """The terms of the grammars below: numbers, and quoted expressions
+    which are parsed (by the same parser) while the enclosing expression
+    is parsed"""
+
+    tokens = ('NUM', 'PLUS', 'QUOTED')
+    t_PLUS = r'\+'
+    t_ignore = ' '
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+
+    def tableCacheFile(self):
+        return self.cache_file
+
+    def t_NUM(self, t):
+        r'\d+'
+        t.value = int(t.value)
+        return t
+
+    def t_QUOTED(self, t):
+        r'"[^"]*"'
+        t.value = t.value[1:-1]
+        return t
+
+    def p_expr_term(self, p):
+        'expr : term'
+        p[0] = p[1]
+
+    def p_term_num(self, p):
+        'term : NUM'
+        p[0] = p[1]
+
+    def p_term_quoted(self, p):
+        'term : QUOTED'
+        p[0] = self.parse_string(p[1])
+
+class Sum(Terms):
+    """Sums"""
+
+    def p_expr_sum(self, p):
+        'expr : expr PLUS term'
+        p[0] = p[1] + p[3]
+
+class Difference(Terms):
+    """Right associative differences, with different tables than Sum"""
+
+    def p_expr_difference(self, p):
+        'expr : term PLUS expr'
+        p[0] = p[1] - p[3]
+
+@unittest.skipIf(Grammar is None, "PLY is not available")
+class GrammarTestSuite(unittest.TestCase):
+    """Test cases for the parser table cache of Grammar"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp_dir.name, 'tables.pickle')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cache(self):
+        self.assertEqual(Sum(self.cache_file).parse_string('1 + 2 + 3'), 6)
+        self.assertTrue(os.path.isfile(self.cache_file))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['tables.pickle'])
+
+        # The cached tables are used rather than generated again
+        with mock.patch('ply.yacc.yacc', side_effect=AssertionError):
+            self.assertEqual(
+                Sum(self.cache_file).parse_string('4 + 5'), 9)
+
+    def test_stale_cache(self):
+        Sum(self.cache_file).yacc
+        self.assertEqual(
+            Difference(self.cache_file).parse_string('1 + 2 + 3'), 2)
+        with mock.patch('ply.yacc.yacc', side_effect=AssertionError):
+            self.assertEqual(
+                Difference(self.cache_file).parse_string('4 + 5'), -1)
+
+    def test_corrupt_cache(self):
+        with open(self.cache_file, 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(Sum(self.cache_file).parse_string('1 + 2'), 3)
+
+    def test_nested_parse(self):
+        grammar = Sum(self.cache_file)
+        self.assertEqual(grammar.parse_string('1 + "2 + 3" + 4'), 10)
+        with self.assertRaises(ParseError):
+            grammar.parse_string('1 + "2 +"')
+        self.assertEqual(grammar.parse_string('2 + 2'), 4)
@@ -0,0 +1,127 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, os.pardir, os.pardir, 'util'))
+
+from stats.db import SQLiteDatabase
+
+window = '''
+---------- Begin Simulation Statistics ----------
+simTicks                                 %(ticks)d                       # Number of ticks simulated (Tick)
+finalTick                                %(final)d                       # Number of ticks from beginning of simulation (restored from checkpoints and never reset) (Tick)
+simFreq                                  1000000000000                       # The number of ticks per simulated second ((Tick/Second))
+system.cpu.numCycles                          %(cycles)d                       # Number of cpu cycles simulated (Cycle)
+
+---------- End Simulation Statistics   ----------
+'''
+
+class StatsDatabaseTestSuite(unittest.TestCase):
+    """Test cases for the ingestion of stats files by SQLiteDatabase"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(os.path.join(self.tmp_dir.name, 'db'))
+        self.db.connect()
+
+    def tearDown(self):
+        self.db.thedb.close()
+        self.tmp_dir.cleanup()
+
+    def stats_txt(self, final_ticks):
+        path = os.path.join(self.tmp_dir.name, 'stats.txt')
+        with open(path, 'w') as f:
+            for i, final in enumerate(final_ticks):
+                f.write(window % { 'ticks' : 1000 * (i + 1),
+                                   'final' : final,
+                                   'cycles' : 2000 * (i + 1) })
+        return path
+
+    def data(self, stat):
+        cursor = self.db.thedb.cursor()
+        cursor.execute('select dt_tick,dt_data from data,stats '
+                       'where dt_stat=st_id and st_name=? '
+                       'order by dt_tick', (stat, ))
+        return cursor.fetchall()
+
+    def test_stats_txt(self):
+        path = self.stats_txt([ 1000, 2000, 3000 ])
+        sys_path = list(sys.path)
+        self.assertEqual(self.db.ingest('run', path), 3)
+        self.assertEqual(sys.path, sys_path)
+        self.assertEqual(self.data('system.cpu.numCycles'),
+                         [ (1000, 2000.0), (2000, 4000.0), (3000, 6000.0) ])
+        self.assertEqual(self.data('simTicks'),
+                         [ (1000, 1000.0), (2000, 2000.0), (3000, 3000.0) ])
+        self.assertEqual(self.data('finalTick'), [])
+
+        # Ingesting the run again replaces its data
+        path = self.stats_txt([ 1000, 2000 ])
+        self.assertEqual(self.db.ingest('run', path), 2)
+        self.assertEqual(self.data('system.cpu.numCycles'),
+                         [ (1000, 2000.0), (2000, 4000.0) ])
+
+    def test_same_tick(self):
+        path = self.stats_txt([ 1000, 1000 ])
+        with self.assertRaises(ValueError):
+            self.db.ingest('run', path)
+        self.assertEqual(self.data('system.cpu.numCycles'), [])
+
+    def test_no_tick(self):
+        path = self.stats_txt([ 1000, 2000 ])
+        with open(path) as f:
+            text = f.read()
+        with open(path, 'w') as f:
+            f.write(text.replace('finalTick', 'otherTick', 1))
+        with self.assertRaises(ValueError):
+            self.db.ingest('run', path)
+        self.assertEqual(self.data('system.cpu.numCycles'), [])
+
+    def test_json(self):
+        path = os.path.join(self.tmp_dir.name, 'stats.json')
+        dumps = [ { 'simulated_end_time' : 1000 * (i + 1),
+                    'system' : { 'numCycles' : { 'type' : 'Scalar',
+                                                 'value' : 2000 * (i + 1) } } }
+                  for i in range(2) ]
+        with open(path, 'w') as f:
+            json.dump(dumps, f)
+        self.assertEqual(self.db.ingest('run', path), 2)
+        self.assertEqual(self.data('system.numCycles'),
+                         [ (1000, 2000.0), (2000, 4000.0) ])
+
+        for dump in dumps:
+            del dump['simulated_end_time']
+        with open(path, 'w') as f:
+            json.dump(dumps, f)
+        with self.assertRaises(ValueError):
+            self.db.ingest('json', path)
@@ -0,0 +1,153 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, os.pardir, os.pardir, 'util'))
+
+import stats_txt
+
+# A window of a stats.txt file, as written by gem5
+window = '''
+---------- Begin Simulation Statistics ----------
+simSeconds                                   0.%(seconds)06d                       # Number of seconds simulated (Second)
+simTicks                                 %(ticks)d                       # Number of ticks simulated (Tick)
+finalTick                                %(ticks)d                       # Number of ticks from beginning of simulation (restored from checkpoints and never reset) (Tick)
+simFreq                                  1000000000000                       # The number of ticks per simulated second ((Tick/Second))
+system.cpu.numCycles                          %(cycles)d                       # Number of cpu cycles simulated (Cycle)
+
+---------- End Simulation Statistics   ----------
+'''
+
+def stats_file(path, num_windows, legacy=False):
+    with open(path, 'w') as f:
+        for i in range(1, num_windows + 1):
+            text = window % { 'seconds' : i, 'ticks' : i * 1000000,
+                              'cycles' : i * 2000 }
+            if legacy:
+                text = text.replace('finalTick', 'final_tick') \
+                           .replace('simFreq', 'sim_freq')
+            f.write(text)
+
+class StatsTxtTestSuite(unittest.TestCase):
+    """Test cases for the stats.txt window parser"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'stats.txt')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_windows(self, windows, num_windows):
+        self.assertEqual(len(windows), num_windows)
+        self.assertEqual(windows.ticks,
+                         [ i * 1000000 for i in range(1, num_windows + 1) ])
+        self.assertEqual(windows.sim_freq, 1000000000000)
+        self.assertEqual(list(windows['system.cpu.numCycles']),
+                         [ i * 2000.0 for i in range(1, num_windows + 1) ])
+        # The final ticks and the frequency aren't regular statistics
+        for name in windows.names():
+            self.assertNotIn(name,
+                             ('finalTick', 'simFreq', 'final_tick',
+                              'sim_freq'))
+
+    def test_windows(self):
+        stats_file(self.path, 2)
+        windows = stats_txt.read_stats(self.path, descriptions=True)
+        self.check_windows(windows, 2)
+        self.assertEqual(windows.descriptions['system.cpu.numCycles'],
+                         'Number of cpu cycles simulated (Cycle)')
+
+    def test_legacy_names(self):
+        stats_file(self.path, 2, legacy=True)
+        self.check_windows(stats_txt.read_stats(self.path), 2)
+
+    def test_names(self):
+        stats_file(self.path, 2)
+        windows = stats_txt.read_stats(self.path, ['system.cpu.numCycles'])
+        self.check_windows(windows, 2)
+        self.assertEqual(windows.names(), ['system.cpu.numCycles'])
+
+    def test_max_tick(self):
+        stats_file(self.path, 4)
+        windows = stats_txt.read_stats(self.path, max_tick=2500000)
+        self.check_windows(windows, 2)
+
+    def test_jobs(self):
+        stats_file(self.path, 5)
+        windows = stats_txt.read_stats(self.path, jobs=2, batch_size=2)
+        self.check_windows(windows, 5)
+
+    def test_untimed_window(self):
+        stats_file(self.path, 3)
+        with open(self.path) as f:
+            lines = f.readlines()
+        # The second window has no final tick
+        del lines[[ i for i, line in enumerate(lines)
+                    if line.startswith('finalTick') ][1]]
+        with open(self.path, 'w') as f:
+            f.writelines(lines)
+
+        windows = stats_txt.read_stats(self.path)
+        self.assertEqual(windows.ticks, [ 1000000, None, 3000000 ])
+        timed = windows.timed()
+        self.assertEqual(timed.ticks, [ 1000000, 3000000 ])
+        self.assertEqual(list(timed['system.cpu.numCycles']),
+                         [ 2000.0, 6000.0 ])
+        self.assertEqual(list(timed['simTicks']), [ 1000000.0, 3000000.0 ])
+        self.assertEqual(timed.sim_freq, 1000000000000)
+
+    def test_wanted_final_tick(self):
+        stats_file(self.path, 2)
+        windows = stats_txt.read_stats(self.path, ['finalTick', 'simFreq'])
+        self.assertEqual(windows.ticks, [ 1000000, 2000000 ])
+        self.assertEqual(windows.sim_freq, 1000000000000)
+        self.assertEqual(list(windows['finalTick']), [ 1000000, 2000000 ])
+        self.assertEqual(list(windows['simFreq']),
+                         [ 1000000000000 ] * 2)
+
+    def test_aliases(self):
+        # A window with both the current and the legacy names
+        stats_file(self.path, 2)
+        with open(self.path) as f:
+            text = f.read()
+        with open(self.path, 'w') as f:
+            f.write(text.replace('simTicks', 'final_tick'))
+
+        windows = stats_txt.read_stats(self.path)
+        self.check_windows(stats_txt.read_stats(self.path,
+                                                ['system.cpu.numCycles']), 2)
+        self.assertEqual(windows.ticks, [ 1000000, 2000000 ])
+        self.assertEqual(list(windows['final_tick']), [ 1000000, 2000000 ])
+        windows = stats_txt.read_stats(self.path, ['final_tick'])
+        self.assertEqual(windows.ticks, [ 1000000, 2000000 ])
+        self.assertEqual(windows.names(), [ 'final_tick' ])
@@ -26,11 +26,31 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+"""Merge the checkpoints of several single-process simulations.
+
+The configurations are merged into one m5.cpt with one CPU per input
+checkpoint, and the physical memory images are concatenated. The
+memory images are decompressed (and, unless --no-compress is given,
+compressed again) in parallel by a pool of worker processes, each of
+which handles one input image. Compressed output is written as one gzip
+member per input, which gzip readers (including gem5's) read as a
+single stream. Uncompressed output is written as a sparse file, leaving
+holes for the blocks that are all zeros and for the padding up to
+--memory-size.
+"""
+
 from configparser import ConfigParser
 import gzip
+import multiprocessing
+import shutil
+import time
 
 import sys, re, os
 
+PAGE_SIZE = 1 << 12
+# Size of the blocks the memory images are streamed in
+BLOCK_SIZE = 16 << 20
+
 class myCP(ConfigParser):
     def __init__(self):
         ConfigParser.__init__(self)
@@ -38,19 +58,76 @@ class myCP(ConfigParser):
     def optionxform(self, optionstr):
         return optionstr
 
-def aggregate(output_dir, cpts, no_compress, memory_size):
-    merged_config = None
-    page_ptr = 0
+def _copy_pmem(src, dst, offset, size, compress_level):
+    """Copy the first size bytes of the gzip compressed memory image src.
 
-    output_path = output_dir
-    if not os.path.isdir(output_path):
-        os.system("mkdir -p " + output_path)
+    If compress_level is None, the data is written to the (already
+    sized) file dst at offset, skipping the blocks that are all zeros.
+    Otherwise dst is created and the data is written to it as a gzip
+    member compressed with the given level.
 
-    agg_mem_file = open(output_path + "/system.physmem.store0.pmem", "wb+")
-    agg_config_file = open(output_path + "/m5.cpt", "wb+")
+    Returns the number of bytes copied and the time it took.
+    """
+    start = time.time()
+    zero_block = bytes(BLOCK_SIZE)
+    copied = 0
 
-    if not no_compress:
-        merged_mem = gzip.GzipFile(fileobj= agg_mem_file, mode="wb")
+    with gzip.open(src, "rb") as gf:
+        if compress_level is None:
+            fd = os.open(dst, os.O_WRONLY)
+            try:
+                while copied < size:
+                    data = gf.read(min(BLOCK_SIZE, size - copied))
+                    if not data:
+                        break
+                    if data != zero_block[:len(data)]:
+                        os.pwrite(fd, data, offset + copied)
+                    copied += len(data)
+            finally:
+                os.close(fd)
+        else:
+            with open(dst, "wb") as f, \
+                 gzip.GzipFile(fileobj=f, mode="wb",
+                               compresslevel=compress_level) as out:
+                while copied < size:
+                    data = gf.read(min(BLOCK_SIZE, size - copied))
+                    if not data:
+                        break
+                    out.write(data)
+                    copied += len(data)
+
+    if copied < size:
+        raise IOError("%s: expected %d bytes of memory, found %d" %
+                      (src, size, copied))
+    return copied, time.time() - start
+
+def _zero_pmem(dst, size, compress_level):
+    """Write size bytes of zeros to dst as a gzip member."""
+    start = time.time()
+    zero_block = bytes(BLOCK_SIZE)
+    with open(dst, "wb") as f, \
+         gzip.GzipFile(fileobj=f, mode="wb",
+                       compresslevel=compress_level) as out:
+        left = size
+        while left > 0:
+            out.write(zero_block[:min(BLOCK_SIZE, left)])
+            left -= BLOCK_SIZE
+    return size, time.time() - start
+
+def _run_task(task):
+    func, args = task
+    return func(*args)
+
+def merge_configs(cpts, agg_config_file):
+    """Merge the configurations of the checkpoints.
+
+    All but the last configuration are written to agg_config_file as they
+    are merged. Returns the configuration still to be written, the number
+    of memory pages of each checkpoint and the largest curTick.
+    """
+    merged_config = None
+    page_ptr = 0
+    pages = []
 
     max_curtick = 0
     num_digits = len(str(len(cpts)-1))
@@ -59,7 +136,8 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
         print(arg)
         merged_config = myCP()
         config = myCP()
-        config.readfp(open(cpts[i] + "/m5.cpt"))
+        with open(cpts[i] + "/m5.cpt") as f:
+            config.read_file(f)
 
         for sec in config.sections():
             if re.compile("cpu").search(sec):
@@ -69,12 +147,13 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
                 items = config.items(sec)
                 for item in items:
                     if item[0] == "paddr":
-                        merged_config.set(newsec, item[0], int(item[1]) + (page_ptr << 12))
+                        merged_config.set(newsec, item[0],
+                                          str(int(item[1]) + (page_ptr << 12)))
                         continue
                     merged_config.set(newsec, item[0], item[1])
 
                 if re.compile("workload.FdMap256$").search(sec):
-                    merged_config.set(newsec, "M5_pid", i)
+                    merged_config.set(newsec, "M5_pid", str(i))
 
             elif sec == "system":
                 pass
@@ -91,55 +170,90 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
         if i != len(cpts)-1:
             merged_config.write(agg_config_file)
 
-        ### memory stuff
-        pages = int(config.get("system", "pagePtr"))
-        page_ptr = page_ptr + pages
-        print("pages to be read: ", pages)
+        pages.append(int(config.get("system", "pagePtr")))
+        page_ptr = page_ptr + pages[-1]
+        print("pages to be read: ", pages[-1])
 
-        f = open(cpts[i] + "/system.physmem.store0.pmem", "rb")
-        gf = gzip.GzipFile(fileobj=f, mode="rb")
+    return merged_config, pages, max_curtick
 
-        x = 0
-        while x < pages:
-            bytesRead = gf.read(1 << 12)
-            if not no_compress:
-                merged_mem.write(bytesRead)
-            else:
-                agg_mem_file.write(bytesRead)
-            x += 1
+def aggregate(output_dir, cpts, no_compress, memory_size, jobs=None,
+              compress_level=6):
+    output_path = output_dir
+    os.makedirs(output_path, exist_ok=True)
+
+    with open(output_path + "/m5.cpt", "w") as agg_config_file:
+        merged_config, pages, max_curtick = \
+            merge_configs(cpts, agg_config_file)
+
+    page_ptr = sum(pages)
+    mem_size = page_ptr * PAGE_SIZE
+    pad_size = 0
+    if memory_size is not None and mem_size < memory_size:
+        pad_pages = (memory_size - mem_size + PAGE_SIZE - 1) // PAGE_SIZE
+        pad_size = pad_pages * PAGE_SIZE
+        page_ptr += pad_pages
+
+    ### memory stuff
+    pmem_path = output_path + "/system.physmem.store0.pmem"
+    tasks = []
+    parts = []
+    offset = 0
+    if no_compress:
+        # Size the output up front, leaving holes for the padding
+        with open(pmem_path, "wb") as f:
+            f.truncate(mem_size + pad_size)
+        for i, cpt in enumerate(cpts):
+            tasks.append((_copy_pmem,
+                          (cpt + "/system.physmem.store0.pmem", pmem_path,
+                           offset, pages[i] * PAGE_SIZE, None)))
+            offset += pages[i] * PAGE_SIZE
+    else:
+        for i, cpt in enumerate(cpts):
+            parts.append("%s.part%d" % (pmem_path, i))
+            tasks.append((_copy_pmem,
+                          (cpt + "/system.physmem.store0.pmem", parts[-1],
+                           0, pages[i] * PAGE_SIZE, compress_level)))
+        if pad_size:
+            parts.append("%s.part%d" % (pmem_path, len(cpts)))
+            tasks.append((_zero_pmem, (parts[-1], pad_size, compress_level)))
+
+    start = time.time()
+    with multiprocessing.Pool(jobs) as pool:
+        for task, (copied, elapsed) in zip(tasks,
+                                           pool.imap(_run_task, tasks)):
+            print("%s: %.1f MiB in %.2fs (%.1f MiB/s)" %
+                  (task[1][0] if task[0] is _copy_pmem else "padding",
+                   copied / 2**20, elapsed,
+                   copied / 2**20 / max(elapsed, 1e-9)))
+
+    if parts:
+        # Concatenated gzip members make a valid gzip stream
+        with open(pmem_path, "wb") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out, BLOCK_SIZE)
+                os.remove(part)
 
-        gf.close()
-        f.close()
+    elapsed = time.time() - start
+    total = mem_size + pad_size
+    print("Memory: %.1f MiB in %.2fs (%.1f MiB/s)" %
+          (total / 2**20, elapsed, total / 2**20 / max(elapsed, 1e-9)))
 
     merged_config.add_section("system")
-    merged_config.set("system", "pagePtr", page_ptr)
-    merged_config.set("system", "nextPID", len(cpts))
-
-    file_size = page_ptr * 4 * 1024
-    dummy_data = "".zfill(4096)
-    while file_size < memory_size:
-        if not no_compress:
-            merged_mem.write(dummy_data)
-        else:
-            agg_mem_file.write(dummy_data)
-        file_size += 4 * 1024
-        page_ptr += 1
+    merged_config.set("system", "pagePtr", str(page_ptr))
+    merged_config.set("system", "nextPID", str(len(cpts)))
 
     print("WARNING: ")
     print("Make sure the simulation using this checkpoint has at least ", end=' ')
     print(page_ptr, "x 4K of memory")
-    merged_config.set("system.physmem.store0", "range_size", page_ptr * 4 * 1024)
+    merged_config.set("system.physmem.store0", "range_size",
+                      str(page_ptr * PAGE_SIZE))
 
     merged_config.add_section("Globals")
-    merged_config.set("Globals", "curTick", max_curtick)
-
-    merged_config.write(agg_config_file)
+    merged_config.set("Globals", "curTick", str(max_curtick))
 
-    if not no_compress:
-        merged_mem.close()
-        agg_mem_file.close()
-    else:
-        agg_mem_file.close()
+    with open(output_path + "/m5.cpt", "a") as agg_config_file:
+        merged_config.write(agg_config_file)
 
 if __name__ == "__main__":
     from argparse import ArgumentParser
@@ -147,9 +261,17 @@ if __name__ == "__main__":
                             "hold the checkpoints to be combined>")
     parser.add_argument("-o", "--output-dir", action="store",
                         help="Output directory")
-    parser.add_argument("-c", "--no-compress", action="store_true")
+    parser.add_argument("-c", "--no-compress", action="store_true",
+                        help="Write the memory image as an uncompressed "
+                        "sparse file")
     parser.add_argument("--cpts", nargs='+')
     parser.add_argument("--memory-size", action="store", type=int)
+    parser.add_argument("-j", "--jobs", action="store", type=int,
+                        help="Number of worker processes (default: number "
+                        "of CPUs)")
+    parser.add_argument("--compress-level", action="store", type=int,
+                        default=6, choices=range(1, 10),
+                        help="gzip compression level of the memory image")
 
     # Assume x86 ISA.  Any other ISAs would need extra stuff in this script
     # to appropriately parse their page tables and understand page sizes.
@@ -160,4 +282,4 @@ if __name__ == "__main__":
                      "need to be combined.")
 
     aggregate(options.output_dir, options.cpts, options.no_compress,
-              options.memory_size)
+              options.memory_size, options.jobs, options.compress_level)
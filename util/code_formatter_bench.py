@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Benchmark the code_formatter, with and without the compiled formats.
+# A synthetic workload, modeled on the code generated for SimObject
+# params, debug flags and enums, is generated a number of times, and so
+# is the C++ code of the SLICC protocols given on the command line. The
+# time it takes is reported for both modes, and the generated code is
+# checked to be identical.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+gem5_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [ os.path.join(gem5_root, 'src', 'mem'),
+                  os.path.join(gem5_root, 'src', 'python'),
+                  os.path.join(gem5_root, 'ext', 'ply') ]
+
+from m5.util.code_formatter import code_formatter
+
+def synthetic(num_objects):
+    code = code_formatter()
+    for i in range(num_objects):
+        name = 'Object%d' % i
+        params = [ ('param%d' % j, 'uint%d_t' % (8 << (j % 4)))
+                   for j in range(10) ]
+        code('''\
+#ifndef __PARAMS__${name}__
+#define __PARAMS__${name}__
+
+namespace gem5
+{
+
+struct ${name}Params
+    : public SimObjectParams
+{''')
+        code.indent()
+        code('${name} *create() const;')
+        for param, ptype in params:
+            code('$ptype $param;')
+        code('''
+// Positional and evaluated substitutions
+static const int ${name}_count = $0;
+static const int ${name}_size = ${{len(params) * 8}};''', len(params))
+        code.dedent()
+        code('''\
+};
+
+} // namespace gem5
+
+#endif // __PARAMS__${name}__''')
+
+        flag = code_formatter()
+        flag('''\
+namespace debug
+{
+
+SimpleFlag ${name}("$name", "Debug flag $$i of ${{name.lower()}}");
+
+} // namespace debug''')
+        code('''
+namespace gem5
+{
+    $flag
+} // namespace gem5''')
+        # Formats built at run time, like the embedded blobs
+        code(''.join('0x%02x, ' % (b & 0xff) for b in range(i, i + 16)))
+    return str(code)
+
+def slicc(protocol, output_dir):
+    from slicc.parser import SLICC
+    # Files are included relative to the protocol directory
+    base_dir = os.path.join(gem5_root, 'src', 'mem', 'ruby', 'protocol')
+    path = os.path.join(base_dir, protocol + '.slicc')
+    if not os.path.exists(path):
+        path = os.path.join(base_dir, protocol.lower(), protocol + '.slicc')
+    slicc = SLICC(path, base_dir, verbose=False)
+    slicc.process()
+
+    start = time.time()
+    slicc.writeCodeFiles(output_dir, [])
+    elapsed = time.time() - start
+
+    outputs = {}
+    for name in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, name)) as f:
+            outputs[name] = f.read()
+    return elapsed, outputs
+
+def bench(name, func, repeat):
+    times = []
+    outputs = {}
+    for compiled in True, False:
+        code_formatter.compiled = compiled
+        code_formatter._compiled_formats.clear()
+        best = None
+        for i in range(repeat):
+            elapsed, outputs[compiled] = func()
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+    print("%-20s compiled %7.2fs, interpreted %7.2fs: %5.2fx" %
+          (name, times[0], times[1], times[1] / times[0]))
+    if outputs[True] != outputs[False]:
+        print("Error: the compiled formats generated different code")
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the code_formatter")
+    parser.add_argument("protocols", nargs='*',
+                        help="SLICC protocols to generate (e.g., "
+                        "MESI_Two_Level)")
+    parser.add_argument("-n", "--num-objects", type=int, default=2000,
+                        help="Number of objects of the synthetic workload")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Number of times to run each benchmark")
+    args = parser.parse_args()
+
+    def run_synthetic():
+        start = time.time()
+        output = synthetic(args.num_objects)
+        return time.time() - start, output
+    bench("synthetic", run_synthetic, args.repeat)
+
+    for protocol in args.protocols:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bench(protocol, lambda: slicc(protocol, tmp_dir), args.repeat)
+
+if __name__ == "__main__":
+    main()
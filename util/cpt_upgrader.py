@@ -87,6 +87,7 @@ class Upgrader:
     untag_set = set() # tags to remove by downgrading
     by_tag = {}
     legacy = {}
+    plans = {} # memoized results of plan(), by checkpoint tags
     def __init__(self, filename):
         self.filename = filename
         exec(open(filename).read(), {}, self.__dict__)
@@ -155,6 +156,41 @@ class Upgrader:
     def get(tag):
         return Upgrader.by_tag[tag]
 
+    @staticmethod
+    def plan(tags):
+        """Work out the migrations needed by a checkpoint with the given
+        version tags.
+
+        Returns the tags whose upgraders and downgraders have to be
+        applied, in order, and the set of tags whose migrations can't be
+        applied because their dependences can't be resolved. The result
+        only depends on the tags, so it is computed once per set of tags.
+        """
+        key = frozenset(tags)
+        if key not in Upgrader.plans:
+            tags = set(tags)
+            order = []
+            # Apply migrations for tags not in checkpoint and tags present
+            # for which downgraders are present, respecting dependences
+            to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
+            while to_apply:
+                ready = sorted([ t for t in to_apply
+                                 if Upgrader.get(t).ready(tags) ])
+                if not ready:
+                    break
+
+                for tag in ready:
+                    if hasattr(Upgrader.get(tag), 'upgrader'):
+                        tags.add(tag)
+                    else:
+                        tags.remove(tag)
+                order.extend(ready)
+
+                to_apply -= set(ready)
+
+            Upgrader.plans[key] = (order, frozenset(to_apply))
+        return Upgrader.plans[key]
+
     @staticmethod
     def load_all():
         util_dir = osp.dirname(osp.abspath(__file__))
@@ -237,31 +273,124 @@ def process_file(path, **kwargs):
         print("warning: upgrade script does not recognize the following "
               "tags in this checkpoint:", ' '.join(unknown_tags))
 
-    # Apply migrations for tags not in checkpoint and tags present for which
-    # downgraders are present, respecting dependences
-    to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
-    while to_apply:
-        ready = set([ t for t in to_apply if Upgrader.get(t).ready(tags) ])
-        if not ready:
-            print("could not apply these upgrades:", ' '.join(to_apply))
-            print("update dependences impossible to resolve; aborting")
-            exit(1)
-
-        for tag in ready:
-            Upgrader.get(tag).update(cpt, tags)
-            change = True
+    order, unresolved = Upgrader.plan(tags)
+    if unresolved:
+        print("could not apply these upgrades:", ' '.join(unresolved))
+        print("update dependences impossible to resolve; aborting")
+        exit(1)
 
-        to_apply -= ready
+    for tag in order:
+        Upgrader.get(tag).update(cpt, tags)
+        change = True
 
     if not change:
         verboseprint("...nothing to do")
-        return
+        return False
 
     cpt.set('root.globals', 'version_tags', ' '.join(tags))
 
     # Write the old data back
     verboseprint("...completed")
-    cpt.write(open(path, 'w'))
+    with open(path, 'w') as cpt_file:
+        cpt.write(cpt_file)
+    return True
+
+def read_version_tags(path):
+    """Read the version information of a checkpoint without parsing it.
+
+    Returns the set of version tags of the checkpoint, or None if it has a
+    legacy version number or no version information, i.e., if it has to
+    go through process_file() to find out what to do with it.
+    """
+    section = None
+    tags = {}
+    with open(path, 'r') as cpt_file:
+        for line in cpt_file:
+            if line.startswith('['):
+                section = line.strip()[1:-1]
+                # The version information is at the top of the checkpoint,
+                # so stop at the first section after it.
+                if 'root.globals' in tags and 'root' in tags:
+                    break
+                if section == 'root':
+                    tags.setdefault('root', None)
+            elif section == 'root':
+                if line.split('=', 1)[0].strip() == 'cpt_ver':
+                    return None
+            elif section in ('Globals', 'root.globals'):
+                key, _, value = line.partition('=')
+                if key.strip() == 'version_tags':
+                    tags[section] = set(value.split())
+
+    # Same precedence as process_file()
+    for section in ('Globals', 'root.globals'):
+        if tags.get(section) is not None:
+            return tags[section]
+    return None
+
+def needs_processing(path):
+    """Check whether a checkpoint has to be upgraded (or downgraded) using
+    only its version tags."""
+    tags = read_version_tags(path)
+    if tags is None:
+        return True
+    order, unresolved = Upgrader.plan(tags)
+    return bool(order or unresolved)
+
+def _process_bulk_file(args):
+    path, kwargs = args
+    if not Upgrader.by_tag:
+        Upgrader.load_all()
+    size = osp.getsize(path)
+    try:
+        if not needs_processing(path):
+            return path, 'current', size, None
+        status = 'upgraded' if process_file(path, **kwargs) else 'current'
+        return path, status, size, None
+    except SystemExit:
+        # process_file() exits on errors, which would kill the worker
+        return path, 'failed', size, None
+    except Exception as e:
+        # Don't let one bad checkpoint stop the others from being upgraded
+        return path, 'failed', size, "{}: {}".format(type(e).__name__, e)
+
+def process_tree(path, jobs=None, **kwargs):
+    """Upgrade all the checkpoints in a directory tree using a pool of
+    worker processes. Checkpoints that are already up to date are only
+    checked using their version tags."""
+    import multiprocessing
+    import time
+
+    paths = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        if 'm5.cpt' in files:
+            paths.append(osp.join(root, 'm5.cpt'))
+    print("Found {} checkpoints".format(len(paths)))
+
+    counts = { 'current' : 0, 'upgraded' : 0, 'failed' : 0 }
+    total_size = 0
+    start = time.time()
+    with multiprocessing.Pool(jobs) as pool:
+        results = pool.imap_unordered(_process_bulk_file,
+                                      [ (p, kwargs) for p in paths ])
+        for done, (cpt_path, status, size, error) in enumerate(results, 1):
+            counts[status] += 1
+            total_size += size
+            if status == 'failed':
+                print("Error: failed to upgrade {}{}".format(
+                    cpt_path, ": " + error if error else ""))
+            else:
+                verboseprint(status, cpt_path)
+            if done % 100 == 0 or done == len(paths):
+                elapsed = max(time.time() - start, 1e-9)
+                print("[{}/{}] {} upgraded, {} current, {} failed: "
+                      "{:.1f} checkpoints/s, {:.1f} MiB/s".format(
+                          done, len(paths), counts['upgraded'],
+                          counts['current'], counts['failed'],
+                          done / elapsed, total_size / 2**20 / elapsed))
+
+    return counts['failed'] == 0
 
 if __name__ == '__main__':
     from argparse import ArgumentParser, SUPPRESS
@@ -277,6 +406,10 @@ if __name__ == '__main__':
     parser.add_argument(
         "-v", "--verbose", action="store_true",
         help="Print out debugging information as")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="With -r, upgrade checkpoints in parallel using this many "\
+             "worker processes (default: number of CPUs)")
     parser.add_argument(
         "--get-cc-file", action="store_true",
         # used during build; generate src/sim/tags.cc and exit
@@ -317,13 +450,8 @@ if __name__ == '__main__':
     elif osp.isdir(path):
         cpt_file = osp.join(path, 'm5.cpt')
         if args.recurse:
-            # Visit very file and see if it matches
-            for root,dirs,files in os.walk(path):
-                for name in files:
-                    if name == 'm5.cpt':
-                        process_file(osp.join(root,name), **vars(args))
-                for dir in dirs:
-                    pass
+            if not process_tree(path, **vars(args)):
+                sys.exit(1)
         # Maybe someone passed a cpt.XXXXXXX directory and not m5.cpt
         elif osp.isfile(cpt_file):
             process_file(cpt_file, **vars(args))
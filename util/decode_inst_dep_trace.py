@@ -112,7 +112,7 @@ def main():
         exit(-1)
 
     # Open the file on read mode
-    proto_in = protolib.openFileRd(sys.argv[1])
+    proto_in = protolib.openMessageReader(sys.argv[1])
 
     try:
         ascii_out = open(sys.argv[2], 'w')
@@ -151,7 +151,7 @@ def main():
     packet = inst_dep_record_pb2.InstDepRecord()
 
     # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
+    for packet in proto_in.messages(packet):
         num_packets += 1
 
         # Write to file the seq num
@@ -37,43 +37,110 @@
 
 # This script is used to dump protobuf packet traces to ASCII
 # format.
+#
+# With --columnar, the packets are instead written as typed columns
+# (tick, cmd, addr, size, flags, pkt_id and pc) that can be loaded
+# straight into NumPy or Pandas with load_columns(). The columns are
+# split into chunks of --chunk-rows packets, and every chunk of a column
+# is a flat binary file of fixed-size integers. A manifest describes the
+# columns, their types and the chunks. Optional fields that are not set
+# in a packet are 0, and the bits of the "valid" column tell which of
+# them are set.
+#
+# With --split, the trace is split into shards of a given number of
+# packets. Every shard is a complete packet trace with the header of the
+# original trace, so the shards can be decoded independently. Giving a
+# directory of shards to --columnar decodes them in parallel with --jobs
+# worker processes into a single columnar output:
+#
+#   decode_packet_trace.py --split 4000000 trace.gz shards
+#   decode_packet_trace.py --columnar -j 8 shards columns
+#
+#   import decode_packet_trace
+#   import pandas
+#   df = pandas.DataFrame(decode_packet_trace.load_columns('columns'))
 
+import argparse
+import array
+import glob
+import json
+import multiprocessing
 import os
 import protolib
 import subprocess
 import sys
 
 util_dir = os.path.dirname(os.path.realpath(__file__))
-# Make sure the proto definitions are up to date.
-subprocess.check_call(['make', '--quiet', '-C', util_dir, 'packet_pb2.py'])
-import packet_pb2
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: ", sys.argv[0], " <protobuf input> <ASCII output>")
-        exit(-1)
+packet_pb2 = None
 
-    # Open the file in read mode
-    proto_in = protolib.openFileRd(sys.argv[1])
+def load_packet_proto():
+    global packet_pb2
+    if packet_pb2 is None:
+        # Make sure the proto definitions are up to date.
+        subprocess.check_call(['make', '--quiet', '-C', util_dir,
+                               'packet_pb2.py'])
+        import packet_pb2 as module
+        packet_pb2 = module
+    return packet_pb2
 
-    try:
-        ascii_out = open(sys.argv[2], 'w')
-    except IOError:
-        print("Failed to open ", sys.argv[2], " for writing")
-        exit(-1)
+# Name, NumPy type and array type code of the columns
+_byte_order = '<' if sys.byteorder == 'little' else '>'
+columns = (
+    ('tick', _byte_order + 'u8', 'Q'),
+    ('cmd', _byte_order + 'u4', 'I'),
+    ('addr', _byte_order + 'u8', 'Q'),
+    ('size', _byte_order + 'u4', 'I'),
+    ('flags', _byte_order + 'u4', 'I'),
+    ('pkt_id', _byte_order + 'u8', 'Q'),
+    ('pc', _byte_order + 'u8', 'Q'),
+    ('valid', '|u1', 'B'),
+)
+
+# Bits of the valid column
+VALID_FLAGS = 1
+VALID_PKT_ID = 2
+VALID_PC = 4
+
+manifest_name = 'packets.json'
+manifest_version = 1
+
+shard_pattern = 'shard-*.trace*'
+
+def open_trace(path):
+    """
+    Open a packet trace, check its magic number and read its header.
+    Returns the message reader, positioned at the first packet, and the
+    header.
+    """
+    proto_in = protolib.openMessageReader(path)
 
     # Read the magic number in 4-byte Little Endian
-    magic_number = proto_in.read(4).decode()
+    magic_number = proto_in.read(4)
+    if magic_number != b'gem5':
+        proto_in.close()
+        raise ValueError("Unrecognized file %s" % path)
+
+    header = load_packet_proto().PacketHeader()
+    if not proto_in.decodeMessage(header):
+        proto_in.close()
+        raise ValueError("Failed to read the header of %s" % path)
+    return proto_in, header
 
-    if magic_number != "gem5":
-        print("Unrecognized file", sys.argv[1])
+def decode_ascii(in_path, out_path):
+    try:
+        ascii_out = open(out_path, 'w')
+    except IOError:
+        print("Failed to open ", out_path, " for writing")
         exit(-1)
 
     print("Parsing packet header")
 
-    # Add the packet header
-    header = packet_pb2.PacketHeader()
-    protolib.decodeMessage(proto_in, header)
+    try:
+        proto_in, header = open_trace(in_path)
+    except ValueError as e:
+        print(e)
+        exit(-1)
 
     print("Object id:", header.obj_id)
     print("Tick frequency:", header.tick_freq)
@@ -87,7 +154,7 @@ def main():
     packet = packet_pb2.Packet()
 
     # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
+    for packet in proto_in.messages(packet):
         num_packets += 1
         # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
         cmd = 'r' if packet.cmd == 1 else ('w' if packet.cmd == 4 else 'u')
@@ -110,5 +177,230 @@ def main():
     ascii_out.close()
     proto_in.close()
 
+def _header_dict(header):
+    return {
+        'obj_id' : header.obj_id,
+        'tick_freq' : header.tick_freq,
+        'id_strings' : { str(s.key) : s.value for s in header.id_strings },
+    }
+
+def decode_columnar(in_path, out_dir, shard=0, chunk_rows=1 << 20):
+    """
+    Decode a packet trace into chunked column files in out_dir. The
+    chunk files are named after the shard number, so the shards of a
+    trace can be decoded into the same directory. Returns the header of
+    the trace (as a dictionary) and the list of chunks.
+    """
+    proto_in, header = open_trace(in_path)
+
+    chunks = []
+    data = [ array.array(code) for name, dtype, code in columns ]
+    tick, cmd, addr, size, flags, pkt_id, pc, valid = \
+        [ d.append for d in data ]
+
+    def write_chunk():
+        prefix = '%05d-%06d' % (shard, len(chunks))
+        for (name, dtype, code), d in zip(columns, data):
+            with open(os.path.join(out_dir, '%s.%s' % (prefix, name)),
+                      'wb') as f:
+                d.tofile(f)
+        chunks.append({ 'file' : prefix, 'rows' : len(data[0]) })
+        for d in data:
+            del d[:]
+
+    rows = 0
+    packet = packet_pb2.Packet()
+    has = packet.HasField
+    for packet in proto_in.messages(packet):
+        tick(packet.tick)
+        cmd(packet.cmd)
+        addr(packet.addr)
+        size(packet.size)
+        flags(packet.flags)
+        pkt_id(packet.pkt_id)
+        pc(packet.pc)
+        valid((VALID_FLAGS if has('flags') else 0) |
+              (VALID_PKT_ID if has('pkt_id') else 0) |
+              (VALID_PC if has('pc') else 0))
+        rows += 1
+        if rows == chunk_rows:
+            write_chunk()
+            rows = 0
+    if rows:
+        write_chunk()
+
+    proto_in.close()
+    return _header_dict(header), chunks
+
+def _decode_shard(job):
+    shard, in_path, out_dir, chunk_rows = job
+    return decode_columnar(in_path, out_dir, shard, chunk_rows)
+
+def write_manifest(out_dir, source, header, chunks):
+    manifest = dict(header)
+    manifest.update({
+        'version' : manifest_version,
+        'source' : source,
+        'columns' : { name : dtype for name, dtype, code in columns },
+        'rows' : sum(c['rows'] for c in chunks),
+        'chunks' : chunks,
+    })
+    # Write the manifest atomically, so that the output is either
+    # complete or missing it
+    path = os.path.join(out_dir, manifest_name)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+    return manifest
+
+def decode_columnar_shards(in_paths, out_dir, jobs=1, chunk_rows=1 << 20):
+    """
+    Decode a list of traces (usually the shards of a trace made by
+    split_trace()) into a single columnar output in out_dir, with up to
+    jobs traces being decoded at the same time. The packets are in the
+    order of the list. Returns the manifest.
+    """
+    if not in_paths:
+        raise ValueError("No traces to decode")
+
+    load_packet_proto()
+    os.makedirs(out_dir, exist_ok=True)
+
+    work = [ (shard, path, out_dir, chunk_rows)
+             for shard, path in enumerate(in_paths) ]
+    if jobs > 1 and len(work) > 1:
+        with multiprocessing.Pool(min(jobs, len(work))) as pool:
+            results = pool.map(_decode_shard, work, chunksize=1)
+    else:
+        results = [ _decode_shard(w) for w in work ]
+
+    chunks = []
+    for header, shard_chunks in results:
+        chunks.extend(shard_chunks)
+    return write_manifest(out_dir, in_paths[0] if len(in_paths) == 1
+                          else os.path.dirname(in_paths[0]),
+                          results[0][0], chunks)
+
+def load_columns(path, names=None):
+    """
+    Load the columnar output in the directory path and return it as a
+    dictionary of NumPy arrays, one per column. If names is given, only
+    these columns are loaded.
+    """
+    import numpy as np
+
+    with open(os.path.join(path, manifest_name)) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != manifest_version:
+        raise ValueError("Unsupported columnar output version in %s" % path)
+
+    types = manifest['columns']
+    result = {}
+    for name in (names or types.keys()):
+        dtype = np.dtype(types[name])
+        parts = [ np.fromfile(os.path.join(path, '%s.%s' %
+                                           (c['file'], name)), dtype=dtype)
+                  for c in manifest['chunks'] ]
+        result[name] = np.concatenate(parts) if parts else \
+            np.empty(0, dtype=dtype)
+    return result
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append(0x80 | (value & 0x7f))
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def split_trace(in_path, out_dir, shard_packets):
+    """
+    Split a packet trace into shards of shard_packets packets in out_dir.
+    Every shard starts with the magic number and header of the trace.
+    The packets are only framed and copied, not decoded. Returns the
+    paths of the shards.
+    """
+    if shard_packets <= 0:
+        raise ValueError("The number of packets per shard must be positive")
+
+    proto_in, header = open_trace(in_path)
+    os.makedirs(out_dir, exist_ok=True)
+    prologue = b'gem5' + _varint(header.ByteSize()) + \
+        header.SerializeToString()
+    # Most packets are less than 128 bytes long
+    small_sizes = [ bytes((i,)) for i in range(0x80) ]
+
+    paths = []
+    out = None
+    count = 0
+    read = proto_in.readMessage
+    while True:
+        buf = read()
+        if buf is None:
+            break
+        if out is None:
+            paths.append(os.path.join(out_dir,
+                                      'shard-%05d.trace' % len(paths)))
+            out = open(paths[-1], 'wb')
+            out.write(prologue)
+            write = out.write
+        size = len(buf)
+        write(small_sizes[size] if size < 0x80 else _varint(size))
+        write(buf)
+        count += 1
+        if count == shard_packets:
+            out.close()
+            out = None
+            count = 0
+
+    if out is not None:
+        out.close()
+    elif not paths:
+        # Keep the header of an empty trace
+        paths.append(os.path.join(out_dir, 'shard-00000.trace'))
+        with open(paths[-1], 'wb') as f:
+            f.write(prologue)
+
+    proto_in.close()
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Decode a protobuf packet trace")
+    parser.add_argument("input",
+                        help="Packet trace, or with --columnar, a trace "
+                        "or a directory of shards made by --split")
+    parser.add_argument("output",
+                        help="ASCII output, or with --columnar or --split, "
+                        "the output directory")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--columnar", action="store_true",
+                      help="Write the packets as chunked binary columns")
+    mode.add_argument("--split", type=int, metavar="PACKETS",
+                      help="Split the trace into independently decodable "
+                      "shards of PACKETS packets")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of shards decoded in parallel")
+    parser.add_argument("--chunk-rows", type=int, default=1 << 20,
+                        help="Number of packets per column chunk")
+    args = parser.parse_args()
+
+    load_packet_proto()
+
+    if args.split is not None:
+        paths = split_trace(args.input, args.output, args.split)
+        print("Wrote %d shards to %s" % (len(paths), args.output))
+    elif args.columnar:
+        if os.path.isdir(args.input):
+            paths = sorted(glob.glob(os.path.join(args.input,
+                                                  shard_pattern)))
+        else:
+            paths = [ args.input ]
+        manifest = decode_columnar_shards(paths, args.output, args.jobs,
+                                          args.chunk_rows)
+        print("Parsed packets:", manifest['rows'])
+    else:
+        decode_ascii(args.input, args.output)
+
 if __name__ == "__main__":
     main()
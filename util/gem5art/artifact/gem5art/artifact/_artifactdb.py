@@ -36,12 +36,25 @@ Some common queries can be found in common_queries.py
 
 from abc import ABC, abstractmethod
 
-import copy
+from contextlib import contextmanager
 import json
 import os
 from pathlib import Path
+import re
 import shutil
-from typing import Any, Dict, Iterable, Union, Type, List, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+    Type,
+    List,
+    Tuple,
+)
 from urllib.parse import urlparse
 from uuid import UUID
 
@@ -54,6 +67,12 @@ except ModuleNotFoundError:
     # If pymongo isn't installed, then disable support for it
     MONGO_SUPPORT = False
 
+try:
+    import fcntl
+except ImportError:
+    # No file locking (e.g., on Windows)
+    fcntl = None  # type: ignore
+
 
 class ArtifactDB(ABC):
     """
@@ -221,7 +240,19 @@ class ArtifactFileDB(ArtifactDB):
     are stored in a JSON file.
 
     This database stores a list of serialized artifacts in a JSON file.
-    This database is not thread-safe.
+    New artifacts are appended to a journal next to it (`<file>.journal`,
+    one serialized artifact per line), so an insert doesn't rewrite the
+    whole database. The journal is merged into the JSON file (compacted)
+    once it holds at least `compact_threshold` artifacts and as many as
+    the JSON file (so that the cost of compactions stays proportional to
+    the number of inserts), or when `compact()` is called.
+
+    Inserts hold a lock on `<file>.lock` and first read the artifacts
+    other processes have appended, so several processes (e.g., the
+    workers of `run_job_pool`) can insert into the same database. Queries
+    only see the artifacts this object knows about; call `refresh()` to
+    read the ones added by other processes since. Artifacts are indexed
+    by UUID, hash, name and type.
 
     If the user specifies a valid path in the environment variable
     GEM5ART_STORAGE then this database will copy all artifacts to that
@@ -232,11 +263,23 @@ class ArtifactFileDB(ArtifactDB):
         def default(self, obj):
             if isinstance(obj, UUID):
                 return str(obj)
-            return ArtifactFileDB.ArtifactEncoder(self, obj)
+            return super().default(obj)
+
+    # Minimum number of artifacts in the journal that triggers a
+    # compaction. 0 disables automatic compactions.
+    compact_threshold: int = 1000
 
     _json_file: Path
+    _journal_file: Path
+    _lock_file: Path
     _uuid_artifact_map: Dict[str, Dict[str, str]]
     _hash_uuid_map: Dict[str, List[str]]
+    _name_uuid_map: Dict[str, List[str]]
+    _type_uuid_map: Dict[str, List[str]]
+    _json_id: Optional[Tuple[int, ...]]
+    _journal_id: Optional[Tuple[int, ...]]
+    _journal_offset: int
+    _journal_count: int
     _storage_enabled: bool
     _storage_path: Path
 
@@ -252,6 +295,12 @@ class ArtifactFileDB(ArtifactDB):
         #           (netloc='path', path='/to/file')
         # so, the filepath would be netloc+path for both cases
         self._json_file = Path(parsed_uri.netloc) / Path(parsed_uri.path)
+        self._journal_file = self._json_file.with_name(
+            self._json_file.name + ".journal"
+        )
+        self._lock_file = self._json_file.with_name(
+            self._json_file.name + ".lock"
+        )
         storage_path = os.environ.get("GEM5ART_STORAGE", "")
         self._storage_enabled = True if storage_path else False
         self._storage_path = Path(storage_path)
@@ -266,9 +315,7 @@ class ArtifactFileDB(ArtifactDB):
         if self._storage_enabled:
             os.makedirs(self._storage_path, exist_ok=True)
 
-        self._uuid_artifact_map, self._hash_uuid_map = self._load_from_file(
-            self._json_file
-        )
+        self.refresh(reload=True)
 
     def put(self, key: UUID, artifact: Dict[str, Union[str, UUID]]) -> None:
         """Insert the artifact into the database with the key."""
@@ -312,27 +359,152 @@ class ArtifactFileDB(ArtifactDB):
         dst_path = path
         shutil.copy2(src_path, dst_path)
 
-    def _load_from_file(
-        self, json_file: Path
-    ) -> Tuple[Dict[str, Dict[str, str]], Dict[str, List[str]]]:
-        uuid_mapping: Dict[str, Dict[str, str]] = {}
-        hash_mapping: Dict[str, List[str]] = {}
+    @contextmanager
+    def _locked(self, exclusive: bool = True) -> Iterator[None]:
+        """Hold the lock of the database (shared if not exclusive)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_file, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _add_to_maps(self, artifact: Dict[str, str]) -> bool:
+        the_uuid = artifact["_id"]
+        if the_uuid in self._uuid_artifact_map:
+            return False
+        self._uuid_artifact_map[the_uuid] = artifact
+        for mapping, key in (
+            (self._hash_uuid_map, "hash"),
+            (self._name_uuid_map, "name"),
+            (self._type_uuid_map, "type"),
+        ):
+            value = artifact.get(key)
+            if value is None:
+                continue
+            if not value in mapping:
+                mapping[value] = []
+            mapping[value].append(the_uuid)
+        return True
+
+    def _load_from_file(self, json_file: Path) -> None:
+        self._uuid_artifact_map = {}
+        self._hash_uuid_map = {}
+        self._name_uuid_map = {}
+        self._type_uuid_map = {}
+        self._json_id = None
         if json_file.exists():
             with open(json_file, "r") as f:
-                j = json.load(f)
-                for an_artifact in j:
-                    the_uuid = an_artifact["_id"]
-                    the_hash = an_artifact["hash"]
-                    uuid_mapping[the_uuid] = an_artifact
-                    if not the_hash in hash_mapping:
-                        hash_mapping[the_hash] = []
-                    hash_mapping[the_hash].append(the_uuid)
-        return uuid_mapping, hash_mapping
-
-    def _save_to_file(self, json_file: Path) -> None:
-        content = list(self._uuid_artifact_map.values())
-        with open(json_file, "w") as f:
-            json.dump(content, f, indent=4, cls=ArtifactFileDB.ArtifactEncoder)
+                self._json_id = self._file_id(f, modified=True)
+                for an_artifact in json.load(f):
+                    self._add_to_maps(an_artifact)
+
+    @staticmethod
+    def _file_id(f: IO[Any], modified: bool = False) -> Tuple[int, ...]:
+        """Identify a file, and when it was last modified if asked for (as
+        the inode of a replaced file may be reused)."""
+        st = os.fstat(f.fileno())
+        if modified:
+            return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+        return st.st_dev, st.st_ino
+
+    def _reload(self) -> None:
+        self._load_from_file(self._json_file)
+        self._journal_id = None
+        self._journal_offset = 0
+        self._journal_count = 0
+
+    def _read_journal(self) -> None:
+        """Read the artifacts appended to the journal since it was last
+        read. If the database was compacted by another process (which
+        replaces both files), the whole database is read again."""
+        try:
+            with open(self._json_file, "rb") as f:
+                json_id: Optional[Tuple[int, ...]] = self._file_id(
+                    f, modified=True
+                )
+        except FileNotFoundError:
+            json_id = None
+        if json_id != self._json_id:
+            self._reload()
+
+        try:
+            f = open(self._journal_file, "rb")
+        except FileNotFoundError:
+            self._journal_id = None
+            self._journal_offset = 0
+            self._journal_count = 0
+            return
+
+        with f:
+            journal_id = self._file_id(f)
+            if journal_id != self._journal_id or (
+                os.fstat(f.fileno()).st_size < self._journal_offset
+            ):
+                if self._journal_id is not None:
+                    self._reload()
+                self._journal_id = journal_id
+            f.seek(self._journal_offset)
+            data = f.read()
+
+        # Leave a partially written last line for the next read
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._add_to_maps(json.loads(line))
+                self._journal_count += 1
+        self._journal_offset += end
+
+    def refresh(self, reload: bool = False) -> None:
+        """Read the artifacts other processes have added to the database.
+        If reload is set, the whole database is read again."""
+        with self._locked(exclusive=False):
+            if reload:
+                self._reload()
+            self._read_journal()
+
+    def _save_to_file(self, json_file: Path) -> Tuple[int, ...]:
+        # One artifact per line, which is much faster to write than an
+        # indented list
+        encoder = ArtifactFileDB.ArtifactEncoder()
+        tmp_file = json_file.with_name(json_file.name + ".tmp")
+        with open(tmp_file, "w") as f:
+            f.write("[\n")
+            f.write(
+                ",\n".join(
+                    encoder.encode(artifact)
+                    for artifact in self._uuid_artifact_map.values()
+                )
+            )
+            f.write("\n]\n")
+            f.flush()
+            file_id = self._file_id(f, modified=True)
+        os.replace(tmp_file, json_file)
+        return file_id
+
+    def _compact(self) -> None:
+        # The JSON file is written before the journal is replaced, so a
+        # crash in between leaves duplicates (which are ignored) in the
+        # journal rather than losing artifacts. Other processes notice
+        # the new journal and read the database again.
+        self._json_id = self._save_to_file(self._json_file)
+        tmp_file = self._journal_file.with_name(
+            self._journal_file.name + ".tmp"
+        )
+        with open(tmp_file, "wb") as f:
+            self._journal_id = self._file_id(f)
+        os.replace(tmp_file, self._journal_file)
+        self._journal_offset = 0
+        self._journal_count = 0
+
+    def compact(self) -> None:
+        """Merge the journal into the JSON file."""
+        with self._locked():
+            self._read_journal()
+            self._compact()
 
     def has_uuid(self, the_uuid: UUID) -> bool:
         return str(the_uuid) in self._uuid_artifact_map
@@ -367,15 +539,86 @@ class ArtifactFileDB(ArtifactDB):
         uuid_str = str(the_uuid)
         if uuid_str in self._uuid_artifact_map:
             return False
-        artifact_copy = copy.deepcopy(the_artifact)
-        artifact_copy["_id"] = str(artifact_copy["_id"])
-        self._uuid_artifact_map[uuid_str] = artifact_copy  # type: ignore
-        if not the_hash in self._hash_uuid_map:
-            self._hash_uuid_map[the_hash] = []
-        self._hash_uuid_map[the_hash].append(uuid_str)
-        self._save_to_file(self._json_file)
+        assert the_artifact.get("hash") == the_hash
+        line = json.dumps(the_artifact, cls=ArtifactFileDB.ArtifactEncoder)
+
+        with self._locked():
+            self._read_journal()
+            if uuid_str in self._uuid_artifact_map:
+                return False
+            # The artifact is stored as it will be read back from the file
+            self._add_to_maps(json.loads(line))
+
+            if not self._json_file.exists():
+                # Start a new database with its JSON file
+                self._compact()
+                return True
+
+            with open(self._journal_file, "ab") as f:
+                f.write(line.encode() + b"\n")
+                journal_id = self._file_id(f)
+                offset = f.tell()
+            if journal_id != self._journal_id:
+                # A new journal, as someone removed the previous one
+                self._journal_count = 0
+            self._journal_id = journal_id
+            self._journal_offset = offset
+            self._journal_count += 1
+
+            journal_count = self._journal_count
+            if (
+                self.compact_threshold
+                and journal_count >= self.compact_threshold
+                and journal_count * 2 >= len(self._uuid_artifact_map)
+            ):
+                self._compact()
         return True
 
+    def _search(
+        self,
+        uuids: Iterable[str],
+        limit: int,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Iterable[Dict[str, Any]]:
+        # As in MongoDB, a limit of 0 means no limit
+        count = 0
+        for the_uuid in uuids:
+            artifact = self._uuid_artifact_map[the_uuid]
+            if predicate is None or predicate(artifact):
+                yield artifact
+                count += 1
+                if count == limit:
+                    return
+
+    def searchByName(self, name: str, limit: int) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some name."""
+        return self._search(self._name_uuid_map.get(name, []), limit)
+
+    def searchByType(self, typ: str, limit: int) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some type."""
+        return self._search(self._type_uuid_map.get(typ, []), limit)
+
+    def searchByNameType(
+        self, name: str, typ: str, limit: int
+    ) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some name and type."""
+        return self.find_exact({"name": name, "type": typ}, limit)
+
+    def searchByLikeNameType(
+        self, name: str, typ: str, limit: int
+    ) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some type and a regex name."""
+        regex = re.compile(name)
+        return self._search(
+            self._type_uuid_map.get(typ, []),
+            limit,
+            lambda artifact: bool(regex.search(artifact.get("name", ""))),
+        )
+
     def find_exact(
         self, attr: Dict[str, str], limit: int
     ) -> Iterable[Dict[str, Any]]:
@@ -384,13 +627,30 @@ class ArtifactFileDB(ArtifactDB):
         and for every (k,v) in attr, the attribute `k` of the artifact has
         the value of `v`.
         """
-        count = 0
-        if count >= limit:
-            return
-        for artifact in self._uuid_artifact_map.values():
-            #https://docs.python.org/3/library/stdtypes.html#frozenset.issubset
-            if attr.items() <= artifact.items():
-                yield artifact
+        # Only look at the artifacts in the shortest matching index
+        uuids: Iterable[str] = self._uuid_artifact_map.keys()
+        for key, mapping in (
+            ("_id", None),
+            ("hash", self._hash_uuid_map),
+            ("name", self._name_uuid_map),
+            ("type", self._type_uuid_map),
+        ):
+            if key not in attr:
+                continue
+            if mapping is None:
+                the_uuid = str(attr[key])
+                candidates = (
+                    [the_uuid] if the_uuid in self._uuid_artifact_map else []
+                )
+            else:
+                candidates = mapping.get(attr[key], [])
+            if len(candidates) < len(uuids):  # type: ignore[arg-type]
+                uuids = candidates
+
+        #https://docs.python.org/3/library/stdtypes.html#frozenset.issubset
+        return self._search(
+            uuids, limit, lambda artifact: attr.items() <= artifact.items()
+        )
 
 
 _db = None
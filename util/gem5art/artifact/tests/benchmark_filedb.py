@@ -0,0 +1,128 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All Rights Reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Benchmark for ArtifactFileDB
+
+Inserts run-like artifacts into a new file database, in one or more
+processes, and reports the insert rate along with the time it takes to
+load the database and to search it by name and type. For example,
+
+    python3 -m tests.benchmark_filedb -n 50000 -j 4
+"""
+
+import argparse
+from multiprocessing import Pool
+import os
+import tempfile
+import time
+from typing import Any, Dict, Tuple
+from uuid import uuid4
+
+from gem5art.artifact._artifactdb import ArtifactFileDB
+
+
+def make_run(i: int) -> Dict[str, Any]:
+    the_uuid = uuid4()
+    return {
+        "_id": the_uuid,
+        "name": f"run-{i}",
+        "type": "gem5 run" if i % 2 else "gem5 run fs",
+        "documentation": "A run artifact for benchmarking",
+        "command": f"gem5.opt run.py --seed {i}",
+        "path": f"results/run-{i}",
+        "hash": the_uuid.hex,
+        "git": {},
+        "cwd": "/tmp",
+        "inputs": [str(uuid4()) for _ in range(4)],
+    }
+
+
+def insert_runs(args: Tuple[str, int, int, int]) -> None:
+    uri, start, end, compact_threshold = args
+    db = ArtifactFileDB(uri)
+    db.compact_threshold = compact_threshold
+    for i in range(start, end):
+        run = make_run(i)
+        db.put(run["_id"], run)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "-n",
+        "--num-artifacts",
+        type=int,
+        default=50000,
+        help="Number of artifacts to insert",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of processes"
+    )
+    parser.add_argument(
+        "--compact-threshold",
+        type=int,
+        default=ArtifactFileDB.compact_threshold,
+        help="Journal length that triggers a compaction",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        uri = "file://" + os.path.join(tmp_dir, "db.json")
+        n = args.num_artifacts
+        jobs = [
+            (uri, n * i // args.jobs, n * (i + 1) // args.jobs,
+             args.compact_threshold)
+            for i in range(args.jobs)
+        ]
+
+        start = time.perf_counter()
+        if args.jobs > 1:
+            with Pool(args.jobs) as pool:
+                pool.map(insert_runs, jobs)
+        else:
+            insert_runs(jobs[0])
+        insert_time = time.perf_counter() - start
+        print(
+            f"insert: {n} artifacts in {insert_time:.2f}s "
+            f"({n / insert_time:.0f} artifacts/s)"
+        )
+
+        start = time.perf_counter()
+        db = ArtifactFileDB(uri)
+        print(f"load: {time.perf_counter() - start:.3f}s")
+        assert len(list(db.find_exact({}, 0))) == n
+
+        start = time.perf_counter()
+        for i in range(0, n, max(1, n // 1000)):
+            assert len(list(db.searchByName(f"run-{i}", limit=0))) == 1
+            list(db.searchByNameType(f"run-{i}", "gem5 run", limit=0))
+        print(f"1000 name searches: {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
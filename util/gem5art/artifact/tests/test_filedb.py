@@ -28,13 +28,33 @@
 
 
 import json
+from multiprocessing import Pool
 import os
 from pathlib import Path
 import unittest
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from gem5art.artifact import Artifact
-from gem5art.artifact._artifactdb import getDBConnection
+from gem5art.artifact._artifactdb import ArtifactFileDB, getDBConnection
+
+
+def make_artifact(name, typ="run", the_hash=None):
+    the_uuid = uuid4()
+    return {
+        "_id": the_uuid,
+        "name": name,
+        "type": typ,
+        "hash": the_hash if the_hash else the_uuid.hex,
+        "inputs": [],
+    }
+
+
+def insert_artifacts(args):
+    uri, names = args
+    db = ArtifactFileDB(uri)
+    for name in names:
+        artifact = make_artifact(name)
+        db.put(artifact["_id"], artifact)
 
 
 class TestArtifactFileDB(unittest.TestCase):
@@ -57,6 +77,9 @@ class TestArtifactFileDB(unittest.TestCase):
     def tearDown(self):
         os.remove("test-file.txt")
         os.remove("test.json")
+        for path in ("test.json.journal", "test.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_init_function(self):
         self.assertTrue(Path("test.json").exists())
@@ -68,3 +91,109 @@ class TestArtifactFileDB(unittest.TestCase):
         artifact = artifacts[0]
         self.assertTrue(artifact["hash"] == self.artifact.hash)
         self.assertTrue(UUID(artifact["_id"]) == self.artifact._id)
+
+
+class TestArtifactFileDBJournal(unittest.TestCase):
+    def setUp(self):
+        self.uri = "file://test-journal.json"
+        self.db = ArtifactFileDB(self.uri)
+
+    def tearDown(self):
+        for path in (
+            "test-journal.json",
+            "test-journal.json.journal",
+            "test-journal.json.lock",
+        ):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def put(self, *args, **kwargs):
+        artifact = make_artifact(*args, **kwargs)
+        self.db.put(artifact["_id"], artifact)
+        return artifact
+
+    def test_journal(self):
+        first = self.put("first")
+        second = self.put("second")
+        with open("test-journal.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 1)
+        with open("test-journal.json.journal", "r") as f:
+            self.assertEqual(
+                [json.loads(line)["name"] for line in f], ["second"]
+            )
+
+        db = ArtifactFileDB(self.uri)
+        self.assertIn(first["_id"], db)
+        self.assertIn(second["hash"], db)
+        self.assertEqual(db.get(second["_id"])["_id"], str(second["_id"]))
+        self.assertFalse(
+            db.insert_artifact(second["_id"], second["hash"], second)
+        )
+
+    def test_compact(self):
+        self.db.compact_threshold = 4
+        # Compactions after 1, 5 and 10 artifacts, when the journal is as
+        # long as the JSON file
+        for i in range(12):
+            self.put(f"artifact-{i}")
+        with open("test-journal.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 10)
+        self.db.compact()
+        with open("test-journal.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 12)
+        self.assertEqual(os.path.getsize("test-journal.json.journal"), 0)
+        db = ArtifactFileDB(self.uri)
+        self.assertEqual(len(list(db.find_exact({}, 0))), 12)
+
+    def test_refresh(self):
+        other = ArtifactFileDB(self.uri)
+        other.compact_threshold = 2
+        self.put("first")
+        for i in range(3):
+            artifact = make_artifact(f"other-{i}")
+            other.put(artifact["_id"], artifact)
+        self.assertEqual(len(list(self.db.find_exact({}, 0))), 1)
+        # The journal was compacted under our feet
+        self.db.refresh()
+        self.assertEqual(len(list(self.db.find_exact({}, 0))), 4)
+        self.put("last")
+        self.assertEqual(len(list(other.find_exact({}, 0))), 4)
+        other.refresh()
+        self.assertEqual(len(list(other.find_exact({}, 0))), 5)
+
+    def test_search(self):
+        self.put("a", "gem5 run")
+        self.put("b", "gem5 run")
+        self.put("a", "disk image", the_hash="h")
+        self.put("c", "disk image", the_hash="h")
+
+        db = ArtifactFileDB(self.uri)
+        names = lambda artifacts: sorted(a["name"] for a in artifacts)
+        self.assertEqual(names(db.searchByName("a", limit=0)), ["a", "a"])
+        self.assertEqual(names(db.searchByName("a", limit=1)), ["a"])
+        self.assertEqual(
+            names(db.searchByType("gem5 run", limit=0)), ["a", "b"]
+        )
+        self.assertEqual(
+            names(db.searchByNameType("a", "disk image", limit=0)), ["a"]
+        )
+        self.assertEqual(
+            names(db.searchByLikeNameType("[bc]", "gem5 run", limit=0)),
+            ["b"],
+        )
+        self.assertEqual(names(db.get_artifact_by_hash("h")), ["a", "c"])
+        self.assertEqual(
+            names(db.find_exact({"hash": "h", "name": "c"}, 0)), ["c"]
+        )
+        self.assertEqual(names(db.find_exact({"name": "d"}, 0)), [])
+
+    def test_parallel_inserts(self):
+        self.put("first")
+        jobs = [
+            (self.uri, [f"job{i}-{j}" for j in range(50)]) for i in range(4)
+        ]
+        with Pool(4) as pool:
+            pool.map(insert_artifacts, jobs)
+        db = ArtifactFileDB(self.uri)
+        self.assertEqual(len(list(db.find_exact({}, 0))), 201)
+        self.assertEqual(len(list(db.searchByName("job3-49", limit=0))), 1)
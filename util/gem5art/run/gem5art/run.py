@@ -32,12 +32,12 @@ This class works closely with the artifact module to ensure that the gem5
 experiment is reproducible and the output is saved to the database.
 """
 
+import asyncio
 import hashlib
 import json
 import os
 from pathlib import Path
 import signal
-import subprocess
 import time
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from uuid import UUID, uuid4
@@ -445,88 +445,31 @@ class gem5Run:
         d = self._convertForJson(self._getSerializable())
         return json.dumps(d)
 
-    def _run(self, task: Any = None, cwd: str = ".") -> None:
-        """Actually run the test.
-
-        Calls Popen with the command to fork a new process.
-        Then, this function polls the process every 5 seconds to check if it
-        has finished or not. Each time it checks, it dumps the json info so
-        other applications can poll those files.
-
-        task is the celery task that is running this gem5 instance.
-
-        cwd is the directory to change to before running. This allows a server
-        process to run in a different directory than the running process. Note
-        that only the spawned process runs in the new directory.
-        """
-        # Connect to the database
-        db = artifact.getDBConnection()
-
+    def _begin(self, task: Any, cwd: str) -> bool:
+        """Get ready to spawn gem5. Returns False if the artifacts don't
+        check."""
         self.status = "Begin run"
         self.dumpJson("info.json")
 
         if not self.checkArtifacts(cwd):
             self.dumpJson("info.json")
-            return
+            return False
 
         self.status = "Spawning"
 
         self.start_time = time.time()
         self.task_id = task.request.id if task else None
         self.dumpJson("info.json")
+        return True
 
-        # Start running the gem5 command
-        proc = subprocess.Popen(self.command, cwd=cwd)
-
-        # Register handler in case this process is killed while the gem5
-        # instance is running. Note: there's a bit of a race condition here,
-        # but hopefully it's not a big deal
-        def handler(signum, frame):
-            proc.kill()
-            self.kill_reason = "sigterm"
-            self.dumpJson("info.json")
-            # Note: We'll fall out of the while loop after this.
-
-        # This makes it so if you term *this* process, it will actually kill
-        # the subprocess and then this process will die.
-        signal.signal(signal.SIGTERM, handler)
-
-        # Do this until the subprocess is done (successfully or not)
-        while proc.poll() is None:
-            self.status = "Running"
-            # Still running
-            self.current_time = time.time()
-            self.pid = proc.pid
-            self.running = True
-
-            if self.current_time - self.start_time > self.timeout:
-                proc.kill()
-                self.kill_reason = "timeout"
-
-            if self.checkKernelPanic():
-                proc.kill()
-                self.kill_reason = "kernel panic"
-
-            # Assigning a function/lambda to an object variable does not make
-            # the function/lambda become a bound one. Therefore, the
-            # user-defined function must pass `self` in.
-            # Here, mypy classifies self.check_failure() as a bound function,
-            # so we tell mypy to ignore it./
-            if self.check_failure(self):  # type: ignore
-                proc.kill()
-                self.kill_reason = "User defined kill"
-
-            self.dumpJson("info.json")
-
-            # Check again in five seconds
-            time.sleep(5)
-
+    def _end(self, return_code: int, db: ArtifactDB) -> None:
+        """Record the end of the run and store its results."""
         print("Done running {}".format(" ".join(self.command)))
 
         # Done executing
         self.running = False
         self.end_time = time.time()
-        self.return_code = proc.returncode
+        self.return_code = return_code
 
         if self.return_code == 0:
             self.status = "Finished"
@@ -542,13 +485,29 @@ class gem5Run:
 
         print("Done storing the results of {}".format(" ".join(self.command)))
 
+    def _run(self, task: Any = None, cwd: str = ".") -> None:
+        """Actually run the test.
+
+        Spawns the gem5 process and supervises it (see gem5RunSupervisor)
+        until it exits. The json info is dumped whenever the state of the
+        run changes so other applications can poll those files.
+
+        task is the celery task that is running this gem5 instance.
+
+        cwd is the directory to change to before running. This allows a server
+        process to run in a different directory than the running process. Note
+        that only the spawned process runs in the new directory.
+        """
+        gem5RunSupervisor(max_parallel=1, cwd=cwd).run(
+            [self], rerun=True, task=task
+        )
+
     def run(self, task: Any = None, cwd: str = ".") -> None:
         """Actually run the test.
 
-        Calls Popen with the command to fork a new process.
-        Then, this function polls the process every 5 seconds to check if it
-        has finished or not. Each time it checks, it dumps the json info so
-        other applications can poll those files.
+        Spawns the gem5 process and supervises it (see gem5RunSupervisor)
+        until it exits. The json info is dumped whenever the state of the
+        run changes so other applications can poll those files.
 
         task is the celery task that is running this gem5 instance.
 
@@ -566,10 +525,9 @@ class gem5Run:
     def rerun(self, task: Any = None, cwd: str = ".") -> None:
         """Rerun the test.
 
-        Calls Popen with the command to fork a new process.
-        Then, this function polls the process every 5 seconds to check if it
-        has finished or not. Each time it checks, it dumps the json info so
-        other applications can poll those files.
+        Spawns the gem5 process and supervises it (see gem5RunSupervisor)
+        until it exits. The json info is dumped whenever the state of the
+        run changes so other applications can poll those files.
 
         task is the celery task that is running this gem5 instance.
 
@@ -605,6 +563,207 @@ class gem5Run:
         return self.string + " -> " + self.status
 
 
+class _OutputTail:
+    """
+    Looks for a pattern in the output written to a file, reading only what
+    was written since the last time it looked.
+    """
+
+    def __init__(self, path: Path, pattern: bytes) -> None:
+        self.path = path
+        self.pattern = pattern
+        self.offset = 0
+        self.carry = b""
+
+    def found(self) -> bool:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        with f:
+            if os.fstat(f.fileno()).st_size < self.offset:
+                # The file was truncated, start over
+                self.offset = 0
+                self.carry = b""
+            f.seek(self.offset)
+            data = f.read()
+        if not data:
+            return False
+        self.offset += len(data)
+        data = self.carry + data
+        # Keep enough to match the pattern across two reads
+        self.carry = data[len(data) - len(self.pattern) + 1 :]
+        return self.pattern in data
+
+
+class gem5RunSupervisor:
+    """
+    Runs gem5Run objects from a single process with asyncio, with at most
+    max_parallel gem5 processes at a time. If supervising a run fails
+    (e.g., its results can't be stored), the other runs still run to
+    completion before the error is raised.
+
+    Each run waits on its gem5 process, so the end of a run is handled as
+    soon as gem5 exits. While gem5 is running, the timeout of the run is
+    enforced and, every check_interval seconds, the new output of the
+    simulated terminal is checked for kernel panics and the check_failure
+    function of the run is called. The info.json file of a run is only
+    written when its state changes.
+
+    Usage
+    -----
+    supervisor = gem5RunSupervisor(max_parallel=16)
+    supervisor.run(runs)
+    """
+
+    def __init__(
+        self,
+        max_parallel: int = os.cpu_count() or 1,
+        check_interval: float = 5.0,
+        cwd: str = ".",
+    ) -> None:
+        self.max_parallel = max_parallel
+        self.check_interval = check_interval
+        self.cwd = cwd
+        self._running: Dict[Any, gem5Run] = {}
+
+    def run(
+        self, runs: Iterable[gem5Run], rerun: bool = False, task: Any = None
+    ) -> None:
+        """Run all the runs and return when they are done. Unless rerun is
+        set, runs that are already in the database are skipped."""
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.supervise(runs, rerun, task))
+        finally:
+            loop.close()
+
+    async def supervise(
+        self, runs: Iterable[gem5Run], rerun: bool = False, task: Any = None
+    ) -> None:
+        """Coroutine version of run()"""
+        loop = asyncio.get_running_loop()
+        runs = list(runs)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        # If this process is terminated, kill the gem5 processes (and
+        # store their results).
+        try:
+            loop.add_signal_handler(signal.SIGTERM, self._terminate)
+            handling_sigterm = True
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Not supported here (e.g., not in the main thread)
+            handling_sigterm = False
+
+        # An error in a run doesn't stop the others, which are supervised
+        # until they are done. The first error is raised after that.
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._supervise_run(run, semaphore, rerun, task)
+                    for run in runs
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            if handling_sigterm:
+                loop.remove_signal_handler(signal.SIGTERM)
+
+        errors = [
+            (run, result)
+            for run, result in zip(runs, results)
+            if isinstance(result, BaseException)
+        ]
+        for run, error in errors:
+            print(
+                "Error: supervising {} failed: {!r}".format(
+                    " ".join(run.command), error
+                )
+            )
+        if errors:
+            raise errors[0][1]
+
+    def _kill(self, run: gem5Run, proc: Any, reason: str) -> None:
+        if proc.returncode is None:
+            proc.kill()
+        run.kill_reason = reason
+        run.current_time = time.time()
+        run.dumpJson("info.json")
+
+    def _terminate(self) -> None:
+        for proc, run in list(self._running.items()):
+            self._kill(run, proc, "sigterm")
+
+    async def _supervise_run(
+        self,
+        run: gem5Run,
+        semaphore: asyncio.Semaphore,
+        rerun: bool,
+        task: Any,
+    ) -> None:
+        async with semaphore:
+            db = artifact.getDBConnection()
+            if not rerun and run.hash in db:
+                print(f"Error: Have already run {run.command}. Exiting!")
+                return
+
+            if not run._begin(task, self.cwd):
+                return
+
+            # Start running the gem5 command
+            proc = await asyncio.create_subprocess_exec(
+                *run.command, cwd=self.cwd
+            )
+            self._running[proc] = run
+            try:
+                await self._wait(run, proc)
+            except BaseException:
+                # Don't leave gem5 running unsupervised
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                raise
+            finally:
+                del self._running[proc]
+
+            run._end(proc.returncode, db)
+
+    async def _wait(self, run: gem5Run, proc: Any) -> None:
+        run.status = "Running"
+        run.current_time = time.time()
+        run.pid = proc.pid
+        run.running = True
+        run.dumpJson("info.json")
+
+        terminal = _OutputTail(
+            run.outdir / "system.pc.com_1.device", b"Kernel panic"
+        )
+        check_failure = getattr(run, "check_failure", None)
+        deadline = run.start_time + run.timeout
+        while True:
+            wait = min(self.check_interval, deadline - time.time())
+            try:
+                await asyncio.wait_for(proc.wait(), max(wait, 0))
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            if time.time() >= deadline:
+                reason = "timeout"
+            elif terminal.found():
+                reason = "kernel panic"
+            # The user-defined function must be passed the run (see
+            # gem5Run._create())
+            elif check_failure is not None and check_failure(run):
+                reason = "User defined kill"
+            else:
+                continue
+
+            self._kill(run, proc, reason)
+            await proc.wait()
+            return
+
+
 def getRuns(
     db: ArtifactDB, fs_only: bool = False, limit: int = 0
 ) -> Iterable[gem5Run]:
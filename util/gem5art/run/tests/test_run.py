@@ -27,13 +27,18 @@
 """Tests for gem5Run object"""
 
 import hashlib
+import json
 from pathlib import Path
 import os
+import sys
+import tempfile
+import time
 import unittest
 from uuid import uuid4
 
 from gem5art.artifact import artifact
-from gem5art.run import gem5Run
+from gem5art.artifact._artifactdb import getDBConnection
+from gem5art.run import gem5Run, gem5RunSupervisor
 
 
 class TestSERun(unittest.TestCase):
@@ -120,5 +125,152 @@ class TestSERun(unittest.TestCase):
         )
 
 
+class TestRunSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmpdir.name)
+        self.db = getDBConnection(f"file://{self.dir}/db.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def makeArtifact(self, name):
+        return artifact.Artifact(
+            {
+                "_id": uuid4(),
+                "name": name,
+                "type": "test-binary",
+                "documentation": "This is a description of an artifact",
+                "command": "true",
+                "path": "/",
+                "hash": hashlib.md5(name.encode()).hexdigest(),
+                "git": {},
+                "cwd": "/",
+                "inputs": [],
+            }
+        )
+
+    def makeRun(self, name, code, **kwargs):
+        """Make a run whose gem5 process runs the Python code"""
+        run = gem5Run.createSERun(
+            name,
+            "run.py",
+            str(self.dir / name),
+            self.makeArtifact("gem5"),
+            self.makeArtifact("gem5-git"),
+            self.makeArtifact(name),
+            **kwargs,
+        )
+        # Nothing to check
+        run.artifacts = []
+        run.command = [sys.executable, "-c", code, str(run.outdir)]
+        return run
+
+    def info(self, run):
+        with open(run.outdir / "info.json") as f:
+            return json.load(f)
+
+    def test_finished(self):
+        runs = [
+            self.makeRun("pass", "pass"),
+            self.makeRun("fail", "import sys; sys.exit(3)"),
+        ]
+        gem5RunSupervisor(max_parallel=2).run(runs)
+        self.assertEqual(
+            [run.status for run in runs], ["Finished", "Failed"]
+        )
+        self.assertEqual([run.return_code for run in runs], [0, 3])
+        self.assertEqual(self.info(runs[1])["status"], "Failed")
+        self.assertIn(runs[0].hash, self.db)
+        self.assertTrue((runs[0].outdir / "results.zip").exists())
+
+        # Already in the database, so it isn't run again
+        runs[0].status = "Created"
+        gem5RunSupervisor().run(runs[:1])
+        self.assertEqual(runs[0].status, "Created")
+
+    def test_max_parallel(self):
+        # Each run records when it starts and ends
+        code = (
+            "import sys, time\n"
+            "start = time.time()\n"
+            "time.sleep(0.2)\n"
+            "open(sys.argv[1] + '/times', 'w').write("
+            "'%f %f' % (start, time.time()))\n"
+        )
+        runs = [self.makeRun(f"run{i}", code) for i in range(4)]
+        gem5RunSupervisor(max_parallel=2).run(runs)
+
+        times = []
+        for run in runs:
+            with open(run.outdir / "times") as f:
+                start, end = map(float, f.read().split())
+            times += [(start, 1), (end, -1)]
+        running = 0
+        max_running = 0
+        for t, d in sorted(times):
+            running += d
+            max_running = max(max_running, running)
+        self.assertEqual(max_running, 2)
+
+    def test_kernel_panic(self):
+        code = (
+            "import sys, time\n"
+            "with open(sys.argv[1] + '/system.pc.com_1.device', 'w') as f:\n"
+            "    f.write('Booting\\n' * 1000 + 'Kernel pa')\n"
+            "    f.flush()\n"
+            "    time.sleep(0.3)\n"
+            "    f.write('nic - not syncing\\n')\n"
+            "    f.flush()\n"
+            "    time.sleep(60)\n"
+        )
+        run = self.makeRun("panic", code)
+        start = time.time()
+        gem5RunSupervisor(check_interval=0.1).run([run])
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(run.kill_reason, "kernel panic")
+        self.assertEqual(run.status, "Failed")
+        self.assertEqual(self.info(run)["kill_reason"], "kernel panic")
+
+    def test_timeout(self):
+        run = self.makeRun(
+            "timeout", "import time; time.sleep(60)", timeout=1
+        )
+        start = time.time()
+        gem5RunSupervisor().run([run])
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(run.kill_reason, "timeout")
+
+    def test_check_failure(self):
+        run = self.makeRun(
+            "user",
+            "import time; time.sleep(60)",
+            check_failure=lambda run: time.time() - run.start_time > 0.2,
+        )
+        gem5RunSupervisor(check_interval=0.1).run([run])
+        self.assertEqual(run.kill_reason, "User defined kill")
+
+    def test_error(self):
+        def check_failure(run):
+            raise RuntimeError("check failed")
+
+        runs = [
+            self.makeRun("pass", "import time; time.sleep(0.5)"),
+            self.makeRun(
+                "error",
+                "import time; time.sleep(60)",
+                check_failure=check_failure,
+            ),
+        ]
+        start = time.time()
+        with self.assertRaises(RuntimeError):
+            gem5RunSupervisor(max_parallel=2, check_interval=0.1).run(runs)
+        self.assertLess(time.time() - start, 30)
+        # The other run isn't affected
+        self.assertEqual(runs[0].status, "Finished")
+        self.assertEqual(self.info(runs[0])["status"], "Finished")
+        self.assertIn(runs[0].hash, self.db)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -63,3 +63,17 @@ def run_job_pool(job_list, num_parallel_jobs=mp.cpu_count() // 2):
     pool.close()
     pool.join()
     print(f"All jobs done running!")
+
+
+def run_job_supervisor(job_list, num_parallel_jobs=mp.cpu_count() // 2):
+    """
+    Runs gem5 jobs in parallel from this process when Celery is not used.
+    Unlike run_job_pool, a single process supervises all of the gem5
+    processes (see gem5RunSupervisor in the gem5art run package), at most
+    num_parallel_jobs of them at a time.
+    Receives a list of run objects created by the launch script
+    """
+    from gem5art.run import gem5RunSupervisor
+
+    gem5RunSupervisor(max_parallel=max(num_parallel_jobs, 1)).run(job_list)
+    print(f"All jobs done running!")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Benchmark the generation of C++ code from the ISA descriptions. The
+# ISAs are those targeted by the default build configurations in
+# build_opts, unless some are given on the command line. For each of
+# them, src/arch/<isa>/isa/main.isa is parsed by the isa_parser, as the
+# ISA DESC build step does, and the time it takes is reported.
+#
+# The generated files are written to a temporary directory, or to
+# <output-dir>/<isa> if an output directory is given, which makes it
+# possible to compare the output of two versions of the parser. With a
+# cache directory, the parser caches the generated files there, and
+# reuses them when run again on the same descriptions.
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+gem5_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [ os.path.join(gem5_root, 'src', 'arch'),
+                  os.path.join(gem5_root, 'src', 'python'),
+                  os.path.join(gem5_root, 'ext', 'ply') ]
+
+import isa_parser
+
+def build_opts_isas():
+    isas = []
+    for path in sorted(glob.glob(os.path.join(gem5_root, 'build_opts', '*'))):
+        opts = {}
+        with open(path) as f:
+            exec(f.read(), opts)
+        isa = opts.get('TARGET_ISA')
+        if isa and isa != 'null' and isa not in isas:
+            isas.append(isa)
+    return isas
+
+def bench(isa, output_dir, cache_dir):
+    desc = os.path.join(gem5_root, 'src', 'arch', isa, 'isa', 'main.isa')
+    # Some descriptions import Python modules from their directory (and
+    # expect to be run from the root of the source tree)
+    if os.path.dirname(desc) not in sys.path:
+        sys.path.append(os.path.dirname(desc))
+    # The parser only generates each description once per process
+    isa_parser.ISAParser.AlreadyGenerated.clear()
+    start = time.time()
+    parser = isa_parser.ISAParser(output_dir, cache_dir)
+    parser.parse_isa_desc(desc)
+    return time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the isa_parser")
+    parser.add_argument("isas", nargs='*',
+                        help="ISAs to generate (default: the ISAs of the "
+                        "build_opts configurations)")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="Number of times to generate each ISA")
+    parser.add_argument("-o", "--output-dir",
+                        help="Keep the generated files in this directory")
+    parser.add_argument("-c", "--cache-dir",
+                        help="Cache the generated files in this directory")
+    args = parser.parse_args()
+
+    isas = args.isas or build_opts_isas()
+
+    tmp_dir = None
+    output_dir = args.output_dir
+    if output_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        output_dir = tmp_dir.name
+
+    total = 0
+    for isa in isas:
+        isa_dir = os.path.join(output_dir, isa)
+        os.makedirs(isa_dir, exist_ok=True)
+        times = [ bench(isa, isa_dir, args.cache_dir)
+                  for i in range(args.repeat) ]
+        total += min(times)
+        print("%-8s best %7.2fs, mean %7.2fs" %
+              (isa, min(times), sum(times) / len(times)))
+    print("%-8s best %7.2fs" % ("total", total))
+
+if __name__ == "__main__":
+    main()
@@ -47,7 +47,7 @@ import argparse
 minorviewDir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(minorviewDir)
 
-from minorview.model import BlobModel
+from minorview.model import BlobModel, PagedBlobModel
 from minorview.view import BlobView, BlobController, BlobWindow
 from minorview.point import Point
 
@@ -67,11 +67,24 @@ if __name__ == '__main__':
         help='time of last event to load from file')
     parser.add_argument('--mini-views', action='store_true', default=False,
         help='show tiny views of the next 10 time steps')
+    parser.add_argument('--paged', action='store_true', default=False,
+        help='index the event file and only keep pages of events around '
+            + 'the current time in memory (for large event files)')
+    parser.add_argument('--page-times', metavar='count', type=int,
+        default=1000,
+        help='number of event times per page with --paged (default: 1000)')
+    parser.add_argument('--cached-pages', metavar='count', type=int,
+        default=8,
+        help='number of pages kept in memory with --paged (default: 8)')
     parser.add_argument('eventFile', metavar='event-file', default='ev')
 
     args = parser.parse_args(sys.argv[1:])
 
-    model = BlobModel(unitNamePrefix=args.prefix)
+    if args.paged:
+        model = PagedBlobModel(unitNamePrefix=args.prefix,
+            pageTimes=args.page_times, cachedPages=args.cached_pages)
+    else:
+        model = BlobModel(unitNamePrefix=args.prefix)
 
     if args.picture and os.access(args.picture, os.O_RDONLY):
         model.load_picture(args.picture)
@@ -40,7 +40,12 @@ from .point import Point
 import re
 from . import blobs
 from time import time as wall_time
+import bisect
+import collections
+import io
 import os
+import queue
+import threading
 
 id_parts = "TSPLFE"
 
@@ -535,6 +540,29 @@ class BlobEvent(object):
             list(map(find_inst, blocks))
         return sorted(ret)
 
+match_line_re = re.compile(
+    '^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
+
+def skip_leading_events(f, startTime):
+    """Iterate over the lines of an event file from the first one with a
+    time >= startTime"""
+    still_skipping = True
+    l = f.readline()
+    while l and still_skipping:
+        match = re.match('^\s*(\d+):', l)
+        if match is not None:
+            event_time = match.groups()
+            if int(event_time[0]) >= startTime:
+                still_skipping = False
+            else:
+                l = f.readline()
+        else:
+            l = f.readline()
+
+    while l:
+        yield l
+        l = f.readline()
+
 class BlobModel(object):
     """Model bringing together blob definitions and parsed events"""
     def __init__(self, unitNamePrefix=''):
@@ -623,7 +651,7 @@ class BlobModel(object):
         lower_index, upper_index):
         """Find an event by binary search on time indices"""
         while lower_index <= upper_index:
-            pivot = (upper_index + lower_index) / 2
+            pivot = (upper_index + lower_index) // 2
             pivotEvent = events[pivot]
             event_equal = (pivotEvent.time == time or
                 (pivotEvent.time < time and
@@ -660,11 +688,7 @@ class BlobModel(object):
     def find_time_index(self, time):
         """Find a time index close to the given time (where
         times[return] <= time and times[return+1] > time"""
-        ret = 0
-        lastIndex = len(self.times) - 1
-        while ret < lastIndex and self.times[ret + 1] <= time:
-            ret += 1
-        return ret
+        return max(bisect.bisect_right(self.times, time) - 1, 0)
 
     def add_minor_inst(self, rest):
         """Parse and add a MinorInst line to the model"""
@@ -717,8 +741,10 @@ class BlobModel(object):
 
             self.add_line(LineFault(id, pairs['fault'], vaddr, other_pairs))
 
-    def load_events(self, file, startTime=0, endTime=None):
-        """Load an event file and add everything to this model"""
+    def parse_events(self, lines, endTime=None, printProgress=True):
+        """Parse the lines of an event file and add their events,
+        instructions and lines to this model.  Returns the number of
+        MinorTrace lines seen"""
         def update_comments(comments, time):
             # Add a list of comments to an existing event, if there is one at
             #   the given time, or create a new, correctly-timed, event from
@@ -739,8 +765,6 @@ class BlobModel(object):
                     self.add_unit_event(event)
                 event.comments.append(commentRest)
 
-        self.clear_events()
-
         # A negative time will *always* be different from an event time
         time = -1
         time_events = {}
@@ -751,37 +775,9 @@ class BlobModel(object):
         default_colour = [[colours.unknownColour]]
         next_progress_print_event_count = 1000
 
-        if not os.access(file, os.R_OK):
-            print('Can\'t open file', file)
-            exit(1)
-        else:
-            print('Opening file', file)
-
-        f = open(file)
-
-        start_wall_time = wall_time()
-
-        # Skip leading events
-        still_skipping = True
-        l = f.readline()
-        while l and still_skipping:
-            match = re.match('^\s*(\d+):', l)
-            if match is not None:
-                event_time = match.groups()
-                if int(event_time[0]) >= startTime:
-                    still_skipping = False
-                else:
-                    l = f.readline()
-            else:
-                l = f.readline()
-
-        match_line_re = re.compile(
-            '^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
-
         # Parse each line of the events file, accumulating comments to be
         #   attached to MinorTrace events when the time changes
-        reached_end_time = False
-        while not reached_end_time and l:
+        for l in lines:
             match = match_line_re.match(l)
             if match is not None:
                 event_time, unit, line_type, rest = match.groups()
@@ -792,7 +788,8 @@ class BlobModel(object):
 
                 # When the time changes, resolve comments
                 if event_time != time:
-                    if self.numEvents > next_progress_print_event_count:
+                    if printProgress and \
+                        self.numEvents > next_progress_print_event_count:
                         print(('Parsed to time: %d' % event_time))
                         next_progress_print_event_count = (
                             self.numEvents + 1000)
@@ -828,11 +825,27 @@ class BlobModel(object):
                     self.add_minor_line(rest)
 
             if endTime is not None and time > endTime:
-                reached_end_time = True
-
-            l = f.readline()
+                break
 
         update_comments(comments, time)
+        return minor_trace_line_count
+
+    def load_events(self, file, startTime=0, endTime=None):
+        """Load an event file and add everything to this model"""
+        self.clear_events()
+
+        if not os.access(file, os.R_OK):
+            print('Can\'t open file', file)
+            exit(1)
+        else:
+            print('Opening file', file)
+
+        f = open(file)
+
+        start_wall_time = wall_time()
+
+        minor_trace_line_count = self.parse_events(
+            skip_leading_events(f, startTime), endTime)
         self.extract_times()
         f.close()
 
@@ -1105,3 +1118,340 @@ class BlobModel(object):
 
         self.blobs = []
         self.add_blob_picture(Point(0,1), picture, blob_char_dict)
+
+# The extent of a page of events in an event file.  Events are parsed from
+#   the lines between the start and end offsets.  The carry offsets are
+#   those of the lines of the last events of units before the page, which
+#   give their state at the start of the page
+PageIndexEntry = collections.namedtuple('PageIndexEntry',
+    'start end startTime carry')
+
+class PagedTimes(object):
+    """Sequence of the event times of a PagedBlobModel which only loads the
+    pages of the times it is asked for"""
+    def __init__(self, model):
+        self.model = model
+
+    def __len__(self):
+        return self.model.numTimes
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('time index out of range')
+        pageIndex = bisect.bisect_right(self.model.pageTimeIndices,
+            index) - 1
+        page = self.model.get_page(pageIndex)
+        return page.times[index - self.model.pageTimeIndices[pageIndex]]
+
+class PagedBlobModel(BlobModel):
+    """BlobModel which keeps only a window of an event file in memory
+
+    Loading an event file only indexes it: the file is split into pages of
+    pageTimes event times and the offsets of the pages are recorded.
+    Pages are parsed when they are first needed and kept in an LRU of
+    cachedPages pages.  A background thread parses the prefetchPages
+    pages after (and the page before) the last page used so that
+    stepping through time doesn't wait for them.
+
+    Instructions and lines are only found if they are defined in one of
+    the cached pages"""
+    def __init__(self, unitNamePrefix='', pageTimes=1000, cachedPages=8,
+        prefetchPages=1):
+        self.pageTimes = pageTimes
+        self.cachedPages = max(cachedPages, prefetchPages + 2)
+        self.prefetchPages = prefetchPages
+        self.file = None
+        self.generation = 0
+        self.pageLock = threading.Condition()
+        self.prefetchQueue = queue.Queue()
+        self.prefetchThread = None
+        BlobModel.__init__(self, unitNamePrefix)
+
+    def clear_events(self):
+        """Drop the index and all loaded pages"""
+        BlobModel.clear_events(self)
+        with self.pageLock:
+            self.generation += 1
+            self.pageIndex = []
+            self.pageTimeIndices = []
+            self.pageStartTimes = []
+            self.pages = collections.OrderedDict()
+            self.loading = set()
+            self.lastPageIndex = None
+        self.numTimes = 0
+        self.times = PagedTimes(self)
+
+    def index_events(self, file, startTime=0, endTime=None):
+        """Split an event file into pages.  Which lines belong to the
+        events and which times have events is decided as in
+        BlobModel.parse_events"""
+        line_re = re.compile(match_line_re.pattern.encode())
+        time_re = re.compile(b'^\\s*(\\d+):')
+        prefix_re = re.compile('^' + self.unitNamePrefix + '\\.?(.*)$')
+        unitNames = {}
+
+        pageIndex = []
+        pageTimeIndices = []
+        pageStartTimes = []
+        # Unit name to the offset, time and data of the last MinorTrace
+        #   line, and to the time and offsets of the last comments
+        last_time_lines = {}
+        last_comments = {}
+
+        def carried_lines():
+            offsets = [lineOffset for lineUnit, (lineOffset, lineTime, rest)
+                in last_time_lines.items() if lineUnit in self.unitEvents]
+            for commentUnit, (commentTime, commentOffsets) in \
+                last_comments.items():
+                lineTime = last_time_lines.get(commentUnit, (0, -1, None))[1]
+                # Comments after the last MinorTrace line make an event
+                if commentTime >= lineTime:
+                    offsets.extend(commentOffsets)
+            return sorted(offsets)
+        numTimes = 0
+        pageTimes = 0
+        pageStart = None
+
+        time = -1
+        counted = False
+        offset = 0
+
+        f = open(file, 'rb')
+
+        # Skip leading events
+        l = f.readline()
+        while l:
+            match = time_re.match(l)
+            if match is not None and int(match.group(1)) >= startTime:
+                break
+            offset += len(l)
+            l = f.readline()
+
+        while l:
+            match = line_re.match(l)
+            if match is not None:
+                event_time, unit, line_type, rest = match.groups()
+                event_time = int(event_time)
+
+                unitName = unitNames.get(unit, None)
+                if unitName is None:
+                    unitName = prefix_re.sub('\\1', unit.decode())
+                    unitNames[unit] = unitName
+
+                if event_time != time:
+                    # Start a new page when the time changes
+                    if pageStart is None or pageTimes >= self.pageTimes:
+                        if pageStart is not None:
+                            pageIndex.append(PageIndexEntry(pageStart,
+                                offset, pageStartTime, carry))
+                        pageStart = offset
+                        pageStartTime = event_time
+                        carry = carried_lines()
+                        pageTimeIndices.append(numTimes)
+                        pageStartTimes.append(event_time)
+                        pageTimes = 0
+                    time = event_time
+                    counted = False
+
+                if line_type is None:
+                    # Comments always make an event
+                    is_event = True
+                    if unitName in self.unitEvents:
+                        last = last_comments.get(unitName, None)
+                        if last is not None and last[0] == event_time:
+                            last[1].append(offset)
+                        else:
+                            last_comments[unitName] = (event_time, [offset])
+                elif line_type == b'MinorTrace:':
+                    last = last_time_lines.get(unitName, None)
+                    is_event = last is None or last[2] != rest
+                    if is_event:
+                        last_time_lines[unitName] = (offset, event_time,
+                            rest)
+                else:
+                    is_event = False
+
+                if is_event and not counted and \
+                    unitName in self.unitEvents:
+                    counted = True
+                    numTimes += 1
+                    pageTimes += 1
+
+            offset += len(l)
+            if endTime is not None and time > endTime:
+                break
+            l = f.readline()
+
+        if pageStart is not None:
+            pageIndex.append(PageIndexEntry(pageStart, offset,
+                pageStartTime, carry))
+        f.close()
+
+        with self.pageLock:
+            self.file = file
+            self.pageIndex = pageIndex
+            self.pageTimeIndices = pageTimeIndices
+            self.pageStartTimes = pageStartTimes
+        self.numTimes = numTimes
+
+    def load_events(self, file, startTime=0, endTime=None):
+        """Index an event file.  Its events are loaded as they are
+        needed"""
+        self.clear_events()
+
+        if not os.access(file, os.R_OK):
+            print('Can\'t open file', file)
+            exit(1)
+        else:
+            print('Opening file', file)
+
+        start_wall_time = wall_time()
+
+        self.index_events(file, startTime, endTime)
+
+        end_wall_time = wall_time()
+
+        print('Event times:', self.numTimes, 'pages:', len(self.pageIndex))
+        print('Time to index:', end_wall_time - start_wall_time)
+
+    def parse_page(self, file, entry):
+        """Parse a page of events into a new BlobModel"""
+        page = BlobModel(self.unitNamePrefix)
+        page.blobs = self.blobs
+        page.unitNameToBlobs = self.unitNameToBlobs
+        page.unitEvents = dict((unit, []) for unit in self.unitEvents)
+
+        f = open(file, 'rb')
+        lines = []
+        for offset in entry.carry:
+            f.seek(offset)
+            lines.append(f.readline())
+        f.seek(entry.start)
+        lines.append(f.read(entry.end - entry.start))
+        f.close()
+
+        page.parse_events(io.TextIOWrapper(io.BytesIO(b''.join(lines))),
+            printProgress=False)
+        page.extract_times()
+        # Drop the times of the events carried from earlier pages
+        page.times = page.times[
+            bisect.bisect_left(page.times, entry.startTime):]
+        return page
+
+    def store_page(self, generation, index, page):
+        """Add a parsed page to the LRU, evicting the least recently used
+        pages if it is full"""
+        with self.pageLock:
+            self.loading.discard((generation, index))
+            if generation == self.generation:
+                self.pages[index] = page
+                while len(self.pages) > self.cachedPages:
+                    self.pages.popitem(last=False)
+            self.pageLock.notify_all()
+
+    def get_page(self, index):
+        """Get a page, parsing it if it isn't loaded yet"""
+        with self.pageLock:
+            generation = self.generation
+            while (generation, index) in self.loading:
+                self.pageLock.wait()
+            page = self.pages.get(index, None)
+            if page is not None:
+                self.pages.move_to_end(index)
+            else:
+                self.loading.add((generation, index))
+                file = self.file
+                entry = self.pageIndex[index]
+
+        if page is None:
+            page = self.parse_page(file, entry)
+            self.store_page(generation, index, page)
+
+        if index != self.lastPageIndex:
+            self.lastPageIndex = index
+            self.prefetch_around(generation, index)
+        return page
+
+    def prefetch_around(self, generation, index):
+        """Ask the prefetch thread to load the pages around a page"""
+        if self.prefetchPages <= 0:
+            return
+
+        if self.prefetchThread is None:
+            self.prefetchThread = threading.Thread(
+                target=self.prefetch_loop, name='minorview-prefetch')
+            self.prefetchThread.daemon = True
+            self.prefetchThread.start()
+
+        for near in list(range(index + 1, index + 1 + self.prefetchPages)) \
+            + [index - 1]:
+            if near >= 0 and near < len(self.pageIndex) and \
+                near not in self.pages:
+                self.prefetchQueue.put((generation, near))
+
+    def prefetch_loop(self):
+        """Body of the prefetch thread"""
+        while True:
+            generation, index = self.prefetchQueue.get()
+            with self.pageLock:
+                if generation != self.generation or index in self.pages \
+                    or (generation, index) in self.loading:
+                    continue
+                self.loading.add((generation, index))
+                file = self.file
+                entry = self.pageIndex[index]
+
+            page = None
+            try:
+                page = self.parse_page(file, entry)
+            finally:
+                if page is not None:
+                    self.store_page(generation, index, page)
+                else:
+                    with self.pageLock:
+                        self.loading.discard((generation, index))
+                        self.pageLock.notify_all()
+
+    def find_page_index(self, time):
+        """Find the index of the page holding the events at time"""
+        return max(bisect.bisect_right(self.pageStartTimes, time) - 1, 0)
+
+    def cached_pages(self):
+        """The loaded pages, most recently used first"""
+        with self.pageLock:
+            return list(reversed(self.pages.values()))
+
+    def find_inst(self, id):
+        """Find an instruction in the loaded pages"""
+        for page in self.cached_pages():
+            inst = page.find_inst(id)
+            if inst is not None:
+                return inst
+        return None
+
+    def find_line(self, id):
+        """Find a line in the loaded pages"""
+        for page in self.cached_pages():
+            line = page.find_line(id)
+            if line is not None:
+                return line
+        return None
+
+    def find_unit_event_by_time(self, unit, time):
+        """Find the last event for the given unit at time <= time"""
+        if len(self.pageIndex) == 0:
+            return None
+        page = self.get_page(self.find_page_index(time))
+        return page.find_unit_event_by_time(unit, time)
+
+    def find_time_index(self, time):
+        """Find a time index close to the given time (where
+        times[return] <= time and times[return+1] > time"""
+        if len(self.pageIndex) == 0:
+            return 0
+        index = self.find_page_index(time)
+        page = self.get_page(index)
+        return max(self.pageTimeIndices[index] +
+            bisect.bisect_right(page.times, time) - 1, 0)
@@ -36,11 +36,19 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 # Pipeline activity viewer for the O3 CPU model.
+#
+# Finding the start of a tick or instruction range late in a large trace
+# means scanning the trace up to it. With --index, an index of the trace
+# is saved beside it (as <trace>.idx) the first time, and later runs
+# seek close to the start of the range instead. An up to date index is
+# used whenever there is one.
 
 import argparse
+import bisect
+import io
+import json
 import os
 import sys
-import copy
 
 # Temporary storage for instructions. The queue is filled in out-of-order
 # until it reaches 'max_threshold' number of instructions. It is then
@@ -65,6 +73,19 @@ insts = {
     'only_committed':0,   # Set if only committed instructions are printed.
 }
 
+# The pipeline stages and other ticks of an instruction
+stage_names = ('fetch', 'decode', 'rename', 'dispatch', 'issue', 'complete',
+               'retire', 'store')
+
+class Inst(object):
+    """The pipeline activity of an instruction."""
+
+    __slots__ = stage_names + ('pc', 'upc', 'sn', 'disasm')
+
+    def __init__(self):
+        for name in stage_names:
+            setattr(self, name, 0)
+
 def process_trace(trace, outfile, cycle_time, width, color, timestamps,
                   committed_only, store_completions, start_tick, stop_tick, start_sn, stop_sn):
     global insts
@@ -122,24 +143,28 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
     outfile.write('\n')
 
     # Region of interest
-    curr_inst = {}
+    curr_inst = None
     while True:
         if fields[0] == 'O3PipeView':
-            curr_inst[fields[1]] = int(fields[2])
+            if fields[1] == 'fetch':
+                # Every instruction starts with its fetch record
+                curr_inst = Inst()
+            if fields[1] in stage_names:
+                setattr(curr_inst, fields[1], int(fields[2]))
             if fields[1] == 'fetch':
                 if ((stop_tick > 0 and int(fields[2]) > stop_tick+insts['tick_drift']) or
                     (stop_sn > 0 and int(fields[5]) > (stop_sn+insts['max_threshold']))):
                     print_insts(outfile, cycle_time, width, color, timestamps,
                                 store_completions, 0)
                     return
-                (curr_inst['pc'], curr_inst['upc']) = fields[3:5]
-                curr_inst['sn'] = int(fields[5])
-                curr_inst['disasm'] = ' '.join(fields[6][:-1].split())
+                (curr_inst.pc, curr_inst.upc) = fields[3:5]
+                curr_inst.sn = int(fields[5])
+                curr_inst.disasm = ' '.join(fields[6][:-1].split())
             elif fields[1] == 'retire':
-                if curr_inst['retire'] == 0:
-                    curr_inst['disasm'] = '-----' + curr_inst['disasm']
+                if curr_inst.retire == 0:
+                    curr_inst.disasm = '-----' + curr_inst.disasm
                 if store_completions:
-                    curr_inst[fields[3]] = int(fields[4])
+                    setattr(curr_inst, fields[3], int(fields[4]))
                 queue_inst(outfile, curr_inst, cycle_time, width, color, timestamps, store_completions)
 
         line = trace.readline()
@@ -153,8 +178,9 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
 # Sorts out and prints instructions when their number reaches threshold value
 def queue_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
     global insts
-    l_copy = copy.deepcopy(inst)
-    insts['queue'].append(l_copy)
+    # A new Inst is made for every instruction, so it doesn't need to be
+    # copied
+    insts['queue'].append(inst)
     if len(insts['queue']) > insts['max_threshold']:
         print_insts(outfile, cycle_time, width, color, timestamps, store_completions, insts['min_threshold'])
 
@@ -162,24 +188,27 @@ def queue_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
 def print_insts(outfile, cycle_time, width, color, timestamps, store_completions, lower_threshold):
     global insts
     # sort the list of insts by sequence numbers
-    insts['queue'].sort(key=lambda inst: inst['sn'])
-    while len(insts['queue']) > lower_threshold:
-        print_item=insts['queue'].pop(0)
+    queue = insts['queue']
+    queue.sort(key=lambda inst: inst.sn)
+    num_print = max(len(queue) - lower_threshold, 0)
+    to_print = queue[:num_print]
+    del queue[:num_print]
+    for print_item in to_print:
         # As the instructions are processed out of order the main loop starts
         # earlier then specified by start_sn/tick and finishes later then what
         # is defined in stop_sn/tick.
         # Therefore, here we have to filter out instructions that reside out of
         # the specified boundaries.
-        if (insts['sn_start'] > 0 and print_item['sn'] < insts['sn_start']):
+        if (insts['sn_start'] > 0 and print_item.sn < insts['sn_start']):
             continue; # earlier then the starting sequence number
-        if (insts['sn_stop'] > 0 and print_item['sn'] > insts['sn_stop']):
+        if (insts['sn_stop'] > 0 and print_item.sn > insts['sn_stop']):
             continue; # later then the ending sequence number
-        if (insts['tick_start'] > 0 and print_item['fetch'] < insts['tick_start']):
+        if (insts['tick_start'] > 0 and print_item.fetch < insts['tick_start']):
             continue; # earlier then the starting tick number
-        if (insts['tick_stop'] > 0 and print_item['fetch'] > insts['tick_stop']):
+        if (insts['tick_stop'] > 0 and print_item.fetch > insts['tick_stop']):
             continue; # later then the ending tick number
 
-        if (insts['only_committed'] != 0 and print_item['retire'] == 0):
+        if (insts['only_committed'] != 0 and print_item.retire == 0):
             continue; # retire is set to zero if it hasn't been completed
         print_inst(outfile,  print_item, cycle_time, width, color, timestamps, store_completions)
 
@@ -221,18 +250,18 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
     # Print
 
     time_width = width * cycle_time
-    base_tick = (inst['fetch'] // time_width) * time_width
+    base_tick = (inst.fetch // time_width) * time_width
 
     # Find out the time of the last event - it may not
     # be 'retire' if the instruction is not comlpeted.
-    last_event_time = max(inst['fetch'], inst['decode'],inst['rename'],
-                      inst['dispatch'],inst['issue'], inst['complete'], inst['retire'])
+    last_event_time = max(inst.fetch, inst.decode,inst.rename,
+                      inst.dispatch,inst.issue, inst.complete, inst.retire)
     if store_completions:
-        last_event_time = max(last_event_time, inst['store'])
+        last_event_time = max(last_event_time, inst.store)
 
     # Timeline shorter then time_width is printed in compact form where
     # the print continues at the start of the same line.
-    if ((last_event_time - inst['fetch']) < time_width):
+    if ((last_event_time - inst.fetch) < time_width):
         num_lines = 1 # compact form
     else:
         num_lines = ((last_event_time - base_tick) // time_width) + 1
@@ -240,17 +269,17 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
     curr_color = termcap.Normal
 
     # This will visually distinguish completed and abandoned intructions.
-    if inst['retire'] == 0: dot = '=' # abandoned instruction
+    if inst.retire == 0: dot = '=' # abandoned instruction
     else:                   dot = '.' # completed instruction
 
     for i in range(num_lines):
         start_tick = base_tick + i * time_width
         end_tick = start_tick + time_width
         if num_lines == 1:  # compact form
-            end_tick += (inst['fetch'] - base_tick)
+            end_tick += (inst.fetch - base_tick)
         events = []
         for stage_idx in range(len(stages)):
-            tick = inst[stages[stage_idx]['name']]
+            tick = getattr(inst, stages[stage_idx]['name'])
             if tick != 0:
                 if tick >= start_tick and tick < end_tick:
                     events.append((tick % time_width,
@@ -263,7 +292,7 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             curr_color = stages[events[0][2] - 1]['color']
         for event in events:
             if (stages[event[2]]['name'] == 'dispatch' and
-                inst['dispatch'] == inst['issue']):
+                inst.dispatch == inst.issue):
                 continue
             outfile.write(curr_color + dot * ((event[0] // cycle_time) - pos))
             outfile.write(stages[event[2]]['color'] +
@@ -279,17 +308,101 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
                       ']-(' + str(base_tick + i * time_width).rjust(15) + ') ')
         if i == 0:
             outfile.write('%s.%s %s [%s]' % (
-                    inst['pc'].rjust(10),
-                    inst['upc'],
-                    inst['disasm'].ljust(25),
-                    str(inst['sn']).rjust(10)))
+                    inst.pc.rjust(10),
+                    inst.upc,
+                    inst.disasm.ljust(25),
+                    str(inst.sn).rjust(10)))
             if timestamps:
-                outfile.write('  f=%s, r=%s' % (inst['fetch'], inst['retire']))
+                outfile.write('  f=%s, r=%s' % (inst.fetch, inst.retire))
             outfile.write('\n')
         else:
             outfile.write('...'.center(12) + '\n')
 
 
+# Version of the index file format. Bump this when it changes.
+index_version = 1
+
+# Number of fetch records per index entry
+index_interval = 1024
+
+def index_path(tracefile):
+    return tracefile + '.idx'
+
+def _trace_id(tracefile):
+    st = os.stat(tracefile)
+    return [st.st_size, st.st_mtime_ns]
+
+def build_index(tracefile):
+    """Builds the index of a trace. Every index_interval-th fetch record
+    is indexed with its offset in the file and with the largest tick and
+    sequence number that come before it in the trace. A range can't
+    start before the last entry whose largest tick (or sequence number)
+    is lower than its start, so the scan for the start of the range can
+    begin at that entry."""
+    offsets = []
+    max_ticks = []
+    max_sns = []
+    max_tick = 0
+    max_sn = 0
+    fetches = 0
+    offset = 0
+    with open(tracefile, 'rb') as trace:
+        for line in trace:
+            if line.startswith(b'O3PipeView:'):
+                fields = line.split(b':', 6)
+                if fields[1] == b'fetch':
+                    if fetches % index_interval == 0:
+                        offsets.append(offset)
+                        max_ticks.append(max_tick)
+                        max_sns.append(max_sn)
+                    fetches += 1
+                    max_sn = max(max_sn, int(fields[5]))
+                max_tick = max(max_tick, int(fields[2]))
+            offset += len(line)
+
+    return {
+        'version': index_version,
+        'trace': _trace_id(tracefile),
+        'offsets': offsets,
+        'max_ticks': max_ticks,
+        'max_sns': max_sns,
+    }
+
+def load_index(tracefile):
+    """Returns the index of a trace, or None if there is no up to date
+    index file."""
+    try:
+        with open(index_path(tracefile), 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != index_version or \
+       index.get('trace') != _trace_id(tracefile):
+        return None
+    return index
+
+def save_index(tracefile, index):
+    try:
+        with open(index_path(tracefile), 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+    except OSError:
+        # The index is only an optimization
+        pass
+
+def seek_offset(index, start_tick, start_sn):
+    """Returns the offset in the trace to scan for the start of a range
+    from."""
+    if start_tick != 0:
+        keys, start = index['max_ticks'], start_tick
+    elif start_sn != 0:
+        keys, start = index['max_sns'], start_sn
+    else:
+        return 0
+    # The largest values are non-decreasing, and the scan looks for the
+    # first record with a value of at least start
+    entry = bisect.bisect_left(keys, start) - 1
+    return index['offsets'][entry] if entry >= 0 else 0
+
 def validate_range(my_range):
     my_range = [int(i) for i in my_range.split(':')]
     if (len(my_range) != 2 or
@@ -345,6 +458,11 @@ def main():
         '--store_completions',
         action='store_true', default=False,
         help="additionally display store completion ticks")
+    parser.add_argument(
+        '--index',
+        action='store_true', default=False,
+        help="build an index of the trace beside it (if it doesn't have "
+        "an up to date one) to seek to the start of the range")
     parser.add_argument(
         'tracefile')
 
@@ -357,9 +475,20 @@ def main():
     if not inst_range:
         parser.error('invalid range')
         sys.exit(1)
+    offset = 0
+    if tick_range[0] != 0 or inst_range[0] != 0:
+        index = load_index(args.tracefile)
+        if index is None and args.index:
+            print('Indexing trace... ', end=' ')
+            index = build_index(args.tracefile)
+            save_index(args.tracefile, index)
+        if index is not None:
+            offset = seek_offset(index, tick_range[0], inst_range[0])
     # Process trace
     print('Processing trace... ', end=' ')
-    with open(args.tracefile, 'r') as trace:
+    raw_trace = open(args.tracefile, 'rb')
+    raw_trace.seek(offset)
+    with io.TextIOWrapper(raw_trace) as trace:
         with open(args.outfile, 'w') as out:
             process_trace(trace, out, args.cycle_time, args.width,
                           args.color, args.timestamps,
@@ -69,6 +69,7 @@
 # types of proto objects can use the same function to decode a single message
 
 import gzip
+import mmap
 import struct
 
 def openFileRd(in_file):
@@ -130,6 +131,9 @@ def decodeMessage(in_file, message):
     Attempt to read a message from the file and decode it. Return
     False if no message could be read.
     """
+    if isinstance(in_file, MessageReader):
+        return in_file.decodeMessage(message)
+
     try:
         size, pos = _DecodeVarint32(in_file)
         if size == 0:
@@ -140,6 +144,180 @@ def decodeMessage(in_file, message):
     except IOError:
         return False
 
+def _DecodeVarint32FromBuffer(buf, pos):
+    """
+    Decode a Varint32 from a buffer, starting at pos. Returns the value
+    and the position after it, or (None, pos) if the buffer ends before
+    the end of the varint.
+    """
+    result = 0
+    shift = 0
+    end = len(buf)
+    # Use a 32-bit mask
+    mask = 0xffffffff
+    while pos < end:
+        b = buf[pos]
+        result |= ((b & 0x7f) << shift)
+        pos += 1
+        if not (b & 0x80):
+            if result > 0x7fffffffffffffff:
+                result -= (1 << 64)
+                result |= ~mask
+            else:
+                result &= mask
+            return (result, pos)
+        shift += 7
+        if shift >= 64:
+            raise IOError('Too many bytes when decoding varint.')
+    return (None, pos)
+
+class MessageReader(object):
+    """
+    Block-buffered reader of length-prefixed messages.
+
+    Instead of reading every varint byte and every message with separate
+    read() calls on the (possibly gzip) file object, the reader reads the
+    file in large chunks and decodes the varints and messages from its
+    buffer. Uncompressed files are memory mapped instead. Unlike
+    decodeMessage(), zero-length messages are decoded rather than being
+    mistaken for the end of the file.
+
+    The reader can be passed to decodeMessage(), and also provides a
+    read() method for data that isn't a message, such as the magic
+    number at the start of a trace.
+    """
+
+    def __init__(self, in_file, chunk_size=1 << 22, use_mmap=True):
+        self.in_file = in_file
+        self.chunk_size = chunk_size
+        self._buf = b''
+        self._pos = 0
+        self._map = None
+
+        if use_mmap and not isinstance(in_file, gzip.GzipFile):
+            try:
+                self._map = mmap.mmap(in_file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, ValueError):
+                # Not a regular file, or an empty one
+                self._map = None
+            if self._map is not None:
+                self._buf = self._map
+                self._pos = in_file.tell()
+
+    def _fill(self, size):
+        """
+        Make sure that at least size bytes are buffered, unless the file
+        ends first. Returns the number of buffered bytes.
+        """
+        available = len(self._buf) - self._pos
+        if available >= size or self._map is not None:
+            return available
+
+        data = [ self._buf[self._pos:] ]
+        while available < size:
+            chunk = self.in_file.read(max(self.chunk_size, size - available))
+            if not chunk:
+                break
+            data.append(chunk)
+            available += len(chunk)
+        self._buf = b''.join(data)
+        self._pos = 0
+        return available
+
+    def read(self, size):
+        """
+        Read up to size bytes, like the read() method of a file.
+        """
+        self._fill(size)
+        data = bytes(self._buf[self._pos:self._pos + size])
+        self._pos += len(data)
+        return data
+
+    def readMessage(self):
+        """
+        Return the contents of the next message, or None at the end of the
+        file.
+        """
+        buf = self._buf
+        pos = self._pos
+        # Fast path for the common case of a one-byte size
+        if pos < len(buf) and buf[pos] < 0x80:
+            size = buf[pos]
+            if pos + 1 + size <= len(buf):
+                self._pos = pos + 1 + size
+                return buf[pos + 1:self._pos]
+
+        # A varint is at most 10 bytes long
+        self._fill(10)
+        size, pos = _DecodeVarint32FromBuffer(self._buf, self._pos)
+        if size is None:
+            return None
+        header = pos - self._pos
+        if self._fill(header + size) < header + size:
+            raise IOError('Truncated message at the end of the file.')
+        start = self._pos + header
+        self._pos = start + size
+        return self._buf[start:self._pos]
+
+    def decodeMessage(self, message):
+        """
+        Decode the next message into message. Return False if no message
+        could be read.
+        """
+        try:
+            buf = self.readMessage()
+        except IOError:
+            return False
+        if buf is None:
+            return False
+        message.ParseFromString(buf)
+        return True
+
+    def messages(self, message):
+        """
+        Iterate over the remaining messages. Every message is decoded into
+        the given message object, which is what the iterator yields.
+        """
+        parse = message.ParseFromString
+        while True:
+            # Decode the messages with one-byte sizes that are entirely in
+            # the buffer without going through readMessage()
+            buf = self._buf
+            pos = self._pos
+            end = len(buf)
+            while pos < end:
+                size = buf[pos]
+                if size & 0x80 or pos + 1 + size > end:
+                    break
+                pos += 1 + size
+                self._pos = pos
+                parse(buf[pos - size:pos])
+                yield message
+
+            try:
+                buf = self.readMessage()
+            except IOError:
+                return
+            if buf is None:
+                return
+            parse(buf)
+            yield message
+
+    def close(self):
+        if self._map is not None:
+            self._buf = b''
+            self._map.close()
+            self._map = None
+        self.in_file.close()
+
+def openMessageReader(in_file, **kwargs):
+    """
+    Open a (possibly gzipped) file of messages for reading, returning a
+    MessageReader for it.
+    """
+    return MessageReader(openFileRd(in_file), **kwargs)
+
 def _EncodeVarint32(out_file, value):
   """
   The encoding of the Varint32 is copied from
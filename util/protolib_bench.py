@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Benchmark the decoding of length-prefixed message streams (such as
+# packet and instruction traces) by protolib. The messages are read with
+# protolib.decodeMessage() on the file object returned by openFileRd(),
+# and with the block-buffered protolib.MessageReader, both through
+# decodeMessage() and its messages() iterator. The number of messages
+# per second is reported for each.
+#
+# By default, a synthetic trace is generated. A real trace can be given
+# instead. Either way, the payloads are only framed and not parsed, so
+# the results show the cost of reading the stream.
+
+import argparse
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+
+import protolib
+
+class RawMessage(object):
+    """Stand-in for a protobuf message that keeps the raw payload."""
+
+    def ParseFromString(self, buf):
+        self.buf = buf
+
+def make_trace(path, num_messages, compress):
+    rng = random.Random(0)
+    opener = gzip.open if compress else open
+    with opener(path, 'wb') as f:
+        f.write(b'gem5')
+        for i in range(num_messages):
+            # Typical packet trace records are 10 to 40 bytes long, and
+            # larger ones need multi-byte sizes
+            size = rng.choice((12, 20, 28, 40, 200))
+            protolib._EncodeVarint32(f, size)
+            f.write(os.urandom(size))
+
+def bench(name, open_func, path, iterate=False):
+    start = time.time()
+    proto_in = open_func(path)
+    proto_in.read(4)
+    message = RawMessage()
+    num_messages = 0
+    if iterate:
+        for message in proto_in.messages(message):
+            num_messages += 1
+    else:
+        while protolib.decodeMessage(proto_in, message):
+            num_messages += 1
+    proto_in.close()
+    elapsed = time.time() - start
+    print("%-16s %10d messages in %7.2fs: %12.0f messages/s" %
+          (name, num_messages, elapsed, num_messages / elapsed))
+    return num_messages
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark protolib")
+    parser.add_argument("trace", nargs='?',
+                        help="Trace to read (default: a synthetic trace)")
+    parser.add_argument("-n", "--num-messages", type=int, default=1000000,
+                        help="Number of messages of the synthetic trace")
+    parser.add_argument("--no-compress", action="store_true",
+                        help="Don't compress the synthetic trace")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.trace
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "trace")
+        make_trace(path, args.num_messages, not args.no_compress)
+
+    old = bench("decodeMessage", protolib.openFileRd, path)
+    for name, iterate in (("MessageReader", False),
+                          ("messages()", True)):
+        new = bench(name, protolib.openMessageReader, path, iterate)
+        if old != new:
+            print("Error: read %d messages with decodeMessage but %d with "
+                  "%s" % (old, new, name))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
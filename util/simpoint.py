@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Select simulation points from the basic block vectors (BBVs) written
+# by the SimPoint probe (--simpoint-profile). This implements the
+# fixed-length interval analysis of SimPoint 3.2: the BBV of every
+# interval is normalized and randomly projected to a few dimensions, the
+# projected intervals are clustered with k-means for every number of
+# clusters up to --max-k, and the smallest clustering whose BIC score is
+# within --bic-threshold of the best one is picked. The interval closest
+# to the centroid of each cluster is a simulation point, weighted by the
+# size of its cluster.
+#
+# The output files have the format expected by
+# --take-simpoint-checkpoints:
+#
+#   util/simpoint.py m5out/simpoint.bb.gz -o m5out/results
+#   ... --take-simpoint-checkpoints=m5out/results.simpts,\
+#       m5out/results.weights,10000000,1000000
+
+import argparse
+import gzip
+import math
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    print("This script requires NumPy", file=sys.stderr)
+    sys.exit(1)
+
+# Number of BBV lines parsed at a time
+CHUNK_LINES = 1024
+
+class Projection:
+    """A random projection matrix with a row per basic block.
+
+    Rows are generated on demand from a seeded generator, so the matrix
+    doesn't need to know the number of basic blocks up front and the
+    same seed always gives the same projection.
+    """
+
+    def __init__(self, dim, seed):
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.empty((0, dim))
+
+    def get(self, num_rows):
+        if num_rows > len(self.rows):
+            new_rows = max(num_rows, 2 * len(self.rows)) - len(self.rows)
+            self.rows = np.vstack(
+                [self.rows, self.rng.uniform(-1.0, 1.0, (new_rows, self.dim))])
+        return self.rows[:num_rows]
+
+def _project_chunk(lines, projection):
+    """Normalize and project a chunk of BBV lines.
+
+    Each line is "T:<bb id>:<count> :<bb id>:<count> ...". All the
+    numbers of the chunk are parsed in one go, and the projection of
+    every interval is the sum of the projection rows of its basic
+    blocks, weighted by their normalized counts.
+    """
+    pairs = np.array([line.count(b":") // 2 for line in lines])
+    text = b" ".join(lines).replace(b"T", b" ").replace(b":", b" ")
+    numbers = np.array(text.split(), dtype=np.int64)
+    if len(numbers) != 2 * pairs.sum():
+        raise ValueError("Malformed BBV line")
+
+    ids = numbers[0::2] - 1
+    counts = numbers[1::2].astype(float)
+
+    # Index of the first pair of each interval
+    starts = np.concatenate([[0], np.cumsum(pairs)[:-1]])
+    nonempty = pairs > 0
+    totals = np.zeros(len(lines))
+    totals[nonempty] = np.add.reduceat(counts, starts[nonempty])
+    row = np.repeat(np.arange(len(lines)), pairs)
+    # Intervals without any instructions are projected to the origin,
+    # like empty ones
+    totals[totals == 0] = 1
+    weights = counts / totals[row]
+
+    rows = projection.get(int(ids.max()) + 1 if len(ids) else 0)
+    contributions = weights[:, None] * rows[ids]
+    projected = np.column_stack([
+        np.bincount(row, weights=contributions[:, d], minlength=len(lines))
+        for d in range(projection.dim) ])
+    return projected, counts.sum()
+
+def load_bbv(path, dim, seed):
+    """Stream a (possibly gzip compressed) BBV file and return the
+    projected BBV of every interval, and the total instruction count."""
+    projection = Projection(dim, seed)
+    opener = gzip.open if path.endswith(".gz") else open
+    chunks = []
+    insts = 0
+    with opener(path, "rb") as f:
+        lines = []
+        for line in f:
+            if not line.startswith(b"T"):
+                continue
+            lines.append(line)
+            if len(lines) == CHUNK_LINES:
+                projected, chunk_insts = _project_chunk(lines, projection)
+                chunks.append(projected)
+                insts += chunk_insts
+                lines = []
+        if lines:
+            projected, chunk_insts = _project_chunk(lines, projection)
+            chunks.append(projected)
+            insts += chunk_insts
+
+    if not chunks:
+        return np.empty((0, dim)), 0
+    return np.vstack(chunks), insts
+
+def kmeans(points, k, rng, iterations):
+    """Cluster points with k-means using furthest-first initialization.
+    Returns the centroids, the cluster of each point and the sum of the
+    squared distances to the centroids."""
+    if iterations < 1:
+        raise ValueError("k-means needs at least one iteration")
+    n = len(points)
+    centroids = np.empty((k, points.shape[1]))
+    centroids[0] = points[rng.integers(n)]
+    dist = ((points - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        centroids[i] = points[np.argmax(dist)]
+        dist = np.minimum(dist, ((points - centroids[i]) ** 2).sum(axis=1))
+
+    labels = None
+    for _ in range(iterations):
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2; |p|^2 doesn't change the argmin
+        d = (centroids ** 2).sum(axis=1) - 2 * points @ centroids.T
+        new_labels = np.argmin(d, axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+
+        sizes = np.bincount(labels, minlength=k)
+        sums = np.column_stack([
+            np.bincount(labels, weights=points[:, d], minlength=k)
+            for d in range(points.shape[1]) ])
+        nonempty = sizes > 0
+        centroids[nonempty] = sums[nonempty] / sizes[nonempty, None]
+
+    distortion = ((points - centroids[labels]) ** 2).sum()
+    return centroids, labels, distortion
+
+def bic(points, labels, k, distortion):
+    """The Bayesian Information Criterion score of a clustering, as used
+    by X-means and SimPoint (higher is better)."""
+    r, m = points.shape
+    if r <= k:
+        return -math.inf
+    variance = distortion / (r - k)
+    if variance <= 0:
+        return math.inf
+    sizes = np.bincount(labels, minlength=k)
+    sizes = sizes[sizes > 0]
+    log_likelihood = (sizes * np.log(sizes)).sum() - r * math.log(r) \
+        - r * m / 2 * math.log(2 * math.pi * variance) - (r - k) * m / 2
+    params = (k - 1) + m * k + 1
+    return log_likelihood - params / 2 * math.log(r)
+
+def select(points, max_k, init_seeds, iterations, bic_threshold, seed,
+           verbose=False):
+    """Cluster the intervals for k = 1..max_k and pick the smallest k
+    whose BIC score is within the threshold of the best one."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for k in range(1, min(max_k, len(points)) + 1):
+        best = None
+        for _ in range(init_seeds):
+            result = kmeans(points, k, rng, iterations)
+            if best is None or result[2] < best[2]:
+                best = result
+        score = bic(points, best[1], k, best[2])
+        results.append((k, score, best))
+        if verbose:
+            print("k=%d distortion=%g BIC=%g" % (k, best[2], score))
+
+    scores = [ score for _, score, _ in results if math.isfinite(score) ]
+    if not scores:
+        return results[0]
+    low, high = min(scores), max(scores)
+    threshold = low + bic_threshold * (high - low)
+    for result in results:
+        if result[1] >= threshold:
+            return result
+    return results[-1]
+
+def simulation_points(points, centroids, labels):
+    """Return (interval, cluster, weight) for every non-empty cluster,
+    using the interval closest to the cluster centroid."""
+    simpoints = []
+    dist = ((points - centroids[labels]) ** 2).sum(axis=1)
+    sizes = np.bincount(labels, minlength=len(centroids))
+    for cluster in np.flatnonzero(sizes):
+        members = np.flatnonzero(labels == cluster)
+        interval = members[np.argmin(dist[members])]
+        simpoints.append((int(interval), int(cluster),
+                          sizes[cluster] / len(points)))
+    return simpoints
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("%s is not a positive integer" %
+                                         value)
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Select simulation points from a SimPoint BBV file")
+    parser.add_argument("bbv", help="BBV file (e.g., m5out/simpoint.bb.gz)")
+    parser.add_argument("-o", "--output", default="simpoint",
+                        help="Prefix of the output files; writes "
+                        "<output>.simpts and <output>.weights")
+    parser.add_argument("-k", "--max-k", type=positive_int, default=30,
+                        help="Maximum number of clusters")
+    parser.add_argument("--dim", type=positive_int, default=15,
+                        help="Number of dimensions to project the BBVs to")
+    parser.add_argument("--init-seeds", type=positive_int, default=5,
+                        help="Number of k-means runs per number of clusters")
+    parser.add_argument("--iterations", type=positive_int, default=100,
+                        help="Maximum number of k-means iterations")
+    parser.add_argument("--bic-threshold", type=float, default=0.9,
+                        help="Fraction of the BIC score range a clustering "
+                        "has to reach to be picked")
+    parser.add_argument("--seed", type=int, default=493575226,
+                        help="Seed of the random projection and k-means "
+                        "initialization")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    start = time.time()
+    points, insts = load_bbv(args.bbv, args.dim, args.seed)
+    if not len(points):
+        print("No intervals found in %s" % args.bbv, file=sys.stderr)
+        sys.exit(1)
+    load_time = time.time() - start
+    print("Loaded %d intervals (%d instructions) in %.2fs" %
+          (len(points), insts, load_time))
+
+    k, score, (centroids, labels, _) = select(
+        points, args.max_k, args.init_seeds, args.iterations,
+        args.bic_threshold, args.seed, args.verbose)
+    print("Picked k=%d (BIC %g) in %.2fs" %
+          (k, score, time.time() - start - load_time))
+
+    simpoints = simulation_points(points, centroids, labels)
+    with open(args.output + ".simpts", "w") as simpts_file, \
+         open(args.output + ".weights", "w") as weights_file:
+        for interval, cluster, weight in simpoints:
+            print("%d %d" % (interval, cluster), file=simpts_file)
+            print("%f %d" % (weight, cluster), file=weights_file)
+    print("Wrote %d simulation points to %s.simpts and %s.weights" %
+          (len(simpoints), args.output, args.output))
+
+if __name__ == "__main__":
+    main()
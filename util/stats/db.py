@@ -24,7 +24,18 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import MySQLdb, re, string
+import os, re, string, sys
+
+try:
+    import MySQLdb
+except ImportError:
+    MySQLdb = None
+
+# Import the stats.txt parser shared by the util scripts
+_util_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if _util_dir not in sys.path:
+    sys.path.append(_util_dir)
+import stats_txt
 
 def statcmp(a, b):
     v1 = a.split('.')
@@ -145,7 +156,6 @@ class Database(object):
         self.runs = None
         self.ticks = None
         self.method = 'sum'
-        self._method = type(self).sum
 
     def get(self, job, stat, system=None):
         run = self.allRunNames.get(str(job), None)
@@ -196,6 +206,10 @@ class Database(object):
         self.statlist.append(statname)
 
     def connect(self):
+        if MySQLdb is None:
+            raise ImportError("MySQLdb is needed to connect to a MySQL "
+                              "stats database")
+
         # connect
         self.thedb = MySQLdb.connect(db=self.db,
                                      host=self.host,
@@ -341,7 +355,7 @@ class Database(object):
     #########################################
     # get the data
     #
-    def query(self, op, stat, ticks, group=False):
+    def dataQuery(self, op, stat, ticks, group=False):
         sql = 'select '
         sql += 'dt_stat as stat, '
         sql += 'dt_run as run, '
@@ -375,18 +389,18 @@ class Database(object):
     # Name: sum
     # Desc: given a run, a stat and an array of samples, total the samples
     def sum(self, *args, **kwargs):
-        return self.query('sum', *args, **kwargs)
+        return self.dataQuery('sum', *args, **kwargs)
 
     # Name: avg
     # Desc: given a run, a stat and an array of samples, average the samples
-    def avg(self, stat, ticks):
-        return self.query('avg', *args, **kwargs)
+    def avg(self, *args, **kwargs):
+        return self.dataQuery('avg', *args, **kwargs)
 
     # Name: stdev
     # Desc: given a run, a stat and an array of samples, get the standard
     #       deviation
-    def stdev(self, stat, ticks):
-        return self.query('stddev', *args, **kwargs)
+    def stdev(self, *args, **kwargs):
+        return self.dataQuery('stddev', *args, **kwargs)
 
     def __setattr__(self, attr, value):
         super(Database, self).__setattr__(attr, value)
@@ -405,8 +419,7 @@ class Database(object):
     def data(self, stat, ticks=None):
         if ticks is None:
             ticks = self.ticks
-        sql = self._method(self, stat, ticks)
-        self.query(sql)
+        self.query(self._method(stat, ticks))
 
         runs = {}
         xmax = 0
@@ -432,3 +445,440 @@ class Database(object):
 
     def __getitem__(self, key):
         return self.stattop[key]
+
+#########################################
+# SQLite backend
+#
+# SQLiteDatabase keeps the stats of many runs in a single local SQLite
+# file instead of a MySQL server. It has the same tables as the MySQL
+# database (see dbinit.py), with the data table clustered on
+# (run, stat, tick) and a second index on (stat, tick) for queries
+# across all runs. Only the runs are read when connecting; statistics
+# and formulas are read the first time they are looked up, and their
+# data is summed, averaged, etc. by indexed SQL queries.
+#
+#   source = SQLiteDatabase('stats.db')
+#   source.connect()
+#   source.ingest('run0', 'run0/m5out/stats.txt')
+#   print(source.get('run0', source['system'].cpu.numCycles))
+#
+sqlite_schema = '''
+CREATE TABLE IF NOT EXISTS runs(
+    rn_id       INTEGER PRIMARY KEY,
+    rn_name     TEXT    NOT NULL,
+    rn_sample   TEXT    NOT NULL DEFAULT '0',
+    rn_user     TEXT    NOT NULL DEFAULT '',
+    rn_project  TEXT    NOT NULL DEFAULT '',
+    rn_date     TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    rn_expire   TEXT    NOT NULL DEFAULT '',
+    UNIQUE (rn_name, rn_sample)
+);
+CREATE TABLE IF NOT EXISTS stats(
+    st_id       INTEGER PRIMARY KEY,
+    st_name     TEXT    NOT NULL UNIQUE,
+    st_descr    TEXT    NOT NULL DEFAULT '',
+    st_type     TEXT    NOT NULL DEFAULT 'SCALAR',
+    st_print    INTEGER NOT NULL DEFAULT 1,
+    st_prereq   INTEGER NOT NULL DEFAULT 0,
+    st_prec     INTEGER NOT NULL DEFAULT 6,
+    st_nozero   INTEGER NOT NULL DEFAULT 0,
+    st_nonan    INTEGER NOT NULL DEFAULT 0,
+    st_total    INTEGER NOT NULL DEFAULT 0,
+    st_pdf      INTEGER NOT NULL DEFAULT 0,
+    st_cdf      INTEGER NOT NULL DEFAULT 0,
+    st_min      REAL    NOT NULL DEFAULT 0,
+    st_max      REAL    NOT NULL DEFAULT 0,
+    st_bktsize  REAL    NOT NULL DEFAULT 0,
+    st_size     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS data(
+    dt_stat     INTEGER NOT NULL,
+    dt_x        INTEGER NOT NULL,
+    dt_y        INTEGER NOT NULL,
+    dt_run      INTEGER NOT NULL,
+    dt_tick     INTEGER NOT NULL,
+    dt_data     REAL    NOT NULL,
+    PRIMARY KEY (dt_run, dt_stat, dt_tick, dt_x, dt_y)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS data_stat_tick ON data(dt_stat, dt_tick);
+CREATE TABLE IF NOT EXISTS subdata(
+    sd_stat     INTEGER NOT NULL,
+    sd_x        INTEGER NOT NULL,
+    sd_y        INTEGER NOT NULL,
+    sd_name     TEXT    NOT NULL,
+    sd_descr    TEXT,
+    UNIQUE (sd_stat, sd_x, sd_y)
+);
+CREATE TABLE IF NOT EXISTS formulas(
+    fm_stat     INTEGER PRIMARY KEY,
+    fm_formula  TEXT    NOT NULL
+);
+'''
+
+stat_columns = '''st_id,st_name,st_descr,st_type,st_print,st_prereq,st_prec,
+    st_nozero,st_nonan,st_total,st_pdf,st_cdf,st_min,st_max,st_bktsize,
+    st_size'''
+
+_regexps = {}
+def _regexp(pattern, value):
+    rx = _regexps.get(pattern)
+    if rx is None:
+        rx = _regexps[pattern] = re.compile(pattern)
+    return value is not None and rx.match(value) is not None
+
+class _StdDev(object):
+    """Population standard deviation aggregate, like MySQL's stddev()"""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        if not self.n:
+            return None
+        return (self.m2 / self.n) ** 0.5
+
+class LazyNode(Node):
+    """A node of the stat hierarchy whose children are looked up in the
+    database when they are first accessed"""
+    def __init__(self, db, name):
+        super(LazyNode, self).__init__(name)
+        self._db = db
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        child = self._db.lookup('%s.%s' % (self.name, attr))
+        if child is None:
+            raise AttributeError("no stat or group named %s under %s" %
+                                 (attr, self.name))
+        self.__dict__[attr] = child
+        return child
+
+class LazyStatTop(dict):
+    """The top level of the stat hierarchy, filled in as it is used.
+    Formulas are evaluated with this as their namespace."""
+    def __init__(self, db):
+        super(LazyStatTop, self).__init__()
+        self.db = db
+
+    def __missing__(self, key):
+        child = self.db.lookup(key)
+        if child is None:
+            raise KeyError(key)
+        self[key] = child
+        return child
+
+class LazyFormulas(dict):
+    def __init__(self, db):
+        super(LazyFormulas, self).__init__()
+        self.db = db
+
+    def __missing__(self, stat):
+        self.db.query('select fm_formula from formulas where fm_stat=?',
+                      (stat, ))
+        row = self.db.cursor.fetchone()
+        if row is None:
+            raise KeyError(stat)
+        self[stat] = row[0]
+        return row[0]
+
+class SQLiteDatabase(Database):
+    def __init__(self, path):
+        super(SQLiteDatabase, self).__init__()
+        self.path = path
+        self.allFormulas = LazyFormulas(self)
+        self.stattop = LazyStatTop(self)
+
+    def connect(self):
+        import sqlite3
+        self.thedb = sqlite3.connect(self.path)
+        self.thedb.create_function('regexp', 2, _regexp)
+        self.thedb.create_aggregate('stddev', 1, _StdDev)
+        self.thedb.executescript(sqlite_schema)
+        self.cursor = self.thedb.cursor()
+        self.loadRuns()
+
+    def close(self):
+        self.thedb.close()
+        self.cursor = None
+
+    def loadRuns(self):
+        self.allRuns = []
+        self.allRunIds = {}
+        self.allRunNames = {}
+        self.query('''select rn_id,rn_name,rn_user,rn_project from runs
+                   order by rn_id''')
+        for result in self.cursor.fetchall():
+            run = RunData(result)
+            self.allRuns.append(run)
+            self.allRunIds[run.run] = run
+            self.allRunNames[run.name] = run
+
+    def query(self, sql, params=()):
+        # sql may also be an (sql, params) pair, as built by dataQuery
+        if isinstance(sql, tuple):
+            sql, params = sql
+        self.cursor.execute(sql, params)
+
+    def newStat(self, row):
+        stat = self.allStatIds.get(int(row[0]))
+        if stat is None:
+            from . import info
+            StatData.db = self
+            stat = info.NewStat(self, StatData(row))
+            self.allStatIds[stat.stat] = stat
+            self.allStatNames[stat.name] = stat
+        return stat
+
+    def selectStats(self, where='', params=()):
+        self.query('select %s from stats %s order by st_name' %
+                   (stat_columns, where), params)
+        return [ self.newStat(row) for row in self.cursor.fetchall() ]
+
+    def statByName(self, name):
+        stat = self.allStatNames.get(name)
+        if stat is None:
+            stats = self.selectStats('where st_name=?', (name, ))
+            if stats:
+                stat = stats[0]
+        return stat
+
+    # Name: lookup
+    # Desc: Find the stat or group (as a LazyNode) with the given name,
+    #       where colons may be written as two underscores as in the
+    #       attribute names of the stat hierarchy
+    def lookup(self, path):
+        names = [ path ]
+        if '__' in path:
+            names.insert(0, path.replace('__', ':'))
+        for name in names:
+            stat = self.statByName(name)
+            if stat is not None:
+                return stat
+            # Is there a stat in the group? ('/' sorts right after '.')
+            self.query('''select 1 from stats where st_name>? and st_name<?
+                       limit 1''', (name + '.', name + '/'))
+            if self.cursor.fetchone() is not None:
+                return LazyNode(self, name)
+        return None
+
+    def listTicks(self, runs=None):
+        print("tick")
+        print("----------------------------------------")
+        for tick in self.retTicks(runs):
+            print(tick)
+
+    def retTicks(self, runs=None):
+        sql = 'select distinct dt_tick from data'
+        params = ()
+        if runs is not None:
+            params = tuple(run.run for run in runs)
+            sql += ' where dt_run in (%s)' % ','.join('?' * len(params))
+        self.query(sql + ' order by dt_tick', params)
+        return [ r[0] for r in self.cursor.fetchall() ]
+
+    def listStats(self, regex=None):
+        print('%-60s %-8s %-10s' % ('stat name', 'id', 'type'))
+        print('-' * 80)
+        for stat in self.getStat(regex if regex is not None else ''):
+            print('%-60s %-8s %-10s' % (stat.name, stat.stat, stat.type))
+
+    def listFormulas(self, regex=None):
+        print('%-60s %s' % ('formula name', 'formula'))
+        print('-' * 80)
+        where = "where st_type='FORMULA'"
+        params = ()
+        if regex is not None:
+            where += ' and st_name regexp ?'
+            params = (regex, )
+        for stat in self.selectStats(where, params):
+            print('%-60s %s' % (stat.name, self.allFormulas[stat.stat]))
+
+    def getStat(self, stats):
+        if type(stats) is not list:
+            stats = [ stats ]
+
+        ret = []
+        for stat in stats:
+            if type(stat) is int:
+                if stat not in self.allStatIds:
+                    self.selectStats('where st_id=?', (stat, ))
+                ret.append(self.allStatIds[stat])
+
+            if type(stat) is str:
+                ret.extend(self.selectStats('where st_name regexp ?',
+                                            (stat, )))
+        return ret
+
+    def dataQuery(self, op, stat, ticks, group=False):
+        if op not in ('sum', 'avg', 'stddev'):
+            raise AttributeError("unknown aggregate %s" % op)
+
+        stats = stat if isinstance(stat, list) else [ stat ]
+        params = [ s.stat for s in stats ]
+        sql = 'select dt_stat,dt_run,dt_x,dt_y,'
+        if group:
+            sql += 'dt_tick,'
+        sql += '%s(dt_data) from data where dt_stat in (%s)' % \
+            (op, ','.join('?' * len(stats)))
+
+        if self.runs != None and len(self.runs):
+            sql += ' and dt_run in (%s)' % ','.join('?' * len(self.runs))
+            params.extend(self.runs)
+
+        if ticks != None and len(ticks):
+            sql += ' and dt_tick in (%s)' % ','.join('?' * len(ticks))
+            params.extend(ticks)
+
+        sql += ' group by dt_stat,dt_run,dt_x,dt_y'
+        if group:
+            sql += ',dt_tick'
+        return sql, params
+
+    #########################################
+    # bulk ingestion
+    #
+    def addRun(self, name, sample='0', user='', project=''):
+        """Add a run, or clear the data of an existing run with the same
+        name and sample. Returns the id of the run."""
+        cursor = self.thedb.cursor()
+        cursor.execute('select rn_id from runs where rn_name=? and '
+                       'rn_sample=?', (name, sample))
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute('delete from data where dt_run=?', (row[0], ))
+            return row[0]
+        cursor.execute('insert into runs(rn_name,rn_sample,rn_user,'
+                       'rn_project) values (?,?,?,?)',
+                       (name, sample, user, project))
+        return cursor.lastrowid
+
+    def statIds(self, types, descriptions):
+        """Return the ids of the named stats, adding the ones that aren't
+        in the database yet. types maps the names to their types."""
+        cursor = self.thedb.cursor()
+        cursor.executemany(
+            'insert or ignore into stats(st_name,st_descr,st_type) '
+            'values (?,?,?)',
+            ((name, descriptions.get(name, ''), stype)
+             for name, stype in types.items()))
+        ids = {}
+        names = list(types)
+        # Stay below SQLite's limit on the number of parameters
+        for i in range(0, len(names), 500):
+            batch = names[i:i + 500]
+            cursor.execute('select st_name,st_id from stats where st_name '
+                           'in (%s)' % ','.join('?' * len(batch)), batch)
+            ids.update(cursor.fetchall())
+        return ids
+
+    def checkTicks(self, path, ticks):
+        """Raise a ValueError if several dumps of a file are at the same
+        tick, since the data of a run is keyed by tick and they would
+        overwrite each other."""
+        seen = set()
+        for i, tick in enumerate(ticks):
+            if tick in seen:
+                raise ValueError('%s: dump %d is at tick %d, like an '
+                                 'earlier dump' % (path, i + 1, tick))
+            seen.add(tick)
+
+    def ingestStatsTxt(self, run, path, jobs=1):
+        """Ingest every window of a stats.txt file, at its final tick
+        (finalTick), which must be different for every window. All the
+        statistics are scalars, with names such as
+        system.cpu.fetch.nisnDist::0 for the elements of vectors and
+        distributions."""
+        import math
+
+        windows = stats_txt.read_stats(path, jobs=jobs, descriptions=True)
+        for i, tick in enumerate(windows.ticks):
+            if tick is None:
+                raise ValueError('%s: dump %d has no finalTick' %
+                                 (path, i + 1))
+        self.checkTicks(path, windows.ticks)
+        ids = self.statIds(dict.fromkeys(windows.names(), 'SCALAR'),
+                           windows.descriptions)
+
+        def rows():
+            for name, values in windows.values.items():
+                stat = ids[name]
+                for tick, value in zip(windows.ticks, values):
+                    if not math.isnan(value):
+                        yield (stat, 0, 0, run, tick, float(value))
+
+        self.thedb.executemany('insert into data values (?,?,?,?,?,?)',
+                               rows())
+        return len(windows)
+
+    def ingestJson(self, run, path):
+        """Ingest a JSON stats dump (see m5.ext.pystats), or a list of
+        dumps, at their simulated end times, which must be different for
+        every dump. Scalars are SCALAR stats and the values of vectors and
+        distributions are VECTOR stats."""
+        import json
+        with open(path) as f:
+            dumps = json.load(f)
+        if not isinstance(dumps, list):
+            dumps = [ dumps ]
+
+        types = {}
+        descriptions = {}
+        values = []
+
+        def flatten(prefix, obj, tick):
+            for key, child in obj.items():
+                if not isinstance(child, dict):
+                    continue
+                name = prefix + key
+                value = child.get('value')
+                if isinstance(value, (int, float)) and \
+                   not isinstance(value, bool):
+                    types[name] = 'SCALAR'
+                    values.append((name, 0, tick, value))
+                elif isinstance(value, list):
+                    types[name] = 'VECTOR'
+                    values.extend((name, x, tick, v)
+                                  for x, v in enumerate(value)
+                                  if v is not None)
+                else:
+                    flatten(name + '.', child, tick)
+                    continue
+                if child.get('description'):
+                    descriptions.setdefault(name, child['description'])
+
+        ticks = [ int(dump.get('simulated_end_time') or 0)
+                  for dump in dumps ]
+        self.checkTicks(path, ticks)
+        for dump, tick in zip(dumps, ticks):
+            flatten('', dump, tick)
+
+        ids = self.statIds(types, descriptions)
+        self.thedb.executemany('insert into data values (?,?,0,?,?,?)',
+                               ((ids[name], x, run, tick, float(value))
+                                for name, x, tick, value in values))
+        return len(dumps)
+
+    def ingest(self, name, path, sample='0', user='', project='', jobs=1):
+        """Ingest a stats.txt (possibly gzipped) or JSON stats file as
+        the data of a run, replacing any data the run already had. The
+        whole file is added in a single transaction, or nothing is if it
+        can't be ingested (ValueError). Returns the number of dumps
+        read."""
+        with self.thedb:
+            run = self.addRun(name, sample, user, project)
+            if path.endswith('.json'):
+                count = self.ingestJson(run, path)
+            else:
+                count = self.ingestStatsTxt(run, path, jobs)
+        self.loadRuns()
+        return count
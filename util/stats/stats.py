@@ -30,9 +30,12 @@ import re, sys, math
 
 def usage():
     print('''\
-Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-g <graphdir> ] [-h <host>] [-p]
-       [-s <system>] [-r <runs> ] [-T <samples>] [-u <username>]
-       <command> [command args]
+Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-f <file>] [-g <graphdir> ]
+       [-h <host>] [-p] [-s <system>] [-r <runs> ] [-T <samples>]
+       [-u <username>] <command> [command args]
+
+       -f <file> uses a local SQLite database file instead of a MySQL
+       server (-h and -d aren't needed).
 
        commands    extra parameters   description
        ----------- ------------------ ---------------------------------------
@@ -45,6 +48,11 @@ Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-g <graphdir> ] [-h <host>] [-p]
        stats       [regex]            List all stats (only matching regex)
 
        database    <command>          Where command is drop, init, or clean
+       ingest      [-j <jobs>] <files>
+                                      Add stats.txt or JSON files as runs
+                                      (SQLite only). A file can be given
+                                      as <run name>=<file>, otherwise the
+                                      run is named after its directory
 
 ''' % sys.argv[0])
     sys.exit(1)
@@ -62,6 +70,29 @@ class CommandException(Exception):
     pass
 
 def commands(options, command, args):
+    if command == 'database' and options.file:
+        if len(args) != 1: raise CommandException
+
+        import os
+        from . import db
+        if args[0] == 'drop':
+            if os.path.exists(options.file):
+                os.remove(options.file)
+            return
+
+        if args[0] in ('init', 'clean'):
+            # Connecting creates any missing tables
+            source = db.SQLiteDatabase(options.file)
+            source.connect()
+            if args[0] == 'clean':
+                source.query('''delete from data where dt_run not in
+                             (select rn_id from runs)''')
+                source.thedb.commit()
+            source.close()
+            return
+
+        raise CommandException
+
     if command == 'database':
         if len(args) == 0: raise CommandException
 
@@ -97,11 +128,14 @@ def commands(options, command, args):
         raise CommandException
 
     from . import db
-    source = db.Database()
-    source.host = options.host
-    source.db = options.db
-    source.passwd = options.passwd
-    source.user = options.user
+    if options.file:
+        source = db.SQLiteDatabase(options.file)
+    else:
+        source = db.Database()
+        source.host = options.host
+        source.db = options.db
+        source.passwd = options.passwd
+        source.user = options.user
     source.connect()
     #source.update_dict(globals())
 
@@ -128,6 +162,31 @@ def commands(options, command, args):
         source.listRuns(user)
         return
 
+    if command == 'ingest':
+        if not options.file:
+            sys.exit('ingest needs a SQLite database file (-f)')
+        import os
+        jobs = 1
+        opts, args = getopts(args, '-j:')
+        if not len(args):
+            raise CommandException
+        for o,a in opts:
+            if o == '-j':
+                jobs = int(a)
+        for arg in args:
+            name, sep, path = arg.partition('=')
+            if not sep:
+                path = arg
+                name = os.path.basename(os.path.dirname(
+                    os.path.abspath(path)))
+            try:
+                count = source.ingest(name, path, user=options.user,
+                                      jobs=jobs)
+            except ValueError as e:
+                sys.exit('Cannot ingest %s' % e)
+            print('%s: %d dumps from %s' % (name, count, path))
+        return
+
     if command == 'stats':
         if len(args) == 0:
             source.listStats()
@@ -414,6 +473,7 @@ if __name__ == '__main__':
     options = Options()
     options.host = None
     options.db = None
+    options.file = None
     options.passwd = ''
     options.user = getpass.getuser()
     options.runs = None
@@ -426,7 +486,7 @@ if __name__ == '__main__':
     options.jobfile = None
     options.all = False
 
-    opts, args = getopts(sys.argv[1:], '-EFJad:g:h:j:m:pr:s:u:T:')
+    opts, args = getopts(sys.argv[1:], '-EFJad:f:g:h:j:m:pr:s:u:T:')
     for o,a in opts:
         if o == '-E':
             options.printmode = 'E'
@@ -436,6 +496,8 @@ if __name__ == '__main__':
             options.all = True
         if o == '-d':
             options.db = a
+        if o == '-f':
+            options.file = a
         if o == '-g':
             options.graph = True;
             options.graphdir = a
@@ -466,10 +528,10 @@ if __name__ == '__main__':
         if not options.db:
             options.db = options.jobfile.statdb
 
-    if not options.host:
+    if not options.host and not options.file:
         sys.exit('Database server must be provided from a jobfile or -h')
 
-    if not options.db:
+    if not options.db and not options.file:
         sys.exit('Database name must be provided from a jobfile or -d')
 
     if len(args) == 0:
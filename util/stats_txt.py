@@ -0,0 +1,303 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Parser for the windows of text stats files (stats.txt). Every
+# m5.stats.dump() adds a window to the file, delimited by "Begin" and
+# "End Simulation Statistics" lines, with one statistic per line:
+#
+#   system.cpu.numCycles    1234    # Number of cpu cycles simulated (Cycle)
+#
+# read_stats() reads the file in a single pass and returns the values
+# of the statistics across the windows, one array per statistic.
+# Statistics are looked up by name in a set, so the cost of a line
+# doesn't depend on how many statistics are wanted. Gzipped files
+# (.gz) are supported. With jobs > 1, the windows are cut out of the
+# file by the main process and parsed by a pool of worker processes.
+#
+#   import stats_txt
+#   windows = stats_txt.read_stats("m5out/stats.txt.gz",
+#                                  ["system.cpu.numCycles"])
+#   print(windows.ticks, windows["system.cpu.numCycles"])
+#
+# The arrays are NumPy arrays if NumPy is available, and array.array
+# objects otherwise. Statistics missing from a window are NaN.
+
+import array
+import collections
+import gzip
+import multiprocessing
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+begin_marker = b'---------- Begin Simulation Statistics ----------'
+end_marker = b'---------- End Simulation Statistics   ----------'
+
+# Statistics that are always read, as integers. The snake_case names are
+# those of the stats files of older versions of gem5.
+final_tick_stats = (b'finalTick', b'final_tick')
+sim_freq_stats = (b'simFreq', b'sim_freq')
+int_stats = final_tick_stats + sim_freq_stats
+
+def open_stats(path):
+    """Open a (possibly gzipped) stats file for reading in binary mode."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def iter_windows(path, chunk_size=1 << 24):
+    """
+    Iterate over the windows of a stats file. Every window is the bytes
+    between its begin and end markers. If the file can't be read to the
+    end (for example, because a gzip stream wasn't closed), the window
+    being read is returned as the last one.
+    """
+    f = open_stats(path)
+    buf = b''
+    error = False
+    try:
+        while True:
+            try:
+                data = f.read(chunk_size)
+            except (OSError, EOFError):
+                print("WARNING: error reading %s, ignoring the rest of "
+                      "the file" % path, file=sys.stderr)
+                error = True
+                data = b''
+            if not data:
+                break
+            buf += data
+
+            pos = 0
+            while True:
+                end = buf.find(end_marker, pos)
+                if end < 0:
+                    break
+                begin = buf.find(begin_marker, pos, end)
+                yield buf[begin + len(begin_marker) if begin >= 0 else pos:
+                          end]
+                pos = end + len(end_marker)
+            buf = buf[pos:]
+    finally:
+        f.close()
+
+    if error:
+        begin = buf.find(begin_marker)
+        if begin >= 0:
+            yield buf[begin + len(begin_marker):]
+
+def parse_window(window, names=None, descriptions=False):
+    """
+    Parse a window. names is a set of the (bytes) names of the statistics
+    to return, or None for all of them. Returns a dictionary of the values
+    of the statistics, and a dictionary of their descriptions if asked
+    for.
+    """
+    values = {}
+    descs = {}
+    for line in window.splitlines():
+        name, sep, rest = line.partition(b' ')
+        if not sep or (names is not None and name not in names and
+                       name not in int_stats):
+            continue
+        fields = rest.split(None, 1)
+        if not fields:
+            continue
+        try:
+            if name in int_stats:
+                values[name] = int(fields[0])
+            else:
+                values[name] = float(fields[0])
+        except ValueError:
+            continue
+        if descriptions and len(fields) > 1:
+            descs[name] = fields[1].partition(b'# ')[2].strip()
+    return values, descs
+
+def _parse_windows(job):
+    windows, names, descriptions = job
+    return [ parse_window(w, names, descriptions) for w in windows ]
+
+class StatsWindows(object):
+    """
+    The values of statistics across the windows of a stats file.
+
+    ticks holds the final tick of every window (None if the window has no
+    finalTick statistic) and values maps the names of the statistics to
+    their arrays of values. The arrays can also be accessed by indexing
+    the object with the name of a statistic.
+    """
+
+    def __init__(self, ticks, values, descriptions, sim_freq):
+        self.ticks = ticks
+        self.values = values
+        self.descriptions = descriptions
+        self.sim_freq = sim_freq
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def names(self):
+        return list(self.values.keys())
+
+    def timed(self):
+        """
+        Return the windows that have a final tick, i.e., all of them
+        except for those with a tick of None.
+        """
+        indices = [ i for i, tick in enumerate(self.ticks)
+                    if tick is not None ]
+        if len(indices) == len(self.ticks):
+            return self
+        return StatsWindows(
+            [ self.ticks[i] for i in indices ],
+            { name : _take(values, indices)
+              for name, values in self.values.items() },
+            self.descriptions, self.sim_freq)
+
+def _pop_first(values, names, wanted):
+    # Return the value of the first of the names (aliases of a statistic)
+    # that is in values. The statistics are removed from values, unless
+    # they were asked for, or all statistics were and they aren't the one
+    # whose value is returned.
+    found = None
+    for name in names:
+        if name not in values:
+            continue
+        if found is None:
+            found = values[name]
+        elif wanted is None:
+            continue
+        if wanted is None or name not in wanted:
+            del values[name]
+    return found
+
+def _make_array(num_windows, indices, values):
+    if numpy is not None:
+        result = numpy.full(num_windows, numpy.nan)
+        result[numpy.array(indices, dtype=numpy.intp)] = values
+        return result
+    result = array.array('d', [ float('nan') ]) * num_windows
+    for i, v in zip(indices, values):
+        result[i] = v
+    return result
+
+def _take(values, indices):
+    if numpy is not None:
+        return values[numpy.array(indices, dtype=numpy.intp)]
+    return array.array('d', [ values[i] for i in indices ])
+
+def read_stats(path, names=None, jobs=1, max_tick=None, descriptions=False,
+               batch_size=64):
+    """
+    Read the values of statistics across the windows of a stats file.
+
+    names is an iterable of the names of the statistics to read, or None
+    to read all of them. The final tick (finalTick) and the simulation
+    frequency (simFreq) of the windows are always read, as the ticks and
+    sim_freq of the result, and are only returned as statistics as well
+    if they are in names. Windows after the first one with a final tick
+    greater than max_tick are ignored. If descriptions is set, the
+    description of every statistic is taken from its first window. With
+    jobs > 1, batches of batch_size windows are parsed by a pool of jobs
+    processes.
+    """
+    wanted = None
+    if names is not None:
+        wanted = set(n.encode() for n in names)
+
+    def batches():
+        batch = []
+        for window in iter_windows(path):
+            batch.append(window)
+            if len(batch) == batch_size:
+                yield (batch, wanted, descriptions)
+                batch = []
+        if batch:
+            yield (batch, wanted, descriptions)
+
+    def parsed_windows(pool):
+        if pool is None:
+            for batch in batches():
+                yield from _parse_windows(batch)
+        else:
+            # Only keep a few batches in flight, so that the windows of
+            # large files don't all end up waiting in memory
+            pending = collections.deque()
+            for batch in batches():
+                pending.append(pool.apply_async(_parse_windows, (batch,)))
+                if len(pending) >= 2 * jobs:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+
+    ticks = []
+    columns = {}
+    descs = {}
+    sim_freq = None
+
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    try:
+        for values, window_descs in parsed_windows(pool):
+            tick = _pop_first(values, final_tick_stats, wanted)
+            if max_tick is not None and tick is not None and \
+               tick > max_tick:
+                break
+            freq = _pop_first(values, sim_freq_stats, wanted)
+            if sim_freq is None:
+                sim_freq = freq
+
+            index = len(ticks)
+            ticks.append(tick)
+            for name, value in values.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = ([], [])
+                column[0].append(index)
+                column[1].append(value)
+            for name, desc in window_descs.items():
+                if name not in descs:
+                    descs[name] = desc
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    num_windows = len(ticks)
+    return StatsWindows(
+        ticks,
+        { name.decode() : _make_array(num_windows, *column)
+          for name, column in columns.items() },
+        { name.decode() : desc.decode() for name, desc in descs.items() },
+        sim_freq)
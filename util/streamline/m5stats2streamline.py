@@ -58,6 +58,7 @@
 # APC project generation based on Gator v17 (DS-5 v5.17)
 # Subsequent versions should be backward compatible
 
+import math
 import re, sys, os
 from configparser import ConfigParser
 import gzip
@@ -68,6 +69,11 @@ import zlib
 
 import argparse
 
+# Import the stats.txt parser shared by the util scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                             os.pardir))
+import stats_txt
+
 parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description="""
@@ -106,6 +112,10 @@ parser.add_argument("--gzipped-bmp-not-supported", action="store_true",
 parser.add_argument("--verbose", action="store_true",
                     help="Enable verbose output")
 
+parser.add_argument("-j", "--jobs", action="store", type=int, default=1,
+                    help="Number of processes used to parse the stats file. \
+                    Default=1")
+
 args = parser.parse_args()
 
 if not re.match("(.*)\.apc", args.output_path):
@@ -726,9 +736,6 @@ class StatsEntry(object):
         self.short_name = re.sub("system\.", "", name)
         self.short_name = re.sub(":", "_", name)
 
-        # Regex for this stat (string version used to construct union regex)
-        self.regex_string = "^" + name + "\s+([\d\.]+)"
-        self.regex = re.compile("^" + name + "\s+([\d\.e\-]+)\s+# (.*)$", re.M)
         self.description = ""
 
         # Whether this stat is use per CPU or not
@@ -750,10 +757,8 @@ class StatsEntry(object):
         # Field used to hold ElementTree subelement for this stat
         self.ET_element = None
 
-        # Create per-CPU stat name and regex, etc.
+        # Create per-CPU stat name, etc.
         if self.per_cpu:
-            self.per_cpu_regex_string = []
-            self.per_cpu_regex = []
             self.per_cpu_name = []
             self.per_cpu_found = []
             for i in range(num_cpus):
@@ -765,10 +770,6 @@ class StatsEntry(object):
                 self.per_cpu_name.append(per_cpu_name)
                 print("\t", per_cpu_name)
 
-                self.per_cpu_regex_string.\
-                    append("^" + per_cpu_name + "\s+[\d\.]+")
-                self.per_cpu_regex.append(re.compile("^" + per_cpu_name + \
-                    "\s+([\d\.e\-]+)\s+# (.*)$", re.M))
                 self.values.append([])
                 self.per_cpu_found.append(False)
 
@@ -792,19 +793,6 @@ class Stats(object):
             self.next_key))
         self.next_key += 1
 
-    # Union of all stats to accelerate parsing speed
-    def createStatsRegex(self):
-        regex_strings = [];
-        print("\nnum entries in stats_list", len(self.stats_list))
-        for entry in self.stats_list:
-            if entry.per_cpu:
-                for i in range(num_cpus):
-                    regex_strings.append(entry.per_cpu_regex_string[i])
-            else:
-                regex_strings.append(entry.regex_string)
-
-        self.regex = re.compile('|'.join(regex_strings))
-
 
 def registerStats(config_file):
     print("===============================")
@@ -853,136 +841,79 @@ def registerStats(config_file):
                 stats.register(item, group, i, False)
                 i += 1
 
-    stats.createStatsRegex()
-
     return stats
 
 # Parse and read in gem5 stats file
 # Streamline counters are organized per CPU
-def readGem5Stats(stats, gem5_stats_file):
+def readGem5Stats(stats, gem5_stats_file, jobs=1):
     print("\n===============================")
     print("Parsing gem5 stats file...")
     print(gem5_stats_file)
     print("===============================\n")
-    ext = os.path.splitext(gem5_stats_file)[1]
-
-    window_start_regex = \
-        re.compile("^---------- Begin Simulation Statistics ----------")
-    window_end_regex = \
-        re.compile("^---------- End Simulation Statistics   ----------")
-    final_tick_regex = re.compile("^final_tick\s+(\d+)")
 
     global ticks_in_ns
-    sim_freq_regex = re.compile("^sim_freq\s+(\d+)")
-    sim_freq = -1
 
-    try:
-        if ext == ".gz":
-            f = gzip.open(gem5_stats_file, "r")
+    names = []
+    for stat in stats.stats_list:
+        if stat.per_cpu:
+            names.extend(stat.per_cpu_name)
         else:
-            f = open(gem5_stats_file, "r")
-    except:
+            names.append(stat.name)
+
+    try:
+        windows = stats_txt.read_stats(gem5_stats_file, names, jobs=jobs,
+                                       max_tick=end_tick, descriptions=True)
+    except IOError:
         print("ERROR opening stats file", gem5_stats_file, "!")
         sys.exit(1)
 
-    stats_not_found_list = stats.stats_list[:]
-    window_num = 0
-
-    while (True):
-        error = False
-        try:
-            line = f.readline()
-        except IOError:
-            print("")
-            print("WARNING: IO error in stats file")
-            print("(gzip stream not closed properly?)...continuing for now")
-            error = True
-        if not line:
-            break
+    # Windows without a final tick can't be placed on the timeline
+    untimed = len(windows)
+    windows = windows.timed()
+    untimed -= len(windows)
+    if untimed:
+        print("WARNING: ignoring %d window(s) without final tick" % untimed)
 
-        # Find out how many gem5 ticks in 1ns
-        if sim_freq < 0:
-            m = sim_freq_regex.match(line)
-            if m:
-                sim_freq = int(m.group(1)) # ticks in 1 sec
-                ticks_in_ns = int(sim_freq / 1e9)
-                print("Simulation frequency found! 1 tick == %e sec\n" \
-                        % (1.0 / sim_freq))
-
-        # Final tick in gem5 stats: current absolute timestamp
-        m = final_tick_regex.match(line)
-        if m:
-            tick = int(m.group(1))
-            if tick > end_tick:
-                break
-            stats.tick_list.append(tick)
+    # Find out how many gem5 ticks in 1ns
+    if windows.sim_freq is not None:
+        sim_freq = windows.sim_freq # ticks in 1 sec
+        ticks_in_ns = int(sim_freq / 1e9)
+        print("Simulation frequency found! 1 tick == %e sec\n" \
+                % (1.0 / sim_freq))
 
+    # Final tick in gem5 stats: current absolute timestamp
+    stats.tick_list.extend(windows.ticks)
 
-        if (window_end_regex.match(line) or error):
-            if args.verbose:
-                print("new window")
-            for stat in stats.stats_list:
-                if stat.per_cpu:
-                    for i in range(num_cpus):
-                        if not stat.per_cpu_found[i]:
-                            if not stat.not_found_at_least_once:
-                                print("WARNING: stat not found in window #", \
-                                    window_num, ":", stat.per_cpu_name[i])
-                                print("suppressing further warnings for " + \
-                                    "this stat")
-                                stat.not_found_at_least_once = True
-                            stat.values[i].append(str(0))
-                        stat.per_cpu_found[i] = False
+    for stat in stats.stats_list:
+        if stat.per_cpu:
+            stat_names = stat.per_cpu_name
+        else:
+            stat_names = [ stat.name ]
+
+        for i, name in enumerate(stat_names):
+            values = windows.values.get(name, [ float('nan') ] * len(windows))
+            strings = []
+            for window_num, value in enumerate(values):
+                if not math.isfinite(value):
+                    if not stat.not_found_at_least_once:
+                        print("WARNING: stat not found in window #", \
+                            window_num, ":", name)
+                        print("suppressing further warnings for this stat")
+                        stat.not_found_at_least_once = True
+                    strings.append(str(0))
+                elif stat.per_cpu and stat.name == "ipc":
+                    strings.append(str(int(value * 1000)))
                 else:
-                    if not stat.found:
-                        if not stat.not_found_at_least_once:
-                            print("WARNING: stat not found in window #", \
-                                window_num, ":", stat.name)
-                            print("suppressing further warnings for this stat")
-                            stat.not_found_at_least_once = True
-                        stat.values.append(str(0))
-                    stat.found = False
-            stats_not_found_list = stats.stats_list[:]
-            window_num += 1
-            if error:
-                break
+                    strings.append(str(int(value)))
+                if args.verbose:
+                    print(name, strings[-1])
 
-        # Do a single regex of the union of all stats first for speed
-        if stats.regex.match(line):
-            # Then loop through only the stats we haven't seen in this window
-            for stat in stats_not_found_list[:]:
-                if stat.per_cpu:
-                    for i in range(num_cpus):
-                        m = stat.per_cpu_regex[i].match(line)
-                        if m:
-                            if stat.name == "ipc":
-                                value = str(int(float(m.group(1)) * 1000))
-                            else:
-                                value = str(int(float(m.group(1))))
-                            if args.verbose:
-                                print(stat.per_cpu_name[i], value)
-                            stat.values[i].append(value)
-                            stat.per_cpu_found[i] = True
-                            all_found = True
-                            for j in range(num_cpus):
-                                if not stat.per_cpu_found[j]:
-                                    all_found = False
-                            if all_found:
-                                stats_not_found_list.remove(stat)
-                            if stat.description == "":
-                                stat.description = m.group(2)
-                else:
-                    m = stat.regex.match(line)
-                    if m:
-                        value = str(int(float(m.group(1))))
-                        if args.verbose:
-                            print(stat.name, value)
-                        stat.values.append(value)
-                        stat.found = True
-                        stats_not_found_list.remove(stat)
-                        if stat.description == "":
-                            stat.description = m.group(2)
-    f.close()
+            if stat.per_cpu:
+                stat.values[i] = strings
+            else:
+                stat.values = strings
+            if stat.description == "":
+                stat.description = windows.descriptions.get(name, "")
 
 
 # Create session.xml file in .apc folder
@@ -1238,7 +1169,7 @@ if not os.path.exists(gem5_stats_file):
     print("ERROR: stats.txt[.gz] file does not exist in %s!" % input_path)
     sys.exit(1)
 
-readGem5Stats(stats, gem5_stats_file)
+readGem5Stats(stats, gem5_stats_file, args.jobs)
 
 ####
 # Create Streamline .apc project folder